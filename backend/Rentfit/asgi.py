@@ -2,6 +2,11 @@
 ASGI config for Rentfit project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections (chat.routing) are
+authenticated with a short-lived ticket (chat.tickets) and served by
+Channels. Run it with an ASGI server such as daphne
+(`daphne Rentfit.asgi:application`, see requirements.txt). Without Channels
+installed only the HTTP app is served, and the chat page keeps polling.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -13,4 +18,24 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Rentfit.settings')
 
-application = get_asgi_application()
+# Initialise Django before importing anything that touches models
+django_asgi_app = get_asgi_application()
+
+try:
+    from channels.routing import ProtocolTypeRouter, URLRouter
+    from channels.security.websocket import OriginValidator
+except ImportError:
+    application = django_asgi_app
+else:
+    from django.conf import settings
+
+    from chat.middleware import TicketAuthMiddleware
+    from chat.routing import websocket_urlpatterns
+
+    application = ProtocolTypeRouter({
+        'http': django_asgi_app,
+        'websocket': OriginValidator(
+            TicketAuthMiddleware(URLRouter(websocket_urlpatterns)),
+            settings.CORS_ALLOWED_ORIGINS,
+        ),
+    })
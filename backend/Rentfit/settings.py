@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -81,6 +82,37 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Rentfit.wsgi.application'
+ASGI_APPLICATION = 'Rentfit.asgi.application'
+
+# Realtime push (chat.realtime). Set REDIS_URL (e.g. redis://localhost:6379/0)
+# to share events between processes through channels_redis; without it the
+# in-memory layer only reaches clients connected to the same process.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
+# Notifications are queued in an outbox and delivered by
+# `manage.py dispatch_notifications`, off the request path. Its live pushes
+# need the shared Redis layer, so without one (single-process development)
+# eager mode delivers each request's notifications from a background thread
+# of the web process instead. The notifications.E001 check and the command
+# refuse the worker with the in-memory layer.
+NOTIFICATION_OUTBOX_EAGER = not REDIS_URL
+
+# Read notifications older than this are moved to the archive table by
+# `manage.py archive_notifications` (schedule it daily)
+NOTIFICATION_RETENTION_DAYS = 90
 
 
 # Database
@@ -90,6 +122,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # On-disk test database (git-ignored) so the threaded stress test in
+        # rent.tests.ConcurrentApprovalTests gets real SQLite locking
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -156,7 +191,6 @@ CORS_ALLOW_CREDENTIALS = True
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@rentfit.com'
 
-import os
 # Media files (uploaded files like store logos)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
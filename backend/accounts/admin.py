@@ -15,8 +15,10 @@
 # )
 
 from django.contrib import admin
-from .models import User, OTP, Clothing, Wishlist
+from .models import User, OTP, Clothing, Wishlist, CustomerStats, StoreDailyStats
 
 admin.site.register(User)
 admin.site.register(OTP)
+admin.site.register(CustomerStats)
+admin.site.register(StoreDailyStats)
 
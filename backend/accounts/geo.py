@@ -0,0 +1,141 @@
+"""
+Geo helpers for store/clothing proximity search without GIS.
+
+Store coordinates are indexed through a geohash column on User: nearby
+points share a geohash prefix, so a radius query becomes a handful of
+indexed prefix ranges plus a lat/lng bounding box, and the exact
+haversine distance only has to be computed for the surviving rows.
+"""
+import math
+
+from django.db.models import F, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9
+MAX_COVERING_CELLS = 16
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base32 geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(lat_degrees, lng_degrees) covered by one geohash cell"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) enclosing the circle"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(latitude - lat_delta, -90.0)
+    max_lat = min(latitude + lat_delta, 90.0)
+
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat <= 1e-9 or min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, max_lat, -180.0, 180.0
+    lng_delta = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    if lng_delta >= 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+    # Boxes crossing the antimeridian fall back to the full longitude span
+    min_lng = longitude - lng_delta
+    max_lng = longitude + lng_delta
+    if min_lng < -180.0 or max_lng > 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def covering_cells(box, max_cells=MAX_COVERING_CELLS):
+    """
+    The finest set of geohash prefixes (at most max_cells) that covers the box.
+    Returns an empty list when the box is too large to be worth prefiltering.
+    """
+    min_lat, max_lat, min_lng, max_lng = box
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lng_step = cell_size(precision)
+        lat_start = math.floor((min_lat + 90.0) / lat_step)
+        lat_end = math.floor((min(max_lat, 89.999999) + 90.0) / lat_step)
+        lng_start = math.floor((min_lng + 180.0) / lng_step)
+        lng_end = math.floor((min(max_lng, 179.999999) + 180.0) / lng_step)
+        if (lat_end - lat_start + 1) * (lng_end - lng_start + 1) > max_cells:
+            continue
+        cells = set()
+        for lat_index in range(lat_start, lat_end + 1):
+            for lng_index in range(lng_start, lng_end + 1):
+                # Encode the centre of each grid cell to get its prefix
+                lat = -90.0 + (lat_index + 0.5) * lat_step
+                lng = -180.0 + (lng_index + 0.5) * lng_step
+                cells.add(encode_geohash(lat, lng, precision))
+        return sorted(cells)
+    return []
+
+
+def nearby_filter(latitude, longitude, radius_km, prefix=''):
+    """
+    Index-friendly prefilter for points within radius_km.
+    `prefix` is the lookup path to the User row (e.g. 'store__').
+    """
+    box = bounding_box(latitude, longitude, radius_km)
+    min_lat, max_lat, min_lng, max_lng = box
+    condition = Q(**{
+        f'{prefix}latitude__gte': min_lat,
+        f'{prefix}latitude__lte': max_lat,
+        f'{prefix}longitude__gte': min_lng,
+        f'{prefix}longitude__lte': max_lng,
+    })
+    cells = covering_cells(box)
+    if cells:
+        # Prefix match as a plain range so the b-tree index is used
+        ranges = Q()
+        for cell in cells:
+            ranges |= Q(**{f'{prefix}geohash__gte': cell, f'{prefix}geohash__lt': cell + '~'})
+        condition &= ranges
+    return condition
+
+
+def distance_expression(latitude, longitude, prefix=''):
+    """Haversine distance in km from the given point, as a database expression"""
+    lat_field = Radians(F(f'{prefix}latitude'))
+    lng_field = Radians(F(f'{prefix}longitude'))
+    origin_lat = math.radians(latitude)
+    origin_lng = math.radians(longitude)
+    a = (
+        Power(Sin((lat_field - origin_lat) / 2), 2)
+        + math.cos(origin_lat) * Cos(lat_field) * Power(Sin((lng_field - origin_lng) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
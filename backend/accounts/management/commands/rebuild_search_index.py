@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text catalogue search index from the Clothing table."
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            raise CommandError("Full-text search index is only available on SQLite.")
+        indexed = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} clothing items."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute CustomerStats from rentals, wishlists and donations and repair any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--customer',
+            type=int,
+            nargs='+',
+            help='Only reconcile these customer ids.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = stats.recompute(options['customer'])
+        for customer_id, fields in sorted(drift.items()):
+            changes = ', '.join(f"{field} {stored} -> {actual}" for field, (stored, actual) in fields.items())
+            self.stdout.write(f"Customer {customer_id}: {changes}")
+        self.stdout.write(self.style.SUCCESS(f"Reconciled customer stats: {len(drift)} rows corrected."))
@@ -1,4 +1,6 @@
 from django.contrib.auth.models import BaseUserManager
+from django.db import models
+from django.db.models import F
 from django.utils.translation import gettext_lazy as _
 
 class CustomUserManager(BaseUserManager):
@@ -24,3 +26,34 @@ class CustomUserManager(BaseUserManager):
         extra_fields.setdefault('is_superuser', True)
         extra_fields.setdefault('role', "Admin")
         return self._create_user(email, password, **extra_fields)
+
+
+class ClothingQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Join the store so list and detail serializers don't issue per-item queries.
+        Rating stats are denormalized onto the row (rating_sum / rating_count).
+        """
+        return self.select_related('store')
+
+    def in_size(self, sizes):
+        """
+        Items with stock in any of the given sizes, resolved through the
+        (size, stock_quantity, clothing) index on ClothingSize
+        """
+        from django.apps import apps
+        ClothingSize = apps.get_model('accounts', 'ClothingSize')
+        return self.filter(id__in=ClothingSize.objects.filter(
+            size__in=sizes, stock_quantity__gt=0
+        ).values('clothing_id'))
+
+    def with_min_rating(self, min_rating):
+        """Items whose average rating is at least min_rating (sum >= min * count, no division)"""
+        return self.filter(rating_count__gt=0, rating_sum__gte=F('rating_count') * min_rating)
+
+    def adjust_rating(self, rating_delta, count_delta):
+        """Atomically shift the denormalized rating aggregates with F-expressions"""
+        return self.update(
+            rating_sum=F('rating_sum') + rating_delta,
+            rating_count=F('rating_count') + count_delta,
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_rename_available_quantity_clothing_stock_quantity_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='clothing',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'Clothing Item', 'verbose_name_plural': 'Clothing Items'},
+        ),
+        migrations.AddIndex(
+            model_name='clothing',
+            index=models.Index(fields=['-created_at', '-id'], name='clothing_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clothing',
+            index=models.Index(fields=['store', '-created_at', '-id'], name='clothing_store_created_id_idx'),
+        ),
+    ]
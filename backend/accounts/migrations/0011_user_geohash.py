@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:29
+
+from django.db import migrations, models
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude, longitude, precision=9):
+    """Standard base32 geohash (a frozen copy of accounts.geo.encode_geohash)"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits <<= 1
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = bit_count = 0
+    return ''.join(chars)
+
+
+def backfill_geohash(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    users = User.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    for user in users.only('id', 'latitude', 'longitude'):
+        User.objects.filter(pk=user.pk).update(geohash=encode_geohash(user.latitude, user.longitude))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_clothing_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:30
+
+from django.db import migrations
+
+# Frozen copies of the statements in accounts.search
+CREATE_INDEX_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS accounts_clothing_fts USING fts5("
+    "item_name, description, category, event_type, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+DROP_INDEX_SQL = "DROP TABLE IF EXISTS accounts_clothing_fts"
+POPULATE_INDEX_SQL = (
+    "INSERT INTO accounts_clothing_fts (rowid, item_name, description, category, event_type) "
+    "SELECT id, item_name, COALESCE(description, ''), category, event_type FROM accounts_clothing"
+)
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other backends use the icontains fallback
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_INDEX_SQL)
+    schema_editor.execute(POPULATE_INDEX_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_user_geohash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
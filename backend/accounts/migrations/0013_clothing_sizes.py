@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:34
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+
+
+def split_size_strings(apps, schema_editor):
+    """
+    One ClothingSize row per known size in Clothing.size. The item's
+    stock_quantity is shared out over its sizes as evenly as possible (earlier
+    sizes take the remainder), so the per-size stock adds up to the total.
+    """
+    Clothing = apps.get_model('accounts', 'Clothing')
+    ClothingSize = apps.get_model('accounts', 'ClothingSize')
+    rows = []
+    for clothing_id, size, stock_quantity in Clothing.objects.values_list('id', 'size', 'stock_quantity').iterator():
+        tokens = {token.upper() for token in re.split(r'[\s,/;|]+', size or '') if token}
+        sizes = [value for value in SIZES if value in tokens]
+        share, extra = divmod(max(stock_quantity or 0, 0), len(sizes) or 1)
+        for index, value in enumerate(sizes):
+            rows.append(ClothingSize(clothing_id=clothing_id, size=value, stock_quantity=share + (index < extra)))
+    ClothingSize.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_clothing_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClothingSize',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('XS', 'XS'), ('S', 'S'), ('M', 'M'), ('L', 'L'), ('XL', 'XL'), ('XXL', 'XXL')], max_length=5)),
+                ('stock_quantity', models.PositiveIntegerField(default=0)),
+                ('clothing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sizes', to='accounts.clothing')),
+            ],
+            options={
+                'verbose_name': 'Clothing Size',
+                'verbose_name_plural': 'Clothing Sizes',
+                'ordering': ['clothing', 'id'],
+                'indexes': [models.Index(fields=['size', 'stock_quantity', 'clothing'], name='clothing_size_stock_idx')],
+                'unique_together': {('clothing', 'size')},
+            },
+        ),
+        migrations.RunPython(split_size_strings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_customer_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StoreDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('rental_requests', models.IntegerField(default=0)),
+                ('rentals_approved', models.IntegerField(default=0)),
+                ('rentals_rejected', models.IntegerField(default=0)),
+                ('returns_confirmed', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('donations_received', models.IntegerField(default=0)),
+                ('units_held', models.IntegerField(default=0)),
+                ('units_total', models.IntegerField(default=0)),
+                ('item_rentals', models.JSONField(blank=True, default=dict)),
+                ('store', models.ForeignKey(limit_choices_to={'role': 'Store'}, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Store Daily Stats',
+                'verbose_name_plural': 'Store Daily Stats',
+                'ordering': ['store', 'day'],
+                'unique_together': {('store', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_store_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='clothing',
+            name='size',
+            field=models.CharField(help_text='Comma-separated sizes like S, M, L', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='preferred_clothing_size',
+            field=models.CharField(blank=True, choices=[('XS', 'XS'), ('S', 'S'), ('M', 'M'), ('L', 'L'), ('XL', 'XL'), ('XXL', 'XXL')], max_length=255, null=True),
+        ),
+    ]
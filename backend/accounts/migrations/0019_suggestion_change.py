@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_shared_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestionChange',
+            fields=[
+                ('version', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('clothing', 'Clothing'), ('store', 'Store')], max_length=10)),
+                ('source_id', models.BigIntegerField()),
+                ('text', models.CharField(blank=True, max_length=255, null=True)),
+                ('category', models.CharField(blank=True, max_length=50, null=True)),
+            ],
+        ),
+    ]
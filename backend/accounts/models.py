@@ -1,7 +1,10 @@
+import re
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
-from .managers import CustomUserManager
+from .managers import CustomUserManager, ClothingQuerySet
+from .geo import encode_geohash
 
 class User(AbstractUser):
     class UserRoles(models.TextChoices):
@@ -53,6 +56,8 @@ class User(AbstractUser):
     # Location fields
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    # Derived from latitude/longitude on save; indexed for radius search (see geo.py)
+    geohash = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False)
 
     date_joined = models.DateTimeField(auto_now_add=True)
     objects = CustomUserManager()
@@ -60,6 +65,12 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Bounding-box fallback of radius search when no geohash cells cover the area
+            models.Index(fields=['latitude', 'longitude'], name='user_lat_lng_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.is_superuser:
             self.role = self.UserRoles.ADMIN
@@ -67,6 +78,13 @@ class User(AbstractUser):
             self.role = self.UserRoles.STORE
         else:
             self.role = self.UserRoles.CUSTOMER
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -147,10 +165,21 @@ class Clothing(models.Model):
         default=Status.AVAILABLE
     )
 
+    # Review aggregates, kept in sync by the Review signals in reviews.signals
+    # (rebuild with `manage.py rebuild_rating_aggregates`)
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ClothingQuerySet.as_manager()
+
+    # Only ever changed with F() updates; a full save() must not write back
+    # the values it loaded over reviews counted since
+    AGGREGATE_FIELDS = ('rating_sum', 'rating_count')
+
     def save(self, *args, **kwargs):
         # Automatically update status based on stock
         if self.stock_quantity is not None and self.stock_quantity > 0:
@@ -158,46 +187,136 @@ class Clothing(models.Model):
                 self.clothing_status = 'Available'
         else:
             self.clothing_status = 'Unavailable'
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            skipped = self.get_deferred_fields() | set(self.AGGREGATE_FIELDS)
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
         super().save(*args, **kwargs)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         verbose_name = 'Clothing Item'
         verbose_name_plural = 'Clothing Items'
+        indexes = [
+            # Back the (created_at, id) keyset used by catalogue pagination
+            models.Index(fields=['-created_at', '-id'], name='clothing_created_id_idx'),
+            models.Index(fields=['store', '-created_at', '-id'], name='clothing_store_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.item_name} - {self.store.store_name} ({self.clothing_status})"
 
     @property
     def average_rating(self):
-        """
-        DEPRECATED: This property causes circular import issues.
-        Use serializer's get_average_rating() method instead.
-        Kept for backward compatibility only.
-        """
-        try:
-            from reviews.models import Review
-            reviews = Review.objects.filter(clothing=self)
-            if reviews.exists():
-                return round(sum(r.rating for r in reviews) / reviews.count(), 1)
-            return 0.0
-        except Exception as e:
-            # Avoid breaking serialization if Review model doesn't exist yet
+        """Average review rating from the denormalized aggregates (no query)"""
+        if not self.rating_count:
             return 0.0
+        return round(self.rating_sum / self.rating_count, 1)
 
     @property
     def review_count(self):
+        """Number of reviews from the denormalized aggregates (no query)"""
+        return self.rating_count
+
+    def sync_sizes(self, stock_by_size=None):
         """
-        DEPRECATED: This property causes circular import issues.
-        Use serializer's get_review_count() method instead.
-        Kept for backward compatibility only.
+        Mirror the comma-separated size string into ClothingSize rows, and keep
+        stock_quantity equal to the sum of their stock.
+        stock_by_size ({"M": 2, ...}) sets per-size stock. New sizes without an
+        explicit value share out the stock_quantity not held by the others;
+        without stock_by_size a changed stock_quantity is spread over all the
+        sizes instead (added evenly, taken from the largest first). Whatever
+        the sizes cannot absorb moves the item total to their sum.
         """
-        try:
-            from reviews.models import Review
-            return Review.objects.filter(clothing=self).count()
-        except Exception as e:
-            # Avoid breaking serialization if Review model doesn't exist yet
-            return 0
+        stock_by_size = stock_by_size or {}
+        sizes = ClothingSize.parse_sizes(self.size)
+        added = [size for size in ClothingSize.parse_sizes(','.join(stock_by_size)) if size not in sizes]
+        sizes += added
+        if not sizes:
+            return
+
+        existing = {row.size: row for row in self.sizes.all()}
+        self.sizes.exclude(size__in=sizes).delete()
+        stock = {
+            size: stock_by_size[size] if stock_by_size.get(size) is not None
+            else existing[size].stock_quantity if size in existing else 0
+            for size in sizes
+        }
+        flexible = [size for size in sizes if size not in existing and stock_by_size.get(size) is None]
+        if not flexible and not stock_by_size:
+            flexible = sizes
+        difference = (self.stock_quantity or 0) - sum(stock.values())
+        if difference > 0 and flexible:
+            for size, share in ClothingSize.split_stock(difference, flexible).items():
+                stock[size] += share
+        while difference < 0 and any(stock[size] for size in flexible):
+            largest = max(flexible, key=lambda size: stock[size])
+            stock[largest] -= 1
+            difference += 1
+
+        for size in sizes:
+            row = existing.get(size)
+            if row is None:
+                ClothingSize.objects.create(clothing=self, size=size, stock_quantity=stock[size])
+            elif row.stock_quantity != stock[size]:
+                row.stock_quantity = stock[size]
+                row.save(update_fields=['stock_quantity'])
+        update_fields = []
+        if added:
+            # Keep the display string in step with sizes introduced through stock_by_size
+            self.size = ', '.join(filter(None, [(self.size or '').strip(), *added]))
+            update_fields.append('size')
+        if self.stock_quantity != sum(stock.values()):
+            self.stock_quantity = sum(stock.values())
+            update_fields += ['stock_quantity', 'clothing_status']
+        if update_fields:
+            self.save(update_fields=update_fields)
+
+
+class ClothingSize(models.Model):
+    """
+    Per-size inventory for a clothing item (normalized form of Clothing.size).
+    Indexed on (size, stock_quantity) so "size M in stock" filters don't
+    have to parse the size string. stock_quantity is the units owned in the
+    size; rent.availability checks rentals made in a size against it.
+    """
+    class Size(models.TextChoices):
+        XS = "XS", "XS"
+        S = "S", "S"
+        M = "M", "M"
+        L = "L", "L"
+        XL = "XL", "XL"
+        XXL = "XXL", "XXL"
+
+    clothing = models.ForeignKey(Clothing, on_delete=models.CASCADE, related_name='sizes')
+    size = models.CharField(max_length=5, choices=Size.choices)
+    stock_quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('clothing', 'size')
+        ordering = ['clothing', 'id']
+        verbose_name = 'Clothing Size'
+        verbose_name_plural = 'Clothing Sizes'
+        indexes = [
+            models.Index(fields=['size', 'stock_quantity', 'clothing'], name='clothing_size_stock_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.clothing.item_name} - {self.size} ({self.stock_quantity})"
+
+    @classmethod
+    def parse_sizes(cls, text):
+        """Known sizes in "S, M / l" style text, in XS..XXL order, unknown tokens dropped"""
+        tokens = {token.upper() for token in re.split(r'[\s,/;|]+', text or '') if token}
+        return [size for size in cls.Size.values if size in tokens]
+
+    @staticmethod
+    def split_stock(stock, sizes):
+        """Share stock out over sizes as evenly as possible, earlier sizes taking the remainder"""
+        share, extra = divmod(max(stock, 0), len(sizes) or 1)
+        return {size: share + (index < extra) for index, size in enumerate(sizes)}
 
 class Wishlist(models.Model):
     """
@@ -223,4 +342,101 @@ class Wishlist(models.Model):
         verbose_name_plural = 'Wishlist Items'
 
     def __str__(self):
-        return f"{self.customer.email} - {self.clothing.item_name}"
\ No newline at end of file
+        return f"{self.customer.email} - {self.clothing.item_name}"
+
+class CustomerStats(models.Model):
+    """
+    Running totals for the customer dashboard, maintained by signals
+    (see accounts.stats) and repaired by `manage.py reconcile_customer_stats`
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    active_rentals = models.IntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    wishlist_items = models.IntegerField(default=0)
+    items_donated = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Customer Stats'
+        verbose_name_plural = 'Customer Stats'
+
+    def __str__(self):
+        return f"Stats for {self.user_id}"
+
+
+class StoreDailyStats(models.Model):
+    """
+    Per-store, per-day analytics rollup written by accounts.rollups
+    (`manage.py rollup_store_stats`). The store analytics endpoint reads
+    only these rows.
+    """
+    store = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+        limit_choices_to={'role': 'Store'}
+    )
+    day = models.DateField()
+    rental_requests = models.IntegerField(default=0)
+    rentals_approved = models.IntegerField(default=0)
+    rentals_rejected = models.IntegerField(default=0)
+    returns_confirmed = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # booked at approval
+    paid_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # payments received
+    donations_received = models.IntegerField(default=0)
+    units_held = models.IntegerField(default=0)  # units out on rentals that day
+    units_total = models.IntegerField(default=0)  # units owned (Clothing.stock_quantity)
+    # {clothing_id: {"name": ..., "rentals": n, "revenue": "x.xx"}} for approvals that day
+    item_rentals = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        unique_together = ('store', 'day')
+        ordering = ['store', 'day']
+        verbose_name = 'Store Daily Stats'
+        verbose_name_plural = 'Store Daily Stats'
+
+    def __str__(self):
+        return f"{self.store_id} @ {self.day}"
+
+
+class RollupWatermark(models.Model):
+    """Last source row id folded into the rollups, per source"""
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+
+class SharedVersion(models.Model):
+    """
+    Change counter for data that each process keeps in memory: writers bump
+    it in their transaction, and a process holding a copy built at an older
+    version catches up (see accounts.suggest)
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: v{self.version}"
+
+
+class SuggestionChange(models.Model):
+    """
+    One label change to the type-ahead index, logged under the "suggestions"
+    SharedVersion it bumped so other processes can replay it instead of
+    reloading the catalogue. text/category are None when the source was removed.
+    """
+    version = models.BigIntegerField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=[('clothing', 'Clothing'), ('store', 'Store')])
+    source_id = models.BigIntegerField()
+    text = models.CharField(max_length=255, null=True, blank=True)
+    category = models.CharField(max_length=50, null=True, blank=True)
+
+    def __str__(self):
+        return f"v{self.version}: {self.kind} {self.source_id} -> {self.text}"
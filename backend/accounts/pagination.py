@@ -0,0 +1,182 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset (seek) pagination with opaque next/previous cursors.
+
+    - The keyset is taken from the queryset ordering (or Meta.ordering) with
+      the primary key appended as a tie-breaker, so pages are stable even when
+      several rows share the same timestamp.
+    - Each page is a ``WHERE (a, b) < (x, y) ORDER BY a, b LIMIT n`` query,
+      so a deep page costs the same as the first one.
+    - Pagination is opt-in: it only kicks in when the request carries a
+      ``cursor`` or ``page_size`` parameter, so existing clients that expect a
+      plain list keep working.
+    """
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+        position, reverse = self.decode_cursor(request)
+
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position, reverse))
+
+        order_by = [self.invert(field) for field in self.ordering] if reverse else self.ordering
+        rows = list(queryset.order_by(*order_by)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'page_size': self.page_size,
+            'results': data,
+        })
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """Return the ordering of the queryset with a unique pk tie-breaker."""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or [])
+        for field in ordering:
+            if not isinstance(field, str):
+                raise TypeError('Keyset pagination only supports ordering by field names.')
+        pk_names = {'pk', 'id', queryset.model._meta.pk.name}
+        if not any(field.lstrip('-') in pk_names for field in ordering):
+            descending = ordering[-1].startswith('-') if ordering else False
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def seek_filter(self, position, reverse):
+        """
+        Build ``a >= x AND ((a > x) OR (a = x AND b > y) OR ...)`` for the
+        keyset, with the comparison direction following each field's ordering.
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            condition |= equal_so_far & Q(**{lookup: value})
+            equal_so_far &= Q(**{name: value})
+
+        # A redundant inclusive bound on the leading column gives the planner
+        # a plain index range to seek on instead of an OR it cannot use.
+        field, value = self.ordering[0], position[0]
+        descending = field.startswith('-') != reverse
+        lookup = f"{field.lstrip('-')}__{'lte' if descending else 'gte'}"
+        return Q(**{lookup: value}) & condition
+
+    def get_position(self, row):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            position.append(row.pk if name == 'pk' else getattr(row, name))
+        return position
+
+    def encode_cursor(self, position, reverse):
+        # Keep full microsecond precision; DjangoJSONEncoder truncates to ms.
+        position = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+        payload = json.dumps({'p': position, 'r': reverse}, cls=DjangoJSONEncoder)
+        token = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            raw_position, reverse = payload['p'], bool(payload['r'])
+            if len(raw_position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return self.to_python(raw_position), reverse
+
+    def to_python(self, raw_position):
+        """Convert JSON cursor values back to python values for model fields."""
+        model = self.model
+        position = []
+        for field, value in zip(self.ordering, raw_position):
+            name = field.lstrip('-')
+            try:
+                model_field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Annotations (distance, rank...) are plain JSON numbers.
+                position.append(value)
+                continue
+            try:
+                position.append(model_field.to_python(value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), True)
+
+
+class ClothingCursorPagination(KeysetCursorPagination):
+    """
+    Cursor pagination for catalogue browsing, keyed on (created_at, id).
+    """
+    page_size = 24
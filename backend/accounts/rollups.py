@@ -0,0 +1,227 @@
+"""
+Daily store analytics rollups.
+
+StoreDailyStats holds one row per store per day. `manage.py
+rollup_store_stats` (run nightly, or by hand for fresh numbers) folds in
+only the source rows added since the last run:
+
+- RentalEvent rows (append-only, so their id is the watermark) give
+  requests, approvals (booked revenue and per-item counts), rejections,
+  payments (the approved -> rented change eSewa makes) and confirmed returns.
+- Donation rows give donation intake.
+
+Utilization cannot be replayed from history, so each run also snapshots
+today's units held (DailyOccupancy) against units owned.
+"""
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+BATCH_SIZE = 2000
+EVENTS = 'rental_events'
+DONATIONS = 'donations'
+
+COUNTER_FIELDS = (
+    'rental_requests', 'rentals_approved', 'rentals_rejected', 'returns_confirmed',
+    'revenue', 'paid_revenue', 'donations_received',
+)
+
+
+def _models():
+    return (
+        apps.get_model('accounts', 'StoreDailyStats'),
+        apps.get_model('accounts', 'RollupWatermark'),
+    )
+
+
+def _day(moment):
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+def _apply(changes):
+    """Add {(store_id, day): {field: change, 'items': {...}}} to the rollup rows"""
+    StoreDailyStats, _ = _models()
+    if not changes:
+        return
+    StoreDailyStats.objects.bulk_create(
+        [StoreDailyStats(store_id=store_id, day=day) for store_id, day in changes],
+        ignore_conflicts=True, batch_size=500,
+    )
+    rows = StoreDailyStats.objects.filter(
+        store_id__in={store_id for store_id, _ in changes},
+        day__in={day for _, day in changes},
+    )
+    to_update = []
+    for row in rows:
+        change = changes.get((row.store_id, row.day))
+        if change is None:
+            continue
+        for field in COUNTER_FIELDS:
+            if field in change:
+                setattr(row, field, getattr(row, field) + change[field])
+        for clothing_id, item in change.get('items', {}).items():
+            entry = row.item_rentals.setdefault(clothing_id, {'name': item['name'], 'rentals': 0, 'revenue': '0'})
+            entry['name'] = item['name']
+            entry['rentals'] += item['rentals']
+            entry['revenue'] = str(Decimal(entry['revenue']) + item['revenue'])
+        to_update.append(row)
+    StoreDailyStats.objects.bulk_update(to_update, [*COUNTER_FIELDS, 'item_rentals'], batch_size=500)
+
+
+def _advance(name, source, fold):
+    """
+    Fold source rows with id above the watermark into the rollups, a batch per
+    transaction. fold(rows) -> changes; the last column of each row is its id.
+    """
+    _, RollupWatermark = _models()
+    processed = 0
+    while True:
+        with transaction.atomic():
+            mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=name)
+            rows = list(source.filter(id__gt=mark.position).order_by('id')[:BATCH_SIZE])
+            if not rows:
+                return processed
+            _apply(fold(rows))
+            mark.position = rows[-1][-1]
+            mark.save()
+        processed += len(rows)
+
+
+def _fold_events(rows):
+    Status = apps.get_model('rent', 'Rental').Status
+    changes = {}
+    for created_at, to_status, store_id, clothing_id, item_name, price, _ in rows:
+        change = changes.setdefault((store_id, _day(created_at)), {})
+        if to_status == Status.PENDING:
+            change['rental_requests'] = change.get('rental_requests', 0) + 1
+        elif to_status == Status.APPROVED:
+            change['rentals_approved'] = change.get('rentals_approved', 0) + 1
+            change['revenue'] = change.get('revenue', Decimal('0')) + price
+            item = change.setdefault('items', {}).setdefault(
+                str(clothing_id), {'name': item_name, 'rentals': 0, 'revenue': Decimal('0')}
+            )
+            item['rentals'] += 1
+            item['revenue'] += price
+        elif to_status == Status.REJECTED:
+            change['rentals_rejected'] = change.get('rentals_rejected', 0) + 1
+        elif to_status == Status.RENTED:
+            change['paid_revenue'] = change.get('paid_revenue', Decimal('0')) + price
+        elif to_status == Status.RETURNED_CONFIRMED:
+            change['returns_confirmed'] = change.get('returns_confirmed', 0) + 1
+    return changes
+
+
+def _fold_donations(rows):
+    changes = {}
+    for created_at, store_id, _ in rows:
+        change = changes.setdefault((store_id, _day(created_at)), {})
+        change['donations_received'] = change.get('donations_received', 0) + 1
+    return changes
+
+
+def rollup_events():
+    RentalEvent = apps.get_model('rent', 'RentalEvent')
+    source = RentalEvent.objects.values_list(
+        'created_at', 'to_status', 'rental__store_id', 'rental__clothing_id',
+        'rental__clothing__item_name', 'rental__total_price', 'id',
+    )
+    return _advance(EVENTS, source, _fold_events)
+
+
+def rollup_donations():
+    Donation = apps.get_model('donations', 'Donation')
+    source = Donation.objects.values_list('created_at', 'store_id', 'id')
+    return _advance(DONATIONS, source, _fold_donations)
+
+
+def snapshot_utilization(day=None):
+    """Record units held on day (default today) and units owned, per store"""
+    StoreDailyStats, _ = _models()
+    Clothing = apps.get_model('accounts', 'Clothing')
+    DailyOccupancy = apps.get_model('rent', 'DailyOccupancy')
+
+    day = day or timezone.localdate()
+    owned = dict(Clothing.objects.values('store_id').annotate(units=Sum('stock_quantity')).values_list('store_id', 'units'))
+    held = dict(
+        DailyOccupancy.objects.filter(day=day).values('clothing__store_id')
+        .annotate(units=Sum('units')).values_list('clothing__store_id', 'units')
+    )
+    store_ids = set(owned)
+
+    with transaction.atomic():
+        StoreDailyStats.objects.bulk_create(
+            [StoreDailyStats(store_id=store_id, day=day) for store_id in store_ids],
+            ignore_conflicts=True, batch_size=500,
+        )
+        rows = list(StoreDailyStats.objects.filter(store_id__in=store_ids, day=day))
+        for row in rows:
+            row.units_held = held.get(row.store_id, 0)
+            row.units_total = max(owned.get(row.store_id) or 0, 0)
+        StoreDailyStats.objects.bulk_update(rows, ['units_held', 'units_total'], batch_size=500)
+    return len(rows)
+
+
+def rollup():
+    """Bring every rollup up to date; returns how many source rows were folded in"""
+    return {
+        'events': rollup_events(),
+        'donations': rollup_donations(),
+        'stores_snapshotted': snapshot_utilization(),
+    }
+
+
+def reset():
+    """Zero the replayable counters and rewind the watermarks (utilization snapshots are kept)"""
+    StoreDailyStats, RollupWatermark = _models()
+    with transaction.atomic():
+        StoreDailyStats.objects.update(item_rentals={}, **{field: 0 for field in COUNTER_FIELDS})
+        RollupWatermark.objects.filter(name__in=[EVENTS, DONATIONS]).delete()
+
+
+def summarize(rows):
+    """
+    Totals, per-day series and top items for a store's StoreDailyStats rows
+    (the analytics endpoint's payload).
+    """
+    totals = {field: 0 for field in COUNTER_FIELDS}
+    totals['revenue'] = totals['paid_revenue'] = Decimal('0')
+    held = owned = 0
+    items = {}
+    daily = []
+    for row in rows:
+        for field in COUNTER_FIELDS:
+            totals[field] += getattr(row, field)
+        held += row.units_held
+        owned += row.units_total
+        for clothing_id, item in row.item_rentals.items():
+            entry = items.setdefault(clothing_id, {'name': item['name'], 'rentals': 0, 'revenue': Decimal('0')})
+            entry['rentals'] += item['rentals']
+            entry['revenue'] += Decimal(item['revenue'])
+        daily.append({
+            'day': row.day,
+            **{field: getattr(row, field) for field in COUNTER_FIELDS},
+            'utilization': _ratio(row.units_held, row.units_total),
+        })
+
+    decided = totals['rentals_approved'] + totals['rentals_rejected']
+    top = sorted(items.items(), key=lambda pair: (-pair[1]['rentals'], -pair[1]['revenue'], pair[0]))[:5]
+    return {
+        'totals': {
+            **totals,
+            'rejection_rate': _ratio(totals['rentals_rejected'], decided),
+            'utilization': _ratio(held, owned),
+        },
+        'daily': daily,
+        'top_items': [
+            {'clothing_id': int(clothing_id), 'item_name': item['name'],
+             'rentals': item['rentals'], 'revenue': item['revenue']}
+            for clothing_id, item in top
+        ],
+    }
+
+
+def _ratio(part, whole):
+    return round(part / whole, 4) if whole else None
@@ -0,0 +1,117 @@
+"""
+Full-text catalogue search backed by an SQLite FTS5 index.
+
+accounts_clothing_fts mirrors the searchable text of each Clothing row
+(rowid = clothing id). It is created by migration 0012, kept in sync by
+the Clothing post_save/post_delete signals in accounts.signals, and can be
+rebuilt with `manage.py rebuild_search_index`. Other database backends fall
+back to icontains filtering.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'accounts_clothing_fts'
+INDEXED_FIELDS = ('item_name', 'description', 'category', 'event_type')
+
+# item_name, description, category, event_type
+BM25_WEIGHTS = (10.0, 2.0, 4.0, 4.0)
+
+CREATE_INDEX_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "item_name, description, category, event_type, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+DROP_INDEX_SQL = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+POPULATE_INDEX_SQL = (
+    f"INSERT INTO {FTS_TABLE} (rowid, item_name, description, category, event_type) "
+    "SELECT id, item_name, COALESCE(description, ''), category, event_type FROM accounts_clothing"
+)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Turn user input into a safe FTS5 query: every word must match, and the
+    last word is a prefix so results update while the customer is typing.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_clothing(clothing):
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [clothing.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, item_name, description, category, event_type) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [clothing.pk, clothing.item_name, clothing.description or '',
+             clothing.category, clothing.event_type],
+        )
+
+
+def remove_clothing(clothing_id):
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [clothing_id])
+
+
+def rebuild_index():
+    """Empty the index (DELETE) and repopulate it from accounts_clothing"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(POPULATE_INDEX_SQL)
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def search_queryset(queryset, text):
+    """
+    Restrict a Clothing queryset to search hits, best match first.
+
+    The FTS match is a semi-join inside the same statement as the
+    queryset's other filters (city, size, price...), so every matching item
+    is reachable, and the weighted bm25() score is computed in SQL for the
+    surviving rows only (annotated as search_rank, lower is better).
+    """
+    if not is_enabled():
+        return queryset.filter(fallback_filter(text))
+    match = build_match_query(text)
+    if match is None:
+        return queryset.none()
+    table = queryset.model._meta.db_table
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    return queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+    ).annotate(
+        search_rank=RawSQL(
+            f"SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+            [match], output_field=FloatField(),
+        )
+    ).order_by('search_rank')
+
+
+def fallback_filter(text):
+    """icontains filter used when FTS5 is not available"""
+    condition = Q()
+    for token in _TOKEN_RE.findall(text):
+        condition &= (
+            Q(item_name__icontains=token) | Q(description__icontains=token)
+            | Q(category__icontains=token) | Q(event_type__icontains=token)
+        )
+    return condition
@@ -1,6 +1,7 @@
 from rest_framework import serializers
+from django.db import transaction
 from django.contrib.auth import authenticate
-from .models import User, Clothing, Wishlist
+from .models import User, Clothing, ClothingSize, Wishlist
 from .otp import create_and_send_otp
 
 
@@ -82,6 +83,21 @@ class StoreReadSerializer(serializers.ModelSerializer):
         return None
 
 
+# Nearby Store Serializer
+class NearbyStoreSerializer(StoreReadSerializer):
+    """
+    Store profile plus distance_km, annotated by NearbyStoresView radius search
+    """
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(StoreReadSerializer.Meta):
+        fields = StoreReadSerializer.Meta.fields + ['distance_km']
+
+    def get_distance_km(self, obj):
+        distance = getattr(obj, 'distance_km', None)
+        return round(distance, 2) if distance is not None else None
+
+
 # Store Update Serializer
 class StoreUpdateSerializer(serializers.ModelSerializer):
     """
@@ -294,14 +310,43 @@ class UserSerializer(serializers.ModelSerializer):
 
 # CLOTHING SERIALIZERS
 
+def validate_size_stock(value):
+    """size_stock must map known sizes (XS..XXL) to non-negative stock counts"""
+    if not isinstance(value, dict):
+        raise serializers.ValidationError('Expected an object like {"M": 2, "L": 1}')
+    cleaned = {}
+    for size, stock in value.items():
+        size = str(size).strip().upper()
+        if size not in ClothingSize.Size.values:
+            raise serializers.ValidationError(f"Unknown size '{size}'")
+        try:
+            stock = int(stock)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError(f"Stock for size {size} must be a number")
+        if stock < 0:
+            raise serializers.ValidationError(f"Stock for size {size} cannot be negative")
+        cleaned[size] = stock
+    return cleaned
+
+
+class ClothingSizeSerializer(serializers.ModelSerializer):
+    """Per-size stock of a clothing item"""
+    class Meta:
+        model = ClothingSize
+        fields = ['size', 'stock_quantity']
+
+
 class ClothingCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating clothing items
     - Automatically assigns logged-in store as owner
     - Sets clothing_status = Available by default
+    - Optional size_stock ({"M": 2, "L": 1}) sets per-size stock
     """
     store_name = serializers.CharField(source='store.store_name', read_only=True)
     image_url = serializers.SerializerMethodField()
+    size_stock = serializers.JSONField(write_only=True, required=False)
+    sizes = ClothingSizeSerializer(many=True, read_only=True)
 
     class Meta:
         model = Clothing
@@ -309,7 +354,7 @@ class ClothingCreateSerializer(serializers.ModelSerializer):
             'id', 'store_name',
             'item_name', 'category', 'event_type', 'gender', 'size', 'condition',
             'description', 'rental_price', 'security_deposit', 'stock_quantity',
-            'images', 'image_url', 'clothing_status', 'created_at', 'updated_at'
+            'images', 'image_url', 'clothing_status', 'size_stock', 'sizes', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'clothing_status', 'created_at', 'updated_at', 'store_name']
 
@@ -319,14 +364,20 @@ class ClothingCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Rental price must be greater than 0")
         return value
 
+    def validate_size_stock(self, value):
+        return validate_size_stock(value)
+
+    @transaction.atomic
     def create(self, validated_data):
         """Create clothing item with store from request user"""
         store = self.context['request'].user
+        size_stock = validated_data.pop('size_stock', None)
         clothing = Clothing.objects.create(
             store=store,
             clothing_status=Clothing.Status.AVAILABLE,
             **validated_data
         )
+        clothing.sync_sizes(size_stock)
         return clothing
 
     def get_image_url(self, obj):
@@ -378,6 +429,21 @@ class ClothingListSerializer(serializers.ModelSerializer):
         return None
 
 
+class NearbyClothingListSerializer(ClothingListSerializer):
+    """
+    Clothing list item plus distance_km to its store, annotated by the
+    AllClothingListView radius search
+    """
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(ClothingListSerializer.Meta):
+        fields = ClothingListSerializer.Meta.fields + ['distance_km']
+
+    def get_distance_km(self, obj):
+        distance = getattr(obj, 'distance_km', None)
+        return round(distance, 2) if distance is not None else None
+
+
 class ClothingDetailSerializer(serializers.ModelSerializer):
     """
     Serializer for full clothing item details
@@ -394,11 +460,12 @@ class ClothingDetailSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
     name = serializers.CharField(source='item_name', read_only=True)
     image_url = serializers.SerializerMethodField()
+    sizes = ClothingSizeSerializer(many=True, read_only=True)
 
     class Meta:
         model = Clothing
         fields = [
-            'id', 'item_name', 'name', 'category', 'event_type', 'gender', 'size', 'condition',
+            'id', 'item_name', 'name', 'category', 'event_type', 'gender', 'size', 'sizes', 'condition',
             'description', 'rental_price', 'security_deposit', 'stock_quantity', 'images', 'image', 'image_url',
             'clothing_status', 'store_user_id', 'store_name', 'store_email', 'store_phone',
             'store_address', 'store_city', 'store_latitude', 'store_longitude', 'average_rating', 'review_count',
@@ -422,13 +489,16 @@ class ClothingDetailSerializer(serializers.ModelSerializer):
 class ClothingUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer for updating clothing items
+    - Changing size / stock_quantity / size_stock keeps the per-size stock rows in sync
     """
+    size_stock = serializers.JSONField(write_only=True, required=False)
+
     class Meta:
         model = Clothing
         fields = [
             'item_name', 'category', 'event_type', 'gender', 'size', 'condition',
             'description', 'rental_price', 'security_deposit', 'stock_quantity',
-            'images', 'clothing_status'
+            'images', 'clothing_status', 'size_stock'
         ]
 
     def validate_rental_price(self, value):
@@ -437,6 +507,17 @@ class ClothingUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Rental price must be greater than 0")
         return value
 
+    def validate_size_stock(self, value):
+        return validate_size_stock(value)
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        size_stock = validated_data.pop('size_stock', None)
+        instance = super().update(instance, validated_data)
+        if {'size', 'stock_quantity'} & set(validated_data) or size_stock:
+            instance.sync_sizes(size_stock)
+        return instance
+
 
 class ClothingStatusUpdateSerializer(serializers.ModelSerializer):
     """
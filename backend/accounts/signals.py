@@ -0,0 +1,110 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from rent.transitions import rental_transitioned
+from .models import Clothing, CustomerStats, User, Wishlist
+from . import search, stats, suggest
+from .suggest import suggestion_index
+
+
+@receiver(post_init, sender=Clothing)
+def remember_suggested_labels(sender, instance, **kwargs):
+    instance._loaded_labels = suggest.clothing_labels(instance)
+
+
+@receiver(post_save, sender=Clothing)
+def index_clothing_for_search(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the FTS index and type-ahead index in step with the Clothing text fields"""
+    if update_fields is not None and not set(update_fields) & set(search.INDEXED_FIELDS):
+        return
+    search.index_clothing(instance)
+    suggestion_index.clothing_changed(instance, instance._loaded_labels, created)
+    instance._loaded_labels = suggest.clothing_labels(instance)
+
+
+@receiver(post_delete, sender=Clothing)
+def remove_clothing_from_search(sender, instance, **kwargs):
+    search.remove_clothing(instance.pk)
+    suggestion_index.clothing_removed(instance.pk)
+
+
+STORE_NAME_FIELDS = {'store_name', 'role', 'is_store', 'is_superuser'}
+
+
+@receiver(post_init, sender=User)
+def remember_store_label(sender, instance, **kwargs):
+    instance._loaded_store_label = suggest.store_label(instance)
+
+
+@receiver(post_save, sender=User)
+def index_store_name(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not STORE_NAME_FIELDS & set(update_fields):
+        return  # e.g. the last_login update on every sign-in
+    suggestion_index.store_changed(instance, instance._loaded_store_label, created)
+    instance._loaded_store_label = suggest.store_label(instance)
+
+
+@receiver(post_save, sender=User)
+def create_customer_stats(sender, instance, created, **kwargs):
+    if created and instance.role == User.UserRoles.CUSTOMER:
+        CustomerStats.objects.create(user=instance)
+
+
+@receiver(post_delete, sender=User)
+def remove_store_name(sender, instance, **kwargs):
+    suggestion_index.store_removed(instance.pk)
+
+
+@receiver(rental_transitioned)
+def count_rental_transition(sender, rentals, from_status, to_status, **kwargs):
+    stats.adjust_many(stats.rental_deltas(rentals, from_status, to_status))
+
+
+@receiver(post_init, sender='rent.Rental')
+def remember_loaded_price(sender, instance, **kwargs):
+    instance._loaded_total_price = instance.__dict__.get('total_price')
+
+
+@receiver(pre_save, sender='rent.Rental')
+def measure_price_edit(sender, instance, **kwargs):
+    """
+    total_spent change from editing total_price, at the status the rental
+    was counted under (the status change itself is counted on transition)
+    """
+    old_price, instance._loaded_total_price = instance._loaded_total_price, instance.total_price
+    instance._spent_change = 0
+    if not instance._state.adding and old_price is not None and old_price != instance.total_price:
+        _, instance._spent_change = stats.rental_delta(None, instance._loaded_status, instance.total_price - old_price)
+
+
+@receiver(post_save, sender='rent.Rental')
+def count_price_edit(sender, instance, **kwargs):
+    stats.adjust(instance.customer_id, total_spent=instance._spent_change)
+
+
+@receiver(post_delete, sender='rent.Rental')
+def count_rental_delete(sender, instance, **kwargs):
+    active, spent = stats.rental_delta(instance._loaded_status, None, instance.total_price)
+    stats.adjust(instance.customer_id, active_rentals=active, total_spent=spent)
+
+
+@receiver(post_save, sender=Wishlist)
+def count_wishlist_add(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust(instance.customer_id, wishlist_items=1)
+
+
+@receiver(post_delete, sender=Wishlist)
+def count_wishlist_remove(sender, instance, **kwargs):
+    stats.adjust(instance.customer_id, wishlist_items=-1)
+
+
+@receiver(post_save, sender='donations.Donation')
+def count_donation_add(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust(instance.customer_id, items_donated=1)
+
+
+@receiver(post_delete, sender='donations.Donation')
+def count_donation_remove(sender, instance, **kwargs):
+    stats.adjust(instance.customer_id, items_donated=-1)
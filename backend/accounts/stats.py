@@ -0,0 +1,133 @@
+"""
+Denormalized customer dashboard counters.
+
+Each customer has one CustomerStats row (primary key = user id) holding the
+numbers the dashboard shows. Rentals, wishlist items and donations adjust
+it with relative F() updates from the receivers in accounts.signals, so the
+dashboard is a single primary-key read however much history a customer has.
+`manage.py reconcile_customer_stats` recomputes the rows from the source
+tables and repairs any drift.
+"""
+from decimal import Decimal
+
+from django.apps import apps
+from django.db.models import Count, F, Q, Sum
+
+# Kept as plain strings so this module does not import the rent app
+ACTIVE_RENTAL_STATUSES = frozenset({'pending', 'approved', 'rented'})
+SPENT_RENTAL_STATUSES = frozenset({'approved', 'rented', 'returned_confirmed'})
+
+COUNTER_FIELDS = ('active_rentals', 'total_spent', 'wishlist_items', 'items_donated')
+
+
+def rental_delta(old_status, new_status, total_price):
+    """(active_rentals change, total_spent change) for one rental changing status"""
+    active = (new_status in ACTIVE_RENTAL_STATUSES) - (old_status in ACTIVE_RENTAL_STATUSES)
+    spent = (new_status in SPENT_RENTAL_STATUSES) - (old_status in SPENT_RENTAL_STATUSES)
+    return active, (total_price or Decimal('0')) * spent
+
+
+def rental_deltas(rentals, old_status, new_status):
+    """{customer_id: {field: change}} for a batch of rentals moving together"""
+    changes = {}
+    for rental in rentals:
+        active, spent = rental_delta(old_status, new_status, rental.total_price)
+        if not active and not spent:
+            continue
+        change = changes.setdefault(rental.customer_id, {'active_rentals': 0, 'total_spent': Decimal('0')})
+        change['active_rentals'] += active
+        change['total_spent'] += spent
+    return changes
+
+
+def adjust(customer_id, **changes):
+    """
+    Add changes to the customer's counters. Customers without a row yet are
+    skipped; their row is computed in full on first read (see for_customer).
+    """
+    changes = {field: value for field, value in changes.items() if value}
+    if not changes:
+        return
+    CustomerStats = apps.get_model('accounts', 'CustomerStats')
+    CustomerStats.objects.filter(pk=customer_id).update(
+        **{field: F(field) + value for field, value in changes.items()}
+    )
+
+
+def adjust_many(changes):
+    for customer_id, change in changes.items():
+        adjust(customer_id, **change)
+
+
+def for_customer(customer_id):
+    """The customer's CustomerStats row, computed and stored if it does not exist yet"""
+    CustomerStats = apps.get_model('accounts', 'CustomerStats')
+    stats = CustomerStats.objects.filter(pk=customer_id).first()
+    if stats is None:
+        recompute([customer_id], include_all_roles=True)
+        stats = CustomerStats.objects.get(pk=customer_id)
+    return stats
+
+
+def compute(customer_ids=None, include_all_roles=False):
+    """{customer_id: {field: value}} recomputed from rentals, wishlists and donations"""
+    User = apps.get_model('accounts', 'User')
+    Rental = apps.get_model('rent', 'Rental')
+    Wishlist = apps.get_model('accounts', 'Wishlist')
+    Donation = apps.get_model('donations', 'Donation')
+
+    customers = User.objects.all() if include_all_roles else User.objects.filter(role=User.UserRoles.CUSTOMER)
+    if customer_ids is not None:
+        customers = customers.filter(id__in=customer_ids)
+    stats = {
+        customer_id: {'active_rentals': 0, 'total_spent': Decimal('0'), 'wishlist_items': 0, 'items_donated': 0}
+        for customer_id in customers.values_list('id', flat=True).iterator()
+    }
+
+    rentals = Rental.objects.filter(customer_id__in=list(stats)).values('customer_id').annotate(
+        active=Count('id', filter=Q(status__in=ACTIVE_RENTAL_STATUSES)),
+        spent=Sum('total_price', filter=Q(status__in=SPENT_RENTAL_STATUSES)),
+    ).order_by()
+    for row in rentals:
+        stats[row['customer_id']]['active_rentals'] = row['active']
+        stats[row['customer_id']]['total_spent'] = row['spent'] or Decimal('0')
+
+    for model, field in ((Wishlist, 'wishlist_items'), (Donation, 'items_donated')):
+        rows = model.objects.filter(customer_id__in=list(stats)).values('customer_id').annotate(
+            total=Count('id')
+        ).order_by()
+        for row in rows:
+            stats[row['customer_id']][field] = row['total']
+    return stats
+
+
+def recompute(customer_ids=None, include_all_roles=False):
+    """
+    Write freshly computed counters for the given customers (all when None).
+    Returns {customer_id: {field: (stored, actual)}} for the rows that drifted.
+    """
+    CustomerStats = apps.get_model('accounts', 'CustomerStats')
+    actual = compute(customer_ids, include_all_roles)
+    stored = CustomerStats.objects.in_bulk(list(actual))
+
+    drift = {}
+    to_create, to_update = [], []
+    for customer_id, values in actual.items():
+        row = stored.get(customer_id)
+        if row is None:
+            to_create.append(CustomerStats(user_id=customer_id, **values))
+            drift[customer_id] = {field: (None, value) for field, value in values.items()}
+            continue
+        changed = {
+            field: (getattr(row, field), value)
+            for field, value in values.items() if getattr(row, field) != value
+        }
+        if changed:
+            drift[customer_id] = changed
+            for field, value in values.items():
+                setattr(row, field, value)
+            to_update.append(row)
+
+    CustomerStats.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+    CustomerStats.objects.bulk_update(to_update, COUNTER_FIELDS, batch_size=500)
+    return drift
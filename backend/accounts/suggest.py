@@ -0,0 +1,309 @@
+"""
+In-process type-ahead index for catalogue suggestions.
+
+Item names, categories (from Clothing) and store names (from User) are
+kept in per-kind tries. Every word start of a label is inserted, so
+"silk" finds "Red Silk Saree". Each trie node caches its top completions
+(by how many listings share the label), and a change only invalidates the
+caches on the paths it touches. The keystroke path is therefore a walk of
+len(prefix) nodes plus a cached list slice, and never touches the database.
+
+The index is loaded from the database on first use and lives per process.
+The Clothing/User signals in accounts.signals compare each saved row with
+its labels as loaded, and only a real label change is recorded: the writing
+transaction bumps the shared "suggestions" SharedVersion row and logs the
+change as a SuggestionChange under the new version. This process applies it
+to its tries once the transaction commits, so a rolled-back save leaves
+nothing behind. Every process compares the shared version with its own at
+most once per CHECK_INTERVAL and replays the changes logged in between, so
+suggestions in other workers lag a write by about CHECK_INTERVAL seconds.
+Only a process that has fallen behind the trimmed log (LOG_LENGTH changes)
+reloads everything.
+"""
+import re
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import F
+
+MAX_SUGGESTIONS = 20
+VERSION_NAME = 'suggestions'
+CHECK_INTERVAL = 1.0  # seconds between shared version checks per process
+LOG_LENGTH = 10000  # changes kept for other processes to replay
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    return _SPACE_RE.sub(' ', (text or '').strip().lower())
+
+
+class _Node:
+    __slots__ = ('children', 'labels', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.labels = set()
+        self.top = None
+
+
+class PrefixIndex:
+    """Trie of labels weighted by how many sources reference them"""
+
+    def __init__(self):
+        self._root = _Node()
+        self._sources = {}  # source id -> normalized label
+        self._labels = {}   # normalized label -> [display text, source count]
+
+    def __len__(self):
+        return len(self._labels)
+
+    def label(self, source_id):
+        """The normalized label source_id currently points at (None if absent)"""
+        return self._sources.get(source_id)
+
+    def set(self, source_id, text):
+        """Point source_id at text (None/blank removes it)"""
+        key = normalize(text)
+        current = self._sources.get(source_id)
+        if current == key:
+            return
+        if current is not None:
+            self.remove(source_id)
+        if not key:
+            return
+        self._sources[source_id] = key
+        entry = self._labels.get(key)
+        if entry is None:
+            self._labels[key] = [text.strip(), 1]
+            for suffix in self._suffixes(key):
+                self._path(suffix, create=True)[-1].labels.add(key)
+        else:
+            entry[1] += 1
+        self._invalidate(key)
+
+    def remove(self, source_id):
+        key = self._sources.pop(source_id, None)
+        if key is None:
+            return
+        entry = self._labels[key]
+        entry[1] -= 1
+        self._invalidate(key)
+        if entry[1] > 0:
+            return
+        del self._labels[key]
+        for suffix in self._suffixes(key):
+            path = self._path(suffix)
+            path[-1].labels.discard(key)
+            # Prune nodes that no longer lead anywhere
+            for depth in range(len(suffix), 0, -1):
+                node = path[depth]
+                if node.labels or node.children:
+                    break
+                del path[depth - 1].children[suffix[depth - 1]]
+
+    def suggest(self, prefix, limit):
+        node = self._root
+        for char in normalize(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [
+            {'text': self._labels[key][0], 'count': self._labels[key][1]}
+            for key in self._top(node)[:limit]
+        ]
+
+    @staticmethod
+    def _suffixes(key):
+        """The label itself plus every suffix starting at a word boundary"""
+        yield key
+        for index, char in enumerate(key):
+            if char == ' ' and index + 1 < len(key):
+                yield key[index + 1:]
+
+    def _path(self, text, create=False):
+        path = [self._root]
+        node = self._root
+        for char in text:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    break
+                child = node.children[char] = _Node()
+            node = child
+            path.append(node)
+        return path
+
+    def _invalidate(self, key):
+        for suffix in self._suffixes(key):
+            for node in self._path(suffix):
+                node.top = None
+
+    def _rank(self, key):
+        return (-self._labels[key][1], key)
+
+    def _top(self, node):
+        if node.top is None:
+            candidates = set(node.labels)
+            for child in node.children.values():
+                candidates.update(self._top(child))
+            node.top = sorted(candidates, key=self._rank)[:MAX_SUGGESTIONS]
+        return node.top
+
+
+def shared_version():
+    from .models import SharedVersion
+
+    return SharedVersion.objects.filter(pk=VERSION_NAME).values_list('version', flat=True).first() or 0
+
+
+def bump_version():
+    """Count a catalogue change for every process; call inside the writing transaction. Returns the new version."""
+    from .models import SharedVersion
+
+    versions = SharedVersion.objects.filter(pk=VERSION_NAME)
+    if not versions.update(version=F('version') + 1):
+        SharedVersion.objects.bulk_create([SharedVersion(name=VERSION_NAME)], ignore_conflicts=True)
+        versions.update(version=F('version') + 1)
+    return versions.values_list('version', flat=True).get()
+
+
+def clothing_labels(clothing):
+    """Normalized (item name, category) of a Clothing instance, or None if either field is deferred"""
+    values = clothing.__dict__
+    if 'item_name' not in values or 'category' not in values:
+        return None
+    return normalize(values['item_name']), normalize(values['category'])
+
+
+def store_label(user):
+    """Normalized store name of a User ('' for non-stores), or None if a field it needs is deferred"""
+    values = user.__dict__
+    if 'store_name' not in values or 'role' not in values:
+        return None
+    return normalize(values['store_name']) if values['role'] == user.UserRoles.STORE else ''
+
+
+class SuggestionIndex:
+    """Item name, store name and category tries behind one lock"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget the loaded tries; the next suggest() reloads them"""
+        with self._lock:
+            self.items = PrefixIndex()
+            self.stores = PrefixIndex()
+            self.categories = PrefixIndex()
+            self.built = False
+            self.version = None
+            self.checked_at = None
+
+    def ensure_built(self):
+        """Load the tries on first use, and catch up with changes other processes made since"""
+        now = time.monotonic()
+        if self.built and now - self.checked_at < CHECK_INTERVAL:
+            return
+        with self._lock:
+            if self.built and now - self.checked_at < CHECK_INTERVAL:
+                return
+            version = shared_version()
+            self.checked_at = now
+            if self.built and version == self.version:
+                return
+            if not (self.built and self._replay(version)):
+                self._load(version)
+
+    def _load(self, version):
+        from .models import Clothing, User
+
+        # version is read before loading, so a change made during the load is replayed at the next check
+        items, stores, categories = PrefixIndex(), PrefixIndex(), PrefixIndex()
+        for pk, item_name, category in Clothing.objects.values_list('id', 'item_name', 'category').iterator():
+            items.set(pk, item_name)
+            categories.set(pk, category)
+        store_rows = User.objects.filter(role=User.UserRoles.STORE, store_name__isnull=False)
+        for pk, store_name in store_rows.values_list('id', 'store_name').iterator():
+            stores.set(pk, store_name)
+        self.items, self.stores, self.categories = items, stores, categories
+        self.version = version
+        self.built = True
+
+    def _replay(self, version):
+        """Apply the logged changes after self.version up to version; False if some were trimmed"""
+        from .models import SuggestionChange
+
+        changes = list(
+            SuggestionChange.objects.filter(version__gt=self.version, version__lte=version)
+            .order_by('version').values_list('kind', 'source_id', 'text', 'category')
+        )
+        if len(changes) != version - self.version:
+            return False
+        for change in changes:
+            self._apply(*change)
+        self.version = version
+        return True
+
+    def _apply(self, kind, source_id, text, category):
+        if kind == 'store':
+            self.stores.set(source_id, text)
+        else:
+            self.items.set(source_id, text)
+            self.categories.set(source_id, category)
+
+    def clothing_changed(self, clothing, previous=None, created=False):
+        """Record a saved Clothing whose labels were `previous` (clothing_labels()) when loaded"""
+        if not created and previous is not None and previous == clothing_labels(clothing):
+            return
+        self._changed('clothing', clothing.pk, clothing.item_name, clothing.category)
+
+    def clothing_removed(self, clothing_id):
+        self._changed('clothing', clothing_id, None, None)
+
+    def store_changed(self, user, previous=None, created=False):
+        """Record a saved User whose store label was `previous` (store_label()) when loaded"""
+        before = '' if created else previous
+        if before is not None and before == store_label(user):
+            return
+        self._changed('store', user.pk, user.store_name if user.role == user.UserRoles.STORE else None, None)
+
+    def store_removed(self, user_id):
+        self._changed('store', user_id, None, None)
+
+    def _changed(self, kind, source_id, text, category):
+        """
+        Bump the shared version and log the change in the writing transaction,
+        then apply it to this process's tries once committed
+        """
+        from .models import SuggestionChange
+
+        version = bump_version()
+        SuggestionChange.objects.create(
+            version=version, kind=kind, source_id=source_id, text=text, category=category
+        )
+        if version % 1000 == 0:
+            SuggestionChange.objects.filter(version__lte=version - LOG_LENGTH).delete()
+
+        def on_commit():
+            with self._lock:
+                # Only when it is the next change; otherwise the next check replays them in order
+                if self.built and self.version == version - 1:
+                    self._apply(kind, source_id, text, category)
+                    self.version = version
+        transaction.on_commit(on_commit)
+
+    def suggest(self, prefix, limit=8):
+        self.ensure_built()
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+        with self._lock:
+            return {
+                'items': self.items.suggest(prefix, limit),
+                'stores': self.stores.suggest(prefix, limit),
+                'categories': self.categories.suggest(prefix, limit),
+            }
+
+
+suggestion_index = SuggestionIndex()
@@ -1,3 +1,594 @@
-from django.test import TestCase
+import base64
+import io
+import json
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from .models import User, Clothing, ClothingSize, CustomerStats, SuggestionChange, Wishlist
+from . import geo, rollups, search, stats, suggest
+from rent.models import Rental
+from rent import transitions
+from reviews.models import Review
+
+
+class CatalogueFixtureMixin:
+    """A store, a customer, reviewed and wishlisted items, and query counting"""
+
+    def setUp(self):
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', city='Kathmandu', is_store=True, is_verified=True
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+
+    def add_items(self, count):
+        for i in range(count):
+            clothing = Clothing.objects.create(
+                store=self.store, item_name=f'Item {i}', category='Casual', gender='Male',
+                size='S, M', condition='New', rental_price=100, stock_quantity=2
+            )
+            for rating in (3, 5):
+                rental = Rental.objects.create(
+                    customer=self.customer, store=self.store, clothing=clothing,
+                    rent_start_date=date.today(), rent_end_date=date.today(),
+                    total_price=100, status=Rental.Status.RETURNED_CONFIRMED
+                )
+                Review.objects.create(
+                    user=self.customer, clothing=clothing, rental=rental, rating=rating, comment='ok'
+                )
+            Wishlist.objects.create(customer=self.customer, clothing=clothing)
+
+    def count_queries(self, url, user=None):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def assert_constant_queries(self, url, user=None):
+        self.add_items(2)
+        small, _ = self.count_queries(url, user)
+        self.add_items(8)
+        large, response = self.count_queries(url, user)
+        self.assertEqual(small, large, f'{url} issues per-item queries')
+        return large, response
+
+
+class ClothingQueryCountTests(CatalogueFixtureMixin, APITestCase):
+    """
+    Clothing list/detail endpoints must run a constant number of queries
+    no matter how many items or reviews they return.
+    """
+
+    def test_all_clothing_list(self):
+        queries, response = self.assert_constant_queries('/api/accounts/clothing/all/')
+        self.assertEqual(queries, 1)
+        self.assertEqual(response.data[0]['average_rating'], 4.0)
+        self.assertEqual(response.data[0]['review_count'], 2)
+
+    def test_all_clothing_list_paginated(self):
+        queries, response = self.assert_constant_queries('/api/accounts/clothing/all/?page_size=5')
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_store_clothing_list(self):
+        queries, _ = self.assert_constant_queries('/api/accounts/clothing/my/', self.store)
+        self.assertEqual(queries, 1)
+
+    def test_wishlist_list(self):
+        queries, response = self.assert_constant_queries('/api/accounts/wishlist/', self.customer)
+        self.assertEqual(queries, 2)  # wishlist rows + prefetched sizes
+        self.assertEqual(response.data['count'], 10)
+
+    def test_clothing_detail(self):
+        self.add_items(1)
+        clothing = Clothing.objects.first()
+        queries, response = self.count_queries(f'/api/accounts/clothing/{clothing.id}/')
+        self.assertEqual(queries, 2)  # item + sizes
+        self.assertEqual(response.data['average_rating'], 4.0)
+
+    def test_rental_lists(self):
+        customer_queries, _ = self.assert_constant_queries('/api/rentals/my/', self.customer)
+        store_queries, _ = self.count_queries('/api/rentals/store/', self.store)
+        self.assertEqual(customer_queries, 1)
+        self.assertEqual(store_queries, 1)
+
+
+class KeysetCursorPaginationTests(APITestCase):
+    """Cursor pages over (created_at, id) neither skip nor repeat rows"""
+
+    URL = '/api/accounts/clothing/all/'
+
+    def setUp(self):
+        store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', is_store=True, is_verified=True
+        )
+        self.items = [
+            Clothing.objects.create(
+                store=store, item_name=f'Item {i}', category='Casual', gender='Male',
+                size='M', condition='New', rental_price=100, stock_quantity=1
+            )
+            for i in range(7)
+        ]
+
+    def set_created_at(self, moments):
+        for clothing, moment in zip(self.items, moments):
+            Clothing.objects.filter(pk=clothing.pk).update(created_at=moment)
+
+    def walk(self, url, direction):
+        """Follow next/previous links from url; returns the ids of every page in order"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([item['id'] for item in response.data['results']])
+            url = response.data[direction]
+        return pages
+
+    def expected_order(self):
+        return list(Clothing.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_round_trip(self):
+        now = timezone.now()
+        # Three items share a timestamp, so pages have to break ties on id
+        self.set_created_at([now - timedelta(minutes=minutes) for minutes in (6, 5, 4, 4, 4, 2, 1)])
+        forward = self.walk(f'{self.URL}?page_size=3', 'next')
+        self.assertEqual([len(page) for page in forward], [3, 3, 1])
+        self.assertEqual(sum(forward, []), self.expected_order())
+
+        last_page = self.client.get(f'{self.URL}?page_size=3').data['next']
+        last_page = self.client.get(last_page).data['next']
+        backward = self.walk(last_page, 'previous')
+        self.assertEqual(backward, forward[::-1])
+
+    def test_all_rows_tied(self):
+        self.set_created_at([timezone.now()] * len(self.items))
+        pages = self.walk(f'{self.URL}?page_size=2', 'next')
+        self.assertEqual(sum(pages, []), sorted((item.id for item in self.items), reverse=True))
+
+    def test_invalid_cursor(self):
+        def cursor(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        for token in ('not-a-cursor', cursor({'p': [1], 'r': False}), cursor({'p': ['yesterday', 1], 'r': False})):
+            self.assertEqual(self.client.get(f'{self.URL}?cursor={token}').status_code, 404, token)
+
+
+class GeoTests(APITestCase):
+    """Geohash encoding, prefix covering and haversine distance behind radius search"""
+
+    def add_store(self, name, latitude, longitude):
+        return User.objects.create_user(
+            email=f'{name.lower()}@example.com', password='password123', name=name, store_name=name,
+            is_store=True, is_verified=True, latitude=latitude, longitude=longitude
+        )
+
+    def test_encode_geohash(self):
+        self.assertEqual(geo.encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo.encode_geohash(57.64911, 10.40744), 'u4pruydqq')
+        self.assertEqual(self.add_store('Thamel', 27.7154, 85.3123).geohash, geo.encode_geohash(27.7154, 85.3123))
+
+    def test_covering_cells_cover_the_box(self):
+        box = geo.bounding_box(27.7172, 85.3240, 5)
+        cells = geo.covering_cells(box)
+        self.assertTrue(0 < len(cells) <= geo.MAX_COVERING_CELLS)
+        min_lat, max_lat, min_lng, max_lng = box
+        for step_lat in range(11):
+            for step_lng in range(11):
+                point = geo.encode_geohash(
+                    min_lat + (max_lat - min_lat) * step_lat / 10, min_lng + (max_lng - min_lng) * step_lng / 10
+                )
+                self.assertTrue(any(point.startswith(cell) for cell in cells), point)
+        # Bigger areas fall back to coarser prefixes
+        coarse = geo.covering_cells(geo.bounding_box(27.7, 85.3, 2000))
+        self.assertTrue(coarse and max(map(len, coarse)) < min(map(len, cells)))
+
+    def test_haversine_distance(self):
+        self.add_store('Equator', 0, 1)
+        distance = User.objects.annotate(distance_km=geo.distance_expression(0, 0)).get().distance_km
+        self.assertAlmostEqual(distance, 111.195, places=2)
+
+    def test_nearby_stores(self):
+        self.add_store('Thamel', 27.7154, 85.3123)    # ~1.1 km from the origin
+        self.add_store('Patan', 27.6727, 85.3240)     # ~5 km
+        self.add_store('Pokhara', 28.2096, 83.9856)   # ~140 km
+        response = self.client.get('/api/accounts/stores/nearby/?lat=27.7172&lng=85.3240&radius_km=10')
+        self.assertEqual([store['store_name'] for store in response.data['data']], ['Thamel', 'Patan'])
+        distances = [store['distance_km'] for store in response.data['data']]
+        self.assertEqual(distances, sorted(distances))
+        self.assertEqual(
+            self.client.get('/api/accounts/stores/nearby/?lat=91&lng=85').status_code, 400
+        )
+
+        # Without covering cells the lat/lng bounding box alone does the prefiltering
+        with mock.patch.object(geo, 'covering_cells', return_value=[]):
+            nearby = User.objects.filter(geo.nearby_filter(27.7172, 85.3240, 10))
+            self.assertEqual(set(nearby.values_list('store_name', flat=True)), {'Thamel', 'Patan'})
+
+
+class ClothingRadiusSearchTests(APITestCase):
+    """AllClothingListView ?lat=&lng=&radius_km= keeps nearby items, nearest first"""
+
+    URL = '/api/accounts/clothing/all/'
+    ORIGIN = 'lat=27.7172&lng=85.3240'
+
+    def setUp(self):
+        for name, latitude, longitude in (
+            ('Patan', 27.6727, 85.3240),     # ~5 km from the origin
+            ('Thamel', 27.7154, 85.3123),    # ~1.1 km
+            ('Pokhara', 28.2096, 83.9856),   # ~140 km
+            ('Nowhere', None, None),         # no location set
+        ):
+            store = User.objects.create_user(
+                email=f'{name.lower()}@example.com', password='password123', name=name, store_name=name,
+                is_store=True, is_verified=True, latitude=latitude, longitude=longitude
+            )
+            for i in range(2):
+                Clothing.objects.create(
+                    store=store, item_name=f'{name} {i}', category='Casual', gender='Female',
+                    size='M', condition='New', rental_price=100, stock_quantity=1
+                )
+
+    def test_radius_filter_and_distance_order(self):
+        response = self.client.get(f'{self.URL}?{self.ORIGIN}&radius_km=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['store_name'] for item in response.data], ['Thamel'] * 2 + ['Patan'] * 2)
+        distances = [item['distance_km'] for item in response.data]
+        self.assertEqual(distances, sorted(distances))
+        self.assertAlmostEqual(distances[0], 1.2, delta=0.2)
+        self.assertAlmostEqual(distances[-1], 4.96, delta=0.2)
+
+        wide = self.client.get(f'{self.URL}?{self.ORIGIN}&radius_km=200')
+        self.assertEqual(wide.data[-1]['store_name'], 'Pokhara')
+        self.assertEqual(len(wide.data), 6)
+
+    def test_radius_search_pages_by_distance(self):
+        first = self.client.get(f'{self.URL}?{self.ORIGIN}&radius_km=200&page_size=4').data
+        second = self.client.get(first['next']).data
+        names = [item['store_name'] for item in first['results'] + second['results']]
+        self.assertEqual(names, ['Thamel'] * 2 + ['Patan'] * 2 + ['Pokhara'] * 2)
+        self.assertIsNone(second['next'])
+
+    def test_invalid_coordinates(self):
+        for query in ('lat=abc&lng=85', 'lat=27.7', 'lat=95&lng=85', 'lat=27.7&lng=85.3&radius_km=-1'):
+            response = self.client.get(f'{self.URL}?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+class CatalogueSearchTests(APITestCase):
+    """?q= full-text search ranks in SQL and honours the other filters for every match"""
+
+    URL = '/api/accounts/clothing/all/'
+
+    def setUp(self):
+        self.stores = {
+            city: User.objects.create_user(
+                email=f'{city.lower()}@example.com', password='password123', name=city,
+                store_name=f'{city} Store', city=city, is_store=True, is_verified=True
+            )
+            for city in ('Kathmandu', 'Pokhara')
+        }
+
+    def add(self, city, item_name, description='', **fields):
+        return Clothing.objects.create(
+            store=self.stores[city], item_name=item_name, description=description, category='Traditional',
+            gender='Female', size='M', condition='New', rental_price=100, stock_quantity=1, **fields
+        )
+
+    def names(self, query):
+        response = self.client.get(f'{self.URL}?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [item['item_name'] for item in response.data]
+
+    def test_ranking_and_prefix(self):
+        self.add('Kathmandu', 'Blue Lehenga', 'Goes well with a silk saree')
+        self.add('Kathmandu', 'Silk Saree')
+        self.add('Kathmandu', 'Party Gown')
+        self.assertEqual(self.names('q=saree'), ['Silk Saree', 'Blue Lehenga'])
+        self.assertEqual(self.names('q=sar'), ['Silk Saree', 'Blue Lehenga'])
+        self.assertEqual(self.names('q=silk%20gown'), [])
+        self.assertEqual(self.names('q=%2B%2B'), [])  # no searchable words
+
+    def test_filters_apply_to_every_match(self):
+        Clothing.objects.bulk_create([
+            Clothing(store=self.stores['Kathmandu'], item_name=f'Saree {i}', category='Traditional',
+                     gender='Female', size='M', condition='New', rental_price=100)
+            for i in range(600)
+        ])
+        # Weakest match of them all: the word is only in the description
+        self.add('Pokhara', 'Blue Dress', 'Pairs with a saree shawl and a long list of other accessories')
+        call_command('rebuild_search_index', stdout=io.StringIO())
+
+        self.assertEqual(self.names('q=saree&city=Pokhara'), ['Blue Dress'])
+        self.assertEqual(len(self.names('q=saree')), 601)
+
+    def test_search_results_page_in_rank_order(self):
+        for i in range(5):
+            self.add('Kathmandu', f'Saree {i}', 'saree ' * i)
+        everything = self.client.get(f'{self.URL}?q=saree').data
+        pages, url = [], f'{self.URL}?q=saree&page_size=2'
+        while url:
+            page = self.client.get(url).data
+            pages += page['results']
+            url = page['next']
+        self.assertEqual([item['id'] for item in pages], [item['id'] for item in everything])
+
+    def test_index_follows_edits(self):
+        clothing = self.add('Kathmandu', 'Silk Saree')
+        clothing.item_name = 'Velvet Gown'
+        clothing.save()
+        self.assertEqual(self.names('q=saree'), [])
+        self.assertEqual(self.names('q=velvet'), ['Velvet Gown'])
+        clothing.delete()
+        self.assertEqual(self.names('q=velvet'), [])
+        self.assertEqual(search.rebuild_index(), 0)
+
+
+class ClothingSizeTests(APITestCase):
+    """Per-size stock rows and the ?size= / preferred size filters"""
+
+    def setUp(self):
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', city='Kathmandu', is_store=True, is_verified=True
+        )
+
+    def add(self, item_name, size, stock_quantity=3, size_stock=None):
+        clothing = Clothing.objects.create(
+            store=self.store, item_name=item_name, category='Casual', gender='Male',
+            size=size, condition='New', rental_price=100, stock_quantity=stock_quantity
+        )
+        clothing.sync_sizes(size_stock)
+        return clothing
+
+    def stock(self, clothing):
+        return dict(clothing.sizes.values_list('size', 'stock_quantity'))
+
+    def names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['item_name'] for item in response.data)
+
+    def test_new_sizes_share_the_unassigned_stock(self):
+        self.assertEqual(ClothingSize.parse_sizes('l / s, xs, free'), ['XS', 'S', 'L'])
+        clothing = self.add('Shirt', 'S, M, L', stock_quantity=5)
+        self.assertEqual(self.stock(clothing), {'S': 2, 'M': 2, 'L': 1})
+
+        clothing.size = 'S, M, L, XL'
+        clothing.stock_quantity = 7
+        clothing.sync_sizes({'S': 1})
+        self.assertEqual(self.stock(clothing), {'S': 1, 'M': 2, 'L': 1, 'XL': 3})
+
+    def test_stock_edits_keep_sizes_and_total_in_step(self):
+        self.client.force_authenticate(self.store)
+        response = self.client.post('/api/accounts/clothing/create/', {
+            'item_name': 'Shirt', 'category': 'Casual', 'gender': 'Male', 'size': 'S, M',
+            'condition': 'New', 'rental_price': 100, 'stock_quantity': 2,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        clothing = Clothing.objects.get()
+        self.assertEqual(self.stock(clothing), {'S': 1, 'M': 1})
+
+        def update(data):
+            response = self.client.patch(f'/api/accounts/clothing/{clothing.id}/update/', data, format='json')
+            self.assertEqual(response.status_code, 200, response.data)
+            clothing.refresh_from_db()
+            return clothing.stock_quantity, self.stock(clothing)
+
+        self.assertEqual(update({'stock_quantity': 10}), (10, {'S': 5, 'M': 5}))
+        self.assertEqual(self.names('/api/accounts/clothing/all/?size=S'), ['Shirt'])
+        self.assertEqual(update({'size_stock': {'S': 7}}), (12, {'S': 7, 'M': 5}))
+        self.assertEqual(update({'stock_quantity': 4}), (4, {'S': 2, 'M': 2}))
+        self.assertEqual(update({'size': 'S, M, L', 'stock_quantity': 7}), (7, {'S': 2, 'M': 2, 'L': 3}))
+        self.assertEqual(update({'stock_quantity': 0}), (0, {'S': 0, 'M': 0, 'L': 0}))
+        self.assertEqual(clothing.clothing_status, 'Unavailable')
+
+    def test_size_filter_skips_sizes_out_of_stock(self):
+        self.add('Shirt', 'S, M', size_stock={'S': 1, 'M': 0})
+        self.add('Jacket', 'M, L')
+        self.assertEqual(self.names('/api/accounts/clothing/all/?size=M'), ['Jacket'])
+        self.assertEqual(self.names('/api/accounts/clothing/all/?size=s,l'), ['Jacket', 'Shirt'])
+        self.assertEqual(self.client.get('/api/accounts/clothing/all/?size=huge').status_code, 400)
+
+        customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer',
+            preferred_clothing_size='S', is_verified=True
+        )
+        self.client.force_authenticate(customer)
+        self.assertEqual(self.names('/api/accounts/clothing/my-size/'), ['Shirt'])
+
+
+class SuggestionIndexTests(APITestCase):
+    """Type-ahead suggestions follow committed changes only, in every process"""
+
+    URL = '/api/accounts/clothing/suggest/'
+
+    def setUp(self):
+        suggest.suggestion_index.invalidate()
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Saree House', city='Kathmandu', is_store=True, is_verified=True
+        )
+
+    def add(self, item_name):
+        return Clothing.objects.create(
+            store=self.store, item_name=item_name, category='Traditional', gender='Female',
+            size='M', condition='New', rental_price=100, stock_quantity=1
+        )
+
+    def suggestions(self, prefix, kind='items'):
+        response = self.client.get(f'{self.URL}?prefix={prefix}')
+        self.assertEqual(response.status_code, 200)
+        return [(entry['text'], entry['count']) for entry in response.data[kind]]
+
+    @staticmethod
+    def texts(index, prefix):
+        return [entry['text'] for entry in index.suggest(prefix)['items']]
+
+    def test_suggests_items_stores_and_categories(self):
+        self.add('Silk Saree')
+        self.add('Silk Saree')
+        self.add('Satin Gown')
+        self.assertEqual(self.suggestions('sa'), [('Silk Saree', 2), ('Satin Gown', 1)])
+        self.assertEqual(self.suggestions('saree', 'stores'), [('Saree House', 1)])
+        self.assertEqual(self.suggestions('trad', 'categories'), [('Traditional', 3)])
+
+    def test_changes_apply_on_commit(self):
+        self.suggestions('a')  # build the index
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.add('Velvet Gown')
+        self.assertEqual(self.suggestions('velvet'), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.suggestions('velvet'), [('Velvet Gown', 1)])
+
+    def test_rolled_back_changes_never_show(self):
+        self.suggestions('a')
+        with self.captureOnCommitCallbacks():  # discarded, as on rollback
+            self.add('Velvet Gown')
+        self.assertEqual(self.suggestions('velvet'), [])
+
+    def test_other_processes_replay_changes(self):
+        saree = self.add('Silk Saree')
+        other = suggest.SuggestionIndex()
+        self.assertEqual(self.texts(other, 'silk'), ['Silk Saree'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add('Silk Shawl')
+            saree.item_name = 'Silk Lehenga'
+            saree.save()
+            self.store.store_name = 'Silk House'
+            self.store.save()
+        # Not rechecked within CHECK_INTERVAL
+        self.assertEqual(self.texts(other, 'silk'), ['Silk Saree'])
+        other.checked_at -= suggest.CHECK_INTERVAL
+        with mock.patch.object(other, '_load') as load, self.assertNumQueries(2):
+            other.ensure_built()
+        load.assert_not_called()
+        self.assertEqual(self.texts(other, 'silk'), ['Silk Lehenga', 'Silk Shawl'])
+        self.assertEqual([entry['text'] for entry in other.suggest('silk')['stores']], ['Silk House'])
+
+    def test_trimmed_log_falls_back_to_a_reload(self):
+        self.add('Silk Saree')
+        other = suggest.SuggestionIndex()
+        other.ensure_built()
+        self.add('Silk Shawl')
+        SuggestionChange.objects.all().delete()
+        other.checked_at -= suggest.CHECK_INTERVAL
+        self.assertEqual(self.texts(other, 'silk'), ['Silk Saree', 'Silk Shawl'])
+
+    def test_unchanged_labels_do_not_bump_the_version(self):
+        clothing = self.add('Silk Saree')
+        version = suggest.shared_version()
+        for price in range(150, 155):
+            clothing.rental_price = price
+            clothing.save()
+        Clothing.objects.get(pk=clothing.pk).save()
+        self.store.city = 'Pokhara'
+        self.store.save()
+        self.store.last_login = timezone.now()
+        self.store.save(update_fields=['last_login'])
+        self.assertEqual(suggest.shared_version(), version)
+
+
+class CustomerStatsTests(CatalogueFixtureMixin, APITestCase):
+    """The customer dashboard reads one CustomerStats row kept current by signals"""
+
+    def assert_in_sync(self):
+        row = CustomerStats.objects.get(pk=self.customer.pk)
+        actual = stats.compute([self.customer.pk])[self.customer.pk]
+        self.assertEqual({field: getattr(row, field) for field in stats.COUNTER_FIELDS}, actual)
+
+    def test_dashboard_stats(self):
+        queries, response = self.assert_constant_queries('/api/accounts/dashboard/stats/', self.customer)
+        self.assertEqual(queries, 1)
+        self.assertEqual(response.data['data']['wishlist_items'], 10)
+        self.assertEqual(response.data['data']['total_spent'], 2000.0)
+        self.assert_in_sync()
+
+    def test_counters_follow_changes(self):
+        self.add_items(2)
+        rental = Rental.objects.first()
+        rental.status = Rental.Status.RENTED
+        rental.save()
+        self.assert_in_sync()
+        Wishlist.objects.filter(customer=self.customer).delete()
+        rental.delete()
+        self.assert_in_sync()
+        self.assertEqual(stats.recompute(), {})
+
+    def test_price_edits_follow_the_status(self):
+        self.add_items(1)
+        rental = Rental.objects.first()  # returned_confirmed, so counted as spent
+        rental.total_price = 250
+        rental.save()
+        self.assert_in_sync()
+        # Status and price changing in one save
+        rental = Rental.objects.get(pk=rental.pk)
+        rental.status, rental.total_price = Rental.Status.REJECTED, 400
+        rental.save()
+        self.assert_in_sync()
+        rental.total_price = 50
+        rental.save(update_fields=['total_price'])
+        self.assert_in_sync()
+        self.assertEqual(stats.recompute(), {})
+
+    def test_missing_row_is_computed_on_read(self):
+        self.add_items(1)
+        CustomerStats.objects.all().delete()
+        _, response = self.count_queries('/api/accounts/dashboard/stats/', self.customer)
+        self.assertEqual(response.data['data']['wishlist_items'], 1)
+        self.assert_in_sync()
+
+
+class StoreAnalyticsTests(CatalogueFixtureMixin, APITestCase):
+    """Store analytics come from incrementally maintained StoreDailyStats rollups"""
+
+    def book(self, clothing, count):
+        rentals = []
+        for _ in range(count):
+            rental = Rental.objects.create(
+                customer=self.customer, store=self.store, clothing=clothing,
+                rent_start_date=date.today(), rent_end_date=date.today(), total_price=100
+            )
+            transitions.record_created(rental, self.customer)
+            rentals.append(rental)
+        return list(Rental.objects.filter(id__in=[r.id for r in rentals]).select_related('clothing', 'store', 'customer'))
+
+    def test_rollup_is_incremental(self):
+        clothing = Clothing.objects.create(
+            store=self.store, item_name='Saree', category='Casual', gender='Female',
+            size='M', condition='New', rental_price=100, stock_quantity=5
+        )
+        rentals = self.book(clothing, 3)
+        transitions.transition_many(rentals[:2], Rental.Status.APPROVED, self.store)
+        transitions.transition(rentals[2], Rental.Status.REJECTED, self.store)
+        self.assertEqual(rollups.rollup()['events'], 6)
+        self.assertEqual(rollups.rollup()['events'], 0)
+        transitions.transition_many(self.book(clothing, 1), Rental.Status.APPROVED, self.store)
+        self.assertEqual(rollups.rollup()['events'], 2)
+
+        self.client.force_authenticate(self.store)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/accounts/dashboard/store/analytics/')
+        self.assertEqual(len(ctx.captured_queries), 1)
+        data = response.data['data']
+        self.assertEqual(data['totals']['rental_requests'], 4)
+        self.assertEqual(data['totals']['rentals_approved'], 3)
+        self.assertEqual(data['totals']['revenue'], 300)
+        self.assertEqual(data['totals']['rejection_rate'], 0.25)
+        self.assertEqual(data['totals']['utilization'], 0.6)
+        self.assertEqual(data['top_items'][0]['item_name'], 'Saree')
+
+    def test_customers_are_forbidden(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get('/api/accounts/dashboard/store/analytics/').status_code, 403)
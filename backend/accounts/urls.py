@@ -6,6 +6,7 @@ from .views import (
     VerifyOTPView,
     ProfileView,
     StoreDashboardView,
+    StoreAnalyticsView,
     CustomerProfileView,
     StoreProfileView,
     ClothingCreateView,
@@ -15,6 +16,8 @@ from .views import (
     ClothingDeleteView,
     ClothingStatusUpdateView,
     AllClothingListView,
+    MySizeClothingListView,
+    ClothingSuggestView,
     WishlistListView,
     WishlistAddView,
     WishlistRemoveView,
@@ -38,6 +41,7 @@ urlpatterns = [
     # Legacy Endpoints
     path("profile/", ProfileView.as_view(), name="profile"),
     path("dashboard/store/", StoreDashboardView.as_view(), name="store-dashboard"),
+    path("dashboard/store/analytics/", StoreAnalyticsView.as_view(), name="store-analytics"),
     path("dashboard/stats/", CustomerDashboardStatsView.as_view(), name="customer-stats"),
     
     # Customer CRUD Endpoints
@@ -56,6 +60,8 @@ urlpatterns = [
     
     # CLOTHING - CUSTOMER
     path("clothing/all/", AllClothingListView.as_view(), name="all-clothing"),
+    path("clothing/my-size/", MySizeClothingListView.as_view(), name="my-size-clothing"),
+    path("clothing/suggest/", ClothingSuggestView.as_view(), name="clothing-suggest"),
     
     # WISHLIST ENDPOINTS
     path("wishlist/", WishlistListView.as_view(), name="wishlist-list"),
@@ -1,26 +1,30 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from django.db.models import Sum
-from django.apps import apps
+from django.utils import timezone
+from datetime import date, timedelta
 
-from .models import User, Clothing, Wishlist
+from .models import User, Clothing, ClothingSize, StoreDailyStats, Wishlist
 from .serializers import (
     CustomerRegisterSerializer, 
     CustomerReadSerializer,
     CustomerUpdateSerializer,
     StoreRegisterSerializer,
     StoreReadSerializer,
+    NearbyStoreSerializer,
     StoreUpdateSerializer,
     LoginSerializer, 
     UserSerializer,
     StoreDashboardSerializer,
     ClothingCreateSerializer,
     ClothingListSerializer,
+    NearbyClothingListSerializer,
     ClothingDetailSerializer,
     ClothingUpdateSerializer,
     ClothingStatusUpdateSerializer,
@@ -28,7 +32,12 @@ from .serializers import (
     WishlistDetailSerializer,
 )
 from .permissions import IsCustomer, IsStore
+from .pagination import ClothingCursorPagination
+from .geo import nearby_filter, distance_expression
+from .search import search_queryset
+from .suggest import suggestion_index
 from .otp import verify_otp
+from . import rollups, stats as customer_stats
 
 
 # Customer Register 
@@ -133,6 +142,43 @@ class StoreDashboardView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class StoreAnalyticsView(APIView):
+    """
+    GET /api/accounts/dashboard/store/analytics/?from=YYYY-MM-DD&to=YYYY-MM-DD
+    Revenue, utilization, top items, rejection rate and donation intake for
+    the authenticated store (defaults to the last 30 days). Reads only the
+    StoreDailyStats rollups written by `manage.py rollup_store_stats`.
+    """
+    permission_classes = [IsAuthenticated]
+    max_days = 366
+
+    def get(self, request):
+        if not request.user.is_store:
+            return Response(
+                {"error": "Only store owners can access this endpoint"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            end = date.fromisoformat(request.query_params['to']) if request.query_params.get('to') else timezone.localdate()
+            start = (
+                date.fromisoformat(request.query_params['from']) if request.query_params.get('from')
+                else end - timedelta(days=29)
+            )
+        except ValueError:
+            return Response({"error": "from and to must be dates as YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        if end < start:
+            return Response({"error": "to cannot be before from."}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days >= self.max_days:
+            return Response({"error": f"Date range cannot exceed {self.max_days} days."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = StoreDailyStats.objects.filter(store=request.user, day__range=(start, end)).order_by('day')
+        return Response({
+            "message": "Success",
+            "data": {"from": start, "to": end, **rollups.summarize(rows)}
+        }, status=status.HTTP_200_OK)
+
+
 class CustomerDashboardStatsView(APIView):
     """
     Get summary statistics for the authenticated customer dashboard
@@ -150,47 +196,46 @@ class CustomerDashboardStatsView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        user = request.user
-        
-        # We'll use apps.get_model to avoid potential circular imports
-        Rental = apps.get_model('rent', 'Rental')
-        Donation = apps.get_model('donations', 'Donation')
-        
-        # Statistics logic
-        active_status = ['pending', 'approved', 'rented', 'Pending', 'Approved', 'Rented']
-        spent_status = ['approved', 'rented', 'returned_confirmed', 'Approved', 'Rented', 'Returned Confirmed']
-        
-        active_rentals = Rental.objects.filter(
-            customer=user,
-            status__in=active_status
-        ).count()
-        
-        total_spent = Rental.objects.filter(
-            customer=user,
-            status__in=spent_status
-        ).aggregate(total=Sum('total_price'))['total'] or 0
-        
-        wishlist_items = Wishlist.objects.filter(customer=user).count()
-        
-        items_donated = Donation.objects.filter(customer=user).count()
+        # Counters are kept current by signals (see accounts.stats)
+        stats = customer_stats.for_customer(request.user.pk)
         
         return Response({
             "message": "Success",
             "data": {
-                "active_rentals": active_rentals,
-                "total_spent": float(total_spent),
-                "wishlist_items": wishlist_items,
-                "items_donated": items_donated
+                "active_rentals": stats.active_rentals,
+                "total_spent": float(stats.total_spent),
+                "wishlist_items": stats.wishlist_items,
+                "items_donated": stats.items_donated
             }
         }, status=status.HTTP_200_OK)
 
 
+def parse_geo_params(query_params, default_radius_km=10.0, max_radius_km=500.0):
+    """
+    Parse ?lat=&lng=&radius_km= from a request.
+    Returns None when no location was given, raises ValueError on bad input.
+    """
+    lat = query_params.get('lat')
+    lng = query_params.get('lng')
+    if lat in (None, '') and lng in (None, ''):
+        return None
+    lat, lng = float(lat), float(lng)
+    radius_km = float(query_params.get('radius_km') or default_radius_km)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius_km <= 0:
+        raise ValueError("Coordinates out of range")
+    return lat, lng, min(radius_km, max_radius_km)
+
+
 class NearbyStoresView(APIView):
     """
-    Get all stores that have set their location
+    Get stores that have set their location
     GET /api/accounts/stores/nearby/
+    Optional: ?lat=&lng=&radius_km=10&limit=20
+      -> only stores within radius_km, nearest first, each with distance_km
     """
     permission_classes = [AllowAny]
+    default_limit = 20
+    max_limit = 100
 
     def get(self, request):
         stores = User.objects.filter(
@@ -198,10 +243,35 @@ class NearbyStoresView(APIView):
             latitude__isnull=False,
             longitude__isnull=False
         )
-        serializer = StoreReadSerializer(stores, many=True, context={'request': request})
+
+        try:
+            location = parse_geo_params(request.query_params)
+            limit = int(request.query_params.get('limit') or self.default_limit)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "lat, lng, radius_km and limit must be valid numbers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if location is None:
+            serializer = StoreReadSerializer(stores, many=True, context={'request': request})
+            return Response({
+                "message": "Stores retrieved successfully",
+                "count": len(serializer.data),
+                "data": serializer.data
+            }, status=status.HTTP_200_OK)
+
+        lat, lng, radius_km = location
+        limit = max(1, min(limit, self.max_limit))
+        stores = stores.filter(nearby_filter(lat, lng, radius_km)).annotate(
+            distance_km=distance_expression(lat, lng)
+        ).filter(distance_km__lte=radius_km).order_by('distance_km', 'id')[:limit]
+
+        serializer = NearbyStoreSerializer(stores, many=True, context={'request': request})
         return Response({
             "message": "Stores retrieved successfully",
-            "count": stores.count(),
+            "count": len(serializer.data),
+            "radius_km": radius_km,
             "data": serializer.data
         }, status=status.HTTP_200_OK)
 
@@ -481,7 +551,7 @@ class StoreClothingListView(generics.ListAPIView):
 
     def get_queryset(self):
         """Return only clothing items belonging to the authenticated store"""
-        return Clothing.objects.filter(store=self.request.user)
+        return Clothing.objects.filter(store=self.request.user).for_listing()
 
     def list(self, request, *args, **kwargs):
         """Return list of clothing items"""
@@ -499,7 +569,7 @@ class ClothingDetailView(generics.RetrieveAPIView):
     permission_classes = [AllowAny]
     authentication_classes = []
     serializer_class = ClothingDetailSerializer
-    queryset = Clothing.objects.all()
+    queryset = Clothing.objects.for_listing().prefetch_related('sizes')
 
     def retrieve(self, request, *args, **kwargs):
         """Return clothing item details"""
@@ -577,7 +647,7 @@ class ClothingStatusUpdateView(generics.UpdateAPIView):
 
     def get_queryset(self):
         """Return only clothing items belonging to the authenticated store"""
-        return Clothing.objects.filter(store=self.request.user)
+        return Clothing.objects.filter(store=self.request.user).for_listing()
 
     def update(self, request, *args, **kwargs):
         """Update clothing status"""
@@ -601,15 +671,43 @@ class AllClothingListView(generics.ListAPIView):
     Browse All Available Clothing
     GET /api/accounts/clothing/all/
     Auth: Customer
+    Pagination (optional): ?page_size=<n>&cursor=<opaque cursor from next/previous>
+    Near me (optional): ?lat=&lng=&radius_km=10
+      -> only items from stores within radius_km, nearest first, each with distance_km
+    Search (optional): ?q=<text> -> full-text search, best match first
+      (the last word is matched as a prefix for type-ahead)
+    Size (optional): ?size=M or ?size=M,L -> only items with stock in one of those sizes
     """
     permission_classes = [AllowAny]
     authentication_classes = []
     serializer_class = ClothingListSerializer
+    pagination_class = ClothingCursorPagination
+
+    def get_location(self):
+        if not hasattr(self, '_location'):
+            try:
+                self._location = parse_geo_params(self.request.query_params)
+            except (TypeError, ValueError):
+                raise ValidationError({"error": "lat, lng and radius_km must be valid numbers"})
+        return self._location
+
+    def get_sizes(self):
+        """Sizes requested with ?size=, validated against XS..XXL"""
+        raw = self.request.query_params.get('size', '')
+        sizes = ClothingSize.parse_sizes(raw)
+        if raw.strip() and not sizes:
+            raise ValidationError({"error": f"size must be one of {', '.join(ClothingSize.Size.values)}"})
+        return sizes
+
+    def get_serializer_class(self):
+        if self.get_location() is not None:
+            return NearbyClothingListSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
         """Return all available clothing items"""
         # queryset = Clothing.objects.filter(clothing_status=Clothing.Status.AVAILABLE)
-        queryset = Clothing.objects.all() # Temporarily broaden to see all
+        queryset = Clothing.objects.for_listing() # Temporarily broaden to see all
         
         # Optional filters
         category = self.request.query_params.get('category', None)
@@ -617,6 +715,9 @@ class AllClothingListView(generics.ListAPIView):
         min_price = self.request.query_params.get('min_price', None)
         max_price = self.request.query_params.get('max_price', None)
         city = self.request.query_params.get('city', None)
+        min_rating = self.request.query_params.get('min_rating', None)
+        search = self.request.query_params.get('q', '').strip()
+        sizes = self.get_sizes()
         
         if category:
             queryset = queryset.filter(category=category)
@@ -628,16 +729,80 @@ class AllClothingListView(generics.ListAPIView):
             queryset = queryset.filter(rental_price__lte=max_price)
         if city:
             queryset = queryset.filter(store__city=city)
+        if min_rating:
+            try:
+                queryset = queryset.with_min_rating(float(min_rating))
+            except ValueError:
+                pass
+        if sizes:
+            queryset = queryset.in_size(sizes)
+        if search:
+            queryset = search_queryset(queryset, search)
+
+        location = self.get_location()
+        if location is not None:
+            # Store geohash/bounding-box prefilter + haversine in the same query
+            lat, lng, radius_km = location
+            queryset = queryset.filter(nearby_filter(lat, lng, radius_km, prefix='store__')).annotate(
+                distance_km=distance_expression(lat, lng, prefix='store__')
+            ).filter(distance_km__lte=radius_km).order_by('distance_km', '-id')
         
         return queryset
 
     def list(self, request, *args, **kwargs):
-        """Return list of available clothing items"""
+        """Return list of available clothing items (cursor-paginated when requested)"""
         queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True, context={'request': request})
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(queryset, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)   
 
 
+class MySizeClothingListView(AllClothingListView):
+    """
+    Browse Clothing In My Size
+    GET /api/accounts/clothing/my-size/
+    Auth: Customer
+    Same filters as /clothing/all/; ?size= defaults to the customer's
+    preferred_clothing_size (no size filter when none is set)
+    """
+    permission_classes = [IsAuthenticated, IsCustomer]
+    authentication_classes = [JWTAuthentication]
+
+    def get_sizes(self):
+        if self.request.query_params.get('size', '').strip():
+            return super().get_sizes()
+        return ClothingSize.parse_sizes(self.request.user.preferred_clothing_size)
+
+
+class ClothingSuggestView(APIView):
+    """
+    Type-ahead suggestions for catalogue search
+    GET /api/accounts/clothing/suggest/?prefix=<text>&limit=8
+    Served from the in-process prefix index; the only query per keystroke is the
+    throttled check of the shared index version (see accounts.suggest)
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        prefix = request.query_params.get('prefix', '')
+        try:
+            limit = int(request.query_params.get('limit') or 8)
+        except ValueError:
+            limit = 8
+
+        if not prefix.strip():
+            return Response({"prefix": prefix, "items": [], "stores": [], "categories": []},
+                            status=status.HTTP_200_OK)
+
+        return Response({"prefix": prefix, **suggestion_index.suggest(prefix, limit)},
+                        status=status.HTTP_200_OK)
+
+
 class WishlistListView(generics.ListAPIView):
     """
     Get Customer's Wishlist
@@ -650,16 +815,19 @@ class WishlistListView(generics.ListAPIView):
 
     def get_queryset(self):
         """Return wishlist items for authenticated customer"""
-        return Wishlist.objects.filter(customer=self.request.user).select_related('clothing', 'clothing__store')
+        return Wishlist.objects.filter(customer=self.request.user).select_related(
+            'customer', 'clothing', 'clothing__store'
+        ).prefetch_related('clothing__sizes')
 
     def list(self, request, *args, **kwargs):
         """Return list of wishlist items"""
         queryset = self.get_queryset()
         serializer = self.get_serializer(queryset, many=True, context={'request': request})
+        data = serializer.data
         return Response({
             "message": "Wishlist retrieved successfully",
-            "count": queryset.count(),
-            "data": serializer.data
+            "count": len(data),
+            "data": data
         }, status=status.HTTP_200_OK)
 
 
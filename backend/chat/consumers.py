@@ -0,0 +1,34 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import user_group
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws://<host>/ws/chat/?ticket=<connection ticket>
+    The ticket comes from POST /api/chat/ws-ticket/ (see chat.tickets); never
+    put the JWT itself in the URL, where access logs would keep it.
+    Receives the events chat.realtime.push() sends to this user, e.g.
+    {"type": "chat.message", "data": {...message, "conversation": id}}.
+    Messages are still sent through the REST API so they are validated there.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.group = user_group(user.id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group'):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    async def realtime_event(self, event):
+        await self.send_json({'type': event['event'], 'data': event['data']})
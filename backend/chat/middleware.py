@@ -0,0 +1,33 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+
+from . import tickets
+
+
+@database_sync_to_async
+def get_user_for_ticket(ticket):
+    user_id = tickets.user_id_for(ticket)
+    user = get_user_model().objects.filter(pk=user_id, is_active=True).first() if user_id else None
+    return user or AnonymousUser()
+
+
+class TicketAuthMiddleware:
+    """
+    Authenticate WebSocket connections as the user the REST API knows from
+    the SimpleJWT access token. Browsers can't set headers on a WebSocket,
+    so the client exchanges its token for a short-lived ticket
+    (POST /api/chat/ws-ticket/) and passes that in the query string:
+    /ws/chat/?ticket=<ticket>. The access token itself never appears in a URL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        ticket = (query.get('ticket') or [None])[0]
+        scope = dict(scope, user=await get_user_for_ticket(ticket) if ticket else AnonymousUser())
+        return await self.app(scope, receive, send)
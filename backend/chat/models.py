@@ -14,14 +14,37 @@ class Conversation(models.Model):
         related_name='store_conversations'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized by chat.signals so the inbox needs no per-conversation lookups
+    last_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    # Read watermarks: each participant has read every message up to this id
+    customer_last_read_id = models.BigIntegerField(default=0)
+    store_last_read_id = models.BigIntegerField(default=0)
 
     class Meta:
         unique_together = ('customer', 'store')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', '-last_message_at'], name='conv_customer_inbox_idx'),
+            models.Index(fields=['store', '-last_message_at'], name='conv_store_inbox_idx'),
+        ]
 
     def __str__(self):
         return f"{self.customer.email} <-> {self.store.store_name}"
 
+    def read_field(self, user):
+        """Name of the read watermark column for this participant"""
+        return 'customer_last_read_id' if user.id == self.customer_id else 'store_last_read_id'
+
+    def other_participant_id(self, user):
+        return self.store_id if user.id == self.customer_id else self.customer_id
+
 class Message(models.Model):
     conversation = models.ForeignKey(
         Conversation, 
@@ -35,6 +58,9 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='message_conversation_time_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.email} at {self.timestamp}"
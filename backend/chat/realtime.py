@@ -0,0 +1,48 @@
+"""
+Push events to connected clients.
+
+Every authenticated WebSocket joins the group for its user (see
+chat.consumers), so the server can address a user on all of their open
+tabs. push() sends through the configured channel layer (CHANNEL_LAYERS:
+in-memory by default, a Redis layer when running several workers) after the
+surrounding transaction commits. Without Channels installed, or without a
+channel layer, push() does nothing and clients keep polling the REST API.
+"""
+from django.db import transaction
+
+try:
+    from asgiref.sync import async_to_sync
+    from channels.layers import InMemoryChannelLayer, get_channel_layer
+except ImportError:  # Realtime push is optional
+    get_channel_layer = None
+
+
+def user_group(user_id):
+    return f"user.{user_id}"
+
+
+def channel_layer():
+    """The configured channel layer, or None when realtime push is unavailable"""
+    return get_channel_layer() if get_channel_layer is not None else None
+
+
+def is_process_local():
+    """True when pushes only reach clients connected to this process (InMemoryChannelLayer)"""
+    return isinstance(channel_layer(), InMemoryChannelLayer) if get_channel_layer is not None else False
+
+
+def push(user_ids, event, data):
+    """Send {"type": event, "data": data} to every connection of the given users once committed"""
+    if get_channel_layer is None:
+        return
+    user_ids = sorted(set(user_ids))
+    transaction.on_commit(lambda: _send(user_ids, event, data))
+
+
+def _send(user_ids, event, data):
+    layer = channel_layer()
+    if layer is None:
+        return
+    message = {"type": "realtime.event", "event": event, "data": data}
+    for user_id in user_ids:
+        async_to_sync(layer.group_send)(user_group(user_id), message)
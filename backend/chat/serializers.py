@@ -12,12 +12,21 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'sender', 'timestamp', 'is_read', 'sender_name', 'sender_email']
 
 class ConversationSerializer(serializers.ModelSerializer):
+    """
+    Conversation with its last message, the viewer's unread count and the
+    other participant. Load with UserConversationsView.inbox_queryset() (or
+    select_related customer/store/last_message__sender) to avoid per-row queries.
+    """
     customer_name = serializers.CharField(source='customer.name', read_only=True)
     customer_image = serializers.ImageField(source='customer.profile_image', read_only=True)
 
     store_name = serializers.CharField(source='store.store_name', read_only=True)
     store_image = serializers.ImageField(source='store.store_logo', read_only=True)
 
+    last_message = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
+    counterpart = serializers.SerializerMethodField()
+
     class Meta:
         model = Conversation
         fields = [
@@ -26,11 +35,29 @@ class ConversationSerializer(serializers.ModelSerializer):
             'store_name',
             'customer_image',
             'store_image',
-            'created_at'
+            'created_at',
+            'last_message',
+            'last_message_at',
+            'unread_count',
+            'counterpart'
         ]
 
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
-        if last_msg:
-            return MessageSerializer(last_msg).data
+        if obj.last_message_id:
+            return MessageSerializer(obj.last_message).data
         return None
+
+    def get_unread_count(self, obj):
+        return getattr(obj, 'unread_count', 0) or 0
+
+    def get_counterpart(self, obj):
+        request = self.context.get('request')
+        viewer_id = request.user.id if request else None
+        if viewer_id == obj.store_id:
+            other, name, image = obj.customer, obj.customer.name, obj.customer.profile_image
+        else:
+            other, name, image = obj.store, obj.store.store_name, obj.store.store_logo
+        image_url = None
+        if image:
+            image_url = request.build_absolute_uri(image.url) if request else image.url
+        return {'id': other.id, 'name': name, 'image': image_url, 'role': other.role}
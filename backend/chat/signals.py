@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Conversation, Message
+
+
+@receiver(post_save, sender=Message)
+def set_last_message(sender, instance, created, **kwargs):
+    if created:
+        Conversation.objects.filter(pk=instance.conversation_id).update(
+            last_message=instance, last_message_at=instance.timestamp
+        )
+
+
+@receiver(post_delete, sender=Message)
+def reset_last_message(sender, instance, **kwargs):
+    """Point the conversation at its previous message when the latest one is deleted"""
+    previous = Message.objects.filter(conversation_id=instance.conversation_id).order_by('-timestamp', '-id').first()
+    Conversation.objects.filter(pk=instance.conversation_id, last_message_at__gte=instance.timestamp).update(
+        last_message=previous, last_message_at=previous.timestamp if previous else None
+    )
@@ -1,3 +1,219 @@
-from django.test import TestCase
+import importlib.util
+import json
+import time
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from accounts.models import User
+from . import tickets
+from .models import Conversation, Message
+
+HAS_CHANNELS = importlib.util.find_spec('channels') is not None
+ORIGIN = (b'origin', b'http://localhost:5173')
+
+
+@skipIf(not HAS_CHANNELS, 'channels is not installed')
+class ChatWebSocketTests(TransactionTestCase):
+    """New messages are pushed over /ws/chat/ to both participants"""
+
+    def setUp(self):
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', role='Store', is_store=True, is_verified=True
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        self.conversation = Conversation.objects.create(customer=self.customer, store=self.store)
+
+    async def connect(self, user=None, ticket=None):
+        """Open /ws/chat/ and return (communicator, first message from the server)"""
+        from Rentfit.asgi import application
+
+        ticket = ticket or tickets.issue(user)
+        socket = ApplicationCommunicator(application, {
+            'type': 'websocket', 'path': '/ws/chat/', 'query_string': f'ticket={ticket}'.encode(),
+            'headers': [ORIGIN], 'subprotocols': [],
+        })
+        await socket.send_input({'type': 'websocket.connect'})
+        return socket, await socket.receive_output(timeout=2)
+
+    async def receive_json(self, socket):
+        message = await socket.receive_output(timeout=2)
+        self.assertEqual(message['type'], 'websocket.send')
+        return json.loads(message['text'])
+
+    def send_message(self, text):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        return client.post(f'/api/chat/{self.conversation.id}/send/', {'text': text}, format='json')
+
+    def test_message_is_pushed_to_both_participants(self):
+        async def scenario():
+            from channels.db import database_sync_to_async
+
+            sockets = []
+            for user in (self.customer, self.store):
+                socket, reply = await self.connect(user)
+                self.assertEqual(reply['type'], 'websocket.accept')
+                sockets.append(socket)
+            response = await database_sync_to_async(self.send_message)('Is this available?')
+            self.assertEqual(response.status_code, 201)
+            for socket in sockets:
+                event = await self.receive_json(socket)
+                if event['type'] == 'notification.created':
+                    # The recipient also gets its chat notification on this socket
+                    event = await self.receive_json(socket)
+                self.assertEqual(event['type'], 'chat.message')
+                self.assertEqual(event['data']['text'], 'Is this available?')
+                self.assertEqual(event['data']['conversation'], self.conversation.id)
+                await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+                await socket.wait(timeout=2)
+
+        async_to_sync(scenario)()
+
+    def test_invalid_ticket_is_rejected(self):
+        async def scenario():
+            _, reply = await self.connect(ticket='not-a-ticket')
+            self.assertEqual((reply['type'], reply['code']), ('websocket.close', 4401))
+
+        async_to_sync(scenario)()
+
+
+class ConnectionTicketTests(APITestCase):
+    """WebSocket tickets name the user they were issued to and expire quickly"""
+
+    def test_ticket_round_trip_and_expiry(self):
+        user = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        self.assertEqual(self.client.post('/api/chat/ws-ticket/').status_code, 401)
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/chat/ws-ticket/')
+        self.assertEqual(response.status_code, 200)
+        ticket = response.data['data']['ticket']
+        self.assertEqual(tickets.user_id_for(ticket), user.pk)
+        self.assertIsNone(tickets.user_id_for(ticket + 'x'))
+        with mock.patch('time.time', return_value=time.time() + tickets.TICKET_MAX_AGE + 1):
+            self.assertIsNone(tickets.user_id_for(ticket))
+
+
+class MessageSyncTests(APITestCase):
+    """MessageListView pages with after_id / before_id instead of returning everything"""
+
+    def setUp(self):
+        store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', role='Store', is_store=True, is_verified=True
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        self.conversation = Conversation.objects.create(customer=self.customer, store=store)
+        self.ids = [
+            Message.objects.create(conversation=self.conversation, sender=self.customer, text=f'Message {i}').id
+            for i in range(120)
+        ]
+        self.client.force_authenticate(self.customer)
+
+    def fetch(self, query=''):
+        response = self.client.get(f'/api/chat/{self.conversation.id}/{query}')
+        self.assertEqual(response.status_code, 200)
+        return [message['id'] for message in response.data]
+
+    def test_default_is_latest_page(self):
+        self.assertEqual(self.fetch(), self.ids[-50:])
+
+    def test_after_id_returns_only_newer(self):
+        self.assertEqual(self.fetch(f'?after_id={self.ids[-3]}'), self.ids[-2:])
+        self.assertEqual(self.fetch(f'?after_id={self.ids[-1]}'), [])
+
+    def test_before_id_pages_backwards(self):
+        self.assertEqual(self.fetch(f'?before_id={self.ids[50]}&limit=20'), self.ids[30:50])
+        self.assertEqual(self.fetch(f'?before_id={self.ids[5]}&limit=20'), self.ids[:5])
+
+    def test_unknown_anchor_is_rejected(self):
+        response = self.client.get(f'/api/chat/{self.conversation.id}/?after_id=999999')
+        self.assertEqual(response.status_code, 400)
+
+
+class InboxTests(APITestCase):
+    """The conversation list is one query however many conversations there are"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+
+    def add_conversations(self, count):
+        for _ in range(count):
+            index = User.objects.count()
+            store = User.objects.create_user(
+                email=f'store{index}@example.com', password='password123', name='Owner',
+                store_name=f'Store {index}', role='Store', is_store=True, is_verified=True
+            )
+            conversation = Conversation.objects.create(customer=self.customer, store=store)
+            Message.objects.create(conversation=conversation, sender=store, text='Hello')
+            Message.objects.create(conversation=conversation, sender=store, text=f'Latest from {store.id}')
+
+    def inbox(self):
+        self.client.force_authenticate(self.customer)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/chat/my/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_inbox_is_one_query(self):
+        self.add_conversations(2)
+        self.assertEqual(self.inbox()[0], 1)
+        self.add_conversations(5)
+        queries, data = self.inbox()
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(data), 7)
+        latest = data[0]
+        self.assertEqual(latest['last_message']['text'], f"Latest from {latest['counterpart']['id']}")
+        self.assertEqual(latest['unread_count'], 2)
+        self.assertEqual(latest['counterpart']['name'], latest['store_name'])
+
+    def test_mark_read_moves_watermark(self):
+        self.add_conversations(1)
+        conversation = Conversation.objects.get()
+        first, latest = conversation.messages.order_by('id')
+        self.client.force_authenticate(self.customer)
+
+        response = self.client.post(f'/api/chat/{conversation.id}/read/', {'message_id': first.id}, format='json')
+        self.assertEqual(response.data['data']['marked'], 1)
+        self.assertEqual(self.inbox()[1][0]['unread_count'], 1)
+
+        self.client.post(f'/api/chat/{conversation.id}/read/', {}, format='json')
+        self.assertEqual(self.inbox()[1][0]['unread_count'], 0)
+        self.client.post(f'/api/chat/{conversation.id}/read/', {'message_id': first.id}, format='json')
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.customer_last_read_id, latest.id)
+        self.assertFalse(conversation.messages.filter(is_read=False).exists())
+
+    def test_mark_read_stops_at_the_latest_message(self):
+        self.add_conversations(1)
+        conversation = Conversation.objects.get()
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(f'/api/chat/{conversation.id}/read/', {'message_id': 10 ** 9}, format='json')
+        self.assertEqual(response.data['data']['last_read_message_id'], conversation.last_message_id)
+
+        Message.objects.create(conversation=conversation, sender=conversation.store, text='Still there?')
+        latest_read = conversation.last_message_id
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.customer_last_read_id, latest_read)
+        self.assertEqual(self.inbox()[1][0]['unread_count'], 1)
+
+    def test_only_participants_can_mark_read(self):
+        self.add_conversations(1)
+        conversation = Conversation.objects.get()
+        outsider = User.objects.create_user(email='other@example.com', password='password123', name='Other')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.post(f'/api/chat/{conversation.id}/read/').status_code, 403)
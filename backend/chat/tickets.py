@@ -0,0 +1,27 @@
+"""
+Short-lived connection tickets.
+
+Browsers can't set headers on a WebSocket, so its credentials travel in the
+URL, and URLs end up in server and proxy access logs. Rather than the
+SimpleJWT access token, the client first POSTs to /api/chat/ws-ticket/
+(authenticated as usual) and connects with the ticket it gets back: a
+signed user id that expires after TICKET_MAX_AGE seconds, so a logged URL
+is useless almost at once.
+"""
+from django.core import signing
+
+TICKET_MAX_AGE = 30  # seconds
+
+_signer = signing.TimestampSigner(salt='chat.connection-ticket')
+
+
+def issue(user):
+    return _signer.sign(str(user.pk))
+
+
+def user_id_for(ticket):
+    """The user id a ticket was issued for, or None if it is forged or expired"""
+    try:
+        return int(_signer.unsign(ticket, max_age=TICKET_MAX_AGE))
+    except (signing.BadSignature, ValueError):
+        return None
@@ -3,7 +3,9 @@ from .views import (
     StartConversationView,
     UserConversationsView,
     MessageListView,
-    SendMessageView
+    SendMessageView,
+    MarkConversationReadView,
+    ConnectionTicketView,
 )
 
 
@@ -11,6 +13,8 @@ urlpatterns = [
     # path('ping/', PingView.as_view(), name='ping'),
     path('start/<int:store_id>/', StartConversationView.as_view(), name='start-chat'),
     path('my/', UserConversationsView.as_view(), name='my_conversations'),
+    path('ws-ticket/', ConnectionTicketView.as_view(), name='chat_ws_ticket'),
     path('<int:conversation_id>/', MessageListView.as_view(), name='conversation_messages'),
     path('<int:conversation_id>/send/', SendMessageView.as_view(), name='send_message'),
+    path('<int:conversation_id>/read/', MarkConversationReadView.as_view(), name='mark_conversation_read'),
 ]
@@ -2,9 +2,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce
 from .models import Conversation, Message
 from .serializers import ConversationSerializer, MessageSerializer
+from . import realtime, tickets
 from accounts.models import User
 
 class StartConversationView(APIView):
@@ -46,32 +49,50 @@ class StartConversationView(APIView):
 
 class UserConversationsView(APIView):
     """
-    List all conversations for the logged-in user (Customer or Store).
+    Inbox: all conversations for the logged-in user (Customer or Store),
+    most recently active first, each with its last message, the user's
+    unread count and the other participant. One query.
     """
     permission_classes = [permissions.IsAuthenticated]
 
+    @staticmethod
+    def inbox_queryset(user):
+        # Unread = messages from the other side past the user's read watermark
+        unread = Message.objects.filter(
+            conversation=OuterRef('pk'), id__gt=OuterRef('last_read_id')
+        ).exclude(sender=user).order_by().values('conversation').annotate(total=Count('id')).values('total')
+        return Conversation.objects.filter(
+            Q(customer=user) | Q(store=user)
+        ).select_related(
+            'customer', 'store', 'last_message', 'last_message__sender'
+        ).annotate(
+            last_read_id=Case(
+                When(customer=user, then=F('customer_last_read_id')),
+                default=F('store_last_read_id'),
+            ),
+            unread_count=Coalesce(Subquery(unread), 0)
+        ).order_by(F('last_message_at').desc(nulls_last=True), '-created_at')
+
     def get(self, request):
-        # DEBUGGING
-        print(f"\n--- DEBUG UserConversationsView ---")
-        print(f"Request User: {request.user.email} (ID: {request.user.id}, Role: {request.user.role})")
-        
-        conversations = Conversation.objects.filter(
-            Q(customer=request.user) | Q(store=request.user)
-        )
-        print(f"Found {conversations.count()} conversations")
-        if conversations.count() == 0:
-            print(f"ALL CONVERSATIONS: {list(Conversation.objects.values('id', 'customer__email', 'store__email'))}")
-        
+        conversations = self.inbox_queryset(request.user)
         serializer = ConversationSerializer(conversations, many=True, context={'request': request})
         return Response(serializer.data)
 
 
 class MessageListView(APIView):
     """
-    List messages for a specific conversation.
+    List messages for a specific conversation, oldest first.
     Security: Only participants can view messages.
+
+    GET /api/chat/{id}/                          latest `limit` messages
+    GET /api/chat/{id}/?after_id=N               messages newer than N (incremental sync)
+    GET /api/chat/{id}/?before_id=N&limit=50     the `limit` messages before N (scrollback)
+    Keyset pages over the (conversation, timestamp, id) index; limit defaults
+    to 50 (max 200).
     """
     permission_classes = [permissions.IsAuthenticated]
+    default_limit = 50
+    max_limit = 200
 
     def get(self, request, conversation_id):
         conversation = get_object_or_404(Conversation, id=conversation_id)
@@ -83,13 +104,46 @@ class MessageListView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
             
-        messages = conversation.messages.all()
+        try:
+            after_id = request.query_params.get('after_id')
+            before_id = request.query_params.get('before_id')
+            after_id = int(after_id) if after_id else None
+            before_id = int(before_id) if before_id else None
+            limit = min(max(int(request.query_params.get('limit') or self.default_limit), 1), self.max_limit)
+        except ValueError:
+            return Response({"error": "after_id, before_id and limit must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        messages = conversation.messages.select_related('sender')
+        try:
+            if after_id is not None:
+                messages = messages.filter(self.keyset(conversation, after_id, 'gt')).order_by('timestamp', 'id')[:limit]
+            else:
+                if before_id is not None:
+                    messages = messages.filter(self.keyset(conversation, before_id, 'lt'))
+                # Newest page first, then flip it back to chronological order
+                messages = list(messages.order_by('-timestamp', '-id')[:limit])[::-1]
+        except Message.DoesNotExist:
+            return Response({"error": "Message not found in this conversation."}, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = MessageSerializer(messages, many=True, context={'request': request})
         return Response(serializer.data)
 
+    @staticmethod
+    def keyset(conversation, message_id, op):
+        """Messages strictly after ('gt') or before ('lt') the given message in (timestamp, id) order"""
+        timestamp = conversation.messages.values_list('timestamp', flat=True).get(id=message_id)
+        return Q(**{f'timestamp__{op}': timestamp}) | Q(timestamp=timestamp, **{f'id__{op}': message_id})
+
 
+from notifications import events as notification_events
+from notifications import outbox
 from notifications.models import Notification
 
+
+def chat_group_key(conversation_id):
+    return f"chat:{conversation_id}"
+
+
 class SendMessageView(APIView):
     """
     Send a message in a conversation.
@@ -109,22 +163,92 @@ class SendMessageView(APIView):
             
         serializer = MessageSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(conversation=conversation, sender=request.user)
-            # Re-serialize to get absolute URLs if needed, though usually not for just creating.
-            # But let's be consistent.
-            # response_serializer = MessageSerializer(serializer.instance, context={'request': request})
-            
-            # Create Notification
-            if request.user == conversation.customer:
-                recipient = conversation.store
-            else:
-                recipient = conversation.customer
+            sender_name = request.user.store_name if request.user.role == 'Store' else request.user.name
+            sender_name = sender_name or request.user.email
+            with transaction.atomic():
+                serializer.save(conversation=conversation, sender=request.user)
+                # Re-serialize to get absolute URLs if needed, though usually not for just creating.
+                # But let's be consistent.
+                # response_serializer = MessageSerializer(serializer.instance, context={'request': request})
+
+                # One unread notification per conversation, updated while unread
+                outbox.enqueue(
+                    conversation.other_participant_id(request.user),
+                    f"{sender_name} sent you a message",
+                    notification_type="chat",
+                    group_key=chat_group_key(conversation.id),
+                    grouped_message=f"{{count}} new messages from {sender_name}",
+                )
 
-            Notification.objects.create(
-                user=recipient,
-                message=f"{request.user.first_name or request.user.email} sent you a message",
-                notification_type="chat"
+            realtime.push(
+                [conversation.customer_id, conversation.store_id],
+                "chat.message",
+                {**serializer.data, "conversation": conversation.id},
             )
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class MarkConversationReadView(APIView):
+    """
+    POST /api/chat/{id}/read/  {"message_id": N}  (defaults to the latest message)
+    Mark the other participant's messages up to N as read with one bulk
+    UPDATE, move the user's read watermark forward and tell the other
+    participant (chat.read event).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, conversation_id):
+        conversation = get_object_or_404(Conversation, id=conversation_id)
+        if request.user.id not in (conversation.customer_id, conversation.store_id):
+            return Response(
+                {"detail": "You do not have permission to view this conversation."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        message_id = request.data.get('message_id') or conversation.last_message_id or 0
+        try:
+            message_id = int(message_id)
+        except (TypeError, ValueError):
+            return Response({"error": "message_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        # The watermark can't pass the conversation's latest message, or later messages would arrive already read
+        message_id = min(message_id, conversation.last_message_id or 0)
+
+        read_field = conversation.read_field(request.user)
+        with transaction.atomic():
+            marked = conversation.messages.filter(
+                id__lte=message_id, is_read=False
+            ).exclude(sender=request.user).update(is_read=True)
+            # Watermarks only move forward
+            moved = Conversation.objects.filter(
+                pk=conversation.pk, **{f'{read_field}__lt': message_id}
+            ).update(**{read_field: message_id})
+            # Reading the conversation also clears its chat notification
+            notification_events.notifications_read(request.user.id, Notification.objects.filter(
+                user=request.user, group_key=chat_group_key(conversation.id), is_read=False
+            ).update(is_read=True))
+            if moved:
+                realtime.push([conversation.other_participant_id(request.user)], "chat.read", {
+                    "conversation": conversation.id,
+                    "reader": request.user.id,
+                    "last_read_message_id": message_id,
+                })
+
+        return Response({
+            "message": "Conversation marked as read",
+            "data": {"last_read_message_id": max(message_id, getattr(conversation, read_field)), "marked": marked}
+        }, status=status.HTTP_200_OK)
+
+class ConnectionTicketView(APIView):
+    """
+    Short-lived ticket for opening the chat WebSocket (see chat.tickets)
+    POST /api/chat/ws-ticket/
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            "message": "Ticket issued.",
+            "data": {"ticket": tickets.issue(request.user), "expires_in": tickets.TICKET_MAX_AGE},
+        }, status=status.HTTP_200_OK)
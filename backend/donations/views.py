@@ -3,8 +3,9 @@ from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from notifications.models import Notification
+from notifications import outbox
 
 from .models import Donation
 from .serializers import (
@@ -32,12 +33,13 @@ class DonationCreateView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         """Create donation with customer from request user"""
-        donation = serializer.save()
-        Notification.objects.create(
-            user=donation.store,
-            message=f"New donation pledge from {self.request.user.email}: {donation.item_name}.",
-            notification_type='donation'
-        )
+        with transaction.atomic():
+            donation = serializer.save()
+            outbox.enqueue(
+                donation.store_id,
+                f"New donation pledge from {self.request.user.email}: {donation.item_name}.",
+                notification_type='donation'
+            )
 
 
 class CustomerDonationListView(generics.ListAPIView):
@@ -174,13 +176,13 @@ class DonationStatusUpdateView(generics.UpdateAPIView):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-
-        Notification.objects.create(
-            user=instance.customer,
-            message=f"The status of your donation {instance.item_name} has been updated to {instance.donation_status}.",
-            notification_type='donation'
-        )
+        with transaction.atomic():
+            self.perform_update(serializer)
+            outbox.enqueue(
+                instance.customer_id,
+                f"The status of your donation {instance.item_name} has been updated to {instance.donation_status}.",
+                notification_type='donation'
+            )
 
         # Return updated donation details
         detail_serializer = DonationDetailSerializer(instance, context={'request': request})
@@ -212,14 +214,14 @@ class DonationCollectView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        donation.donation_status = Donation.DonationStatus.COLLECTED
-        donation.save()
-
-        Notification.objects.create(
-            user=donation.customer,
-            message=f"Store {request.user.store_name} has marked your donation {donation.item_name} as collected. Thank you!",
-            notification_type='donation'
-        )
+        with transaction.atomic():
+            donation.donation_status = Donation.DonationStatus.COLLECTED
+            donation.save()
+            outbox.enqueue(
+                donation.customer_id,
+                f"Store {request.user.store_name} has marked your donation {donation.item_name} as collected. Thank you!",
+                notification_type='donation'
+            )
 
         serializer = DonationDetailSerializer(donation, context={'request': request})
         return Response({
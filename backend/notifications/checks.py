@@ -0,0 +1,20 @@
+"""
+System checks for notification delivery settings.
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+from chat import realtime
+
+
+@register()
+def outbox_delivery_check(app_configs, **kwargs):
+    """Without eager delivery, live pushes come from the dispatch worker and need a shared channel layer"""
+    if getattr(settings, 'NOTIFICATION_OUTBOX_EAGER', False) or not realtime.is_process_local():
+        return []
+    return [Error(
+        "NOTIFICATION_OUTBOX_EAGER is off but CHANNEL_LAYERS uses InMemoryChannelLayer, so notifications "
+        "pushed by the dispatch_notifications worker would never reach connected clients.",
+        hint="Use channels_redis.core.RedisChannelLayer, or set NOTIFICATION_OUTBOX_EAGER = True.",
+        id='notifications.E001',
+    )]
@@ -0,0 +1,28 @@
+"""
+Opaque notification list cursors.
+
+A cursor records the (created_at, id) a notification had when the client
+saw it, not just its id. Pages are cut by those values, so a cursor keeps
+working after its row is bumped by coalescing (which moves created_at) or
+archived: "older than" and "newer than" still mean where the row was.
+"""
+import base64
+from datetime import datetime
+
+
+def encode(notification):
+    raw = f"{notification.created_at.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode(cursor):
+    """(created_at, id) for a cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(cursor)
+    created_at, _, notification_id = raw.partition('|')
+    created_at = datetime.fromisoformat(created_at)
+    if created_at.tzinfo is None:
+        raise ValueError(cursor)
+    return created_at, int(notification_id)
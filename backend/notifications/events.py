@@ -0,0 +1,109 @@
+"""
+Unread counters and live notification events.
+
+Each user's unread count is kept in a NotificationCounter row, so reading it
+is a single primary-key lookup. Every write that creates or reads notifications
+adjusts it in the same transaction through notifications_created() /
+notifications_read(), and `manage.py reconcile_unread_notifications` repairs
+drift. post_save/post_delete cover single rows; code that writes
+notifications with bulk_create() or update() calls these helpers itself.
+
+The same helpers push "notification.created" and "notification.unread_count"
+events to the user's realtime group (chat.realtime), delivered by the
+WebSocket and the /api/notifications/stream/ Server-Sent Events endpoint.
+"""
+from collections import Counter
+
+from django.db.models import Count, F
+
+from accounts.models import User
+from chat import realtime
+from .models import Notification, NotificationCounter
+
+
+def unread_count(user_id):
+    count = NotificationCounter.objects.filter(pk=user_id).values_list('unread', flat=True).first()
+    if count is None:
+        # No counter yet (user predates it): count once and start one
+        reconcile_unread([user_id])
+        count = NotificationCounter.objects.values_list('unread', flat=True).get(pk=user_id)
+    return count
+
+
+def unread_counts(user_ids):
+    return dict(NotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', 'unread'))
+
+
+def adjust_unread(changes):
+    """
+    Apply {user_id: delta} to the counters, one UPDATE per distinct delta.
+    Users without a counter row are skipped; unread_count() creates it. The
+    result is not clamped at zero, so a missed increment shows up as drift
+    for reconcile_unread() instead of being hidden.
+    """
+    by_delta = {}
+    for user_id, delta in changes.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(unread=F('unread') + delta)
+
+
+def notifications_created(notifications):
+    """Count new notifications as unread and push them to their users"""
+    adjust_unread(Counter(notification.user_id for notification in notifications if not notification.is_read))
+    publish_created(notifications)
+
+
+def notifications_read(user_id, count):
+    """count of the user's notifications just went from unread to read"""
+    if count:
+        adjust_unread({user_id: -count})
+        publish_unread_count(user_id)
+
+
+def publish_created(notifications):
+    from .serializers import NotificationSerializer
+
+    if not notifications:
+        return
+    counts = unread_counts({notification.user_id for notification in notifications})
+    for notification in notifications:
+        realtime.push([notification.user_id], "notification.created", {
+            "notification": NotificationSerializer(notification).data,
+            "unread_count": counts.get(notification.user_id, 0),
+        })
+
+
+def publish_unread_count(user_id):
+    realtime.push([user_id], "notification.unread_count", {"unread_count": unread_count(user_id)})
+
+
+def reconcile_unread(user_ids=None):
+    """
+    Reset counters to the real number of unread rows. Returns
+    {user_id: (stored, actual)} for the users that had drifted.
+    """
+    users = User.objects.all() if user_ids is None else User.objects.filter(id__in=user_ids)
+    unread = Notification.objects.filter(is_read=False)
+    if user_ids is not None:
+        unread = unread.filter(user_id__in=user_ids)
+    actual = dict(unread.values('user_id').annotate(total=Count('id')).order_by().values_list('user_id', 'total'))
+    stored = dict(NotificationCounter.objects.filter(user__in=users).values_list('user_id', 'unread'))
+
+    drift = {}
+    for user_id in users.values_list('id', flat=True).iterator():
+        real = actual.get(user_id, 0)
+        if stored.get(user_id) != real:
+            drift[user_id] = (stored.get(user_id), real)
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, unread=real) for user_id, (old, real) in drift.items() if old is None],
+        ignore_conflicts=True, batch_size=500,
+    )
+    by_count = {}
+    for user_id, (old, real) in drift.items():
+        if old is not None:
+            by_count.setdefault(real, []).append(user_id)
+    for real, ids in by_count.items():
+        NotificationCounter.objects.filter(user_id__in=ids).update(unread=real)
+    return drift
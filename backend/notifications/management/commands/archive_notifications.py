@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notifications import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Move read notifications older than the retention period to the archive table, "
+        "in batches. Schedule daily; safe to stop and rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.NOTIFICATION_RETENTION_DAYS,
+            help=f'Archive read notifications older than this many days (default {settings.NOTIFICATION_RETENTION_DAYS}).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=retention.BATCH_SIZE,
+            help=f'Notifications moved per transaction (default {retention.BATCH_SIZE}).',
+        )
+
+    def handle(self, *args, **options):
+        moved = retention.archive(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} read notifications older than {options['days']} days."))
@@ -0,0 +1,75 @@
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from chat import realtime
+from notifications import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued notifications from the outbox: writes the Notification rows, updates unread "
+        "counters and pushes live events. Runs until interrupted unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of worker threads (default 1, which runs in the main thread).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=outbox.BATCH_SIZE,
+            help=f'Entries claimed per batch (default {outbox.BATCH_SIZE}).',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Seconds an idle worker waits before polling again (default 1).',
+        )
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit.')
+
+    def handle(self, *args, **options):
+        if realtime.is_process_local():
+            raise CommandError(
+                "CHANNEL_LAYERS uses InMemoryChannelLayer, so live pushes from this worker would never reach "
+                "connected clients. Configure channels_redis.core.RedisChannelLayer, or leave "
+                "NOTIFICATION_OUTBOX_EAGER on and do not run the worker."
+            )
+        stop = threading.Event()
+        delivered = [0] * max(options['workers'], 1)
+
+        def work(index):
+            while not stop.is_set():
+                count = outbox.dispatch(options['batch_size'])
+                delivered[index] += count
+                if options['once']:
+                    return
+                if not count:
+                    stop.wait(options['interval'])
+                # Long-running: drop connections the database has timed out
+                close_old_connections()
+
+        def work_in_thread(index):
+            try:
+                work(index)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=work_in_thread, args=(index,), daemon=True)
+            for index in range(1, len(delivered))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            work(0)
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS(f"Delivered {sum(delivered)} notifications."))
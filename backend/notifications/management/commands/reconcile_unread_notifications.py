@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notifications import events
+
+
+class Command(BaseCommand):
+    help = "Reset the per-user unread notification counters to the real number of unread notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            nargs='+',
+            help='Only reconcile these user ids.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = events.reconcile_unread(options['user'])
+        for user_id, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"User {user_id}: {stored} -> {actual}")
+        self.stdout.write(self.style.SUCCESS(f"Reconciled unread counters: {len(drift)} users corrected."))
@@ -1,5 +1,44 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import CharField, F, Q, Value
+from django.db.models.functions import Cast, Concat
 from django.conf import settings
+from django.utils import timezone
+
+
+class NotificationManager(models.Manager):
+    def notify_grouped(self, user_id, notification_type, group_key, message, grouped_message, count=1):
+        """
+        One unread notification per (user, group_key): the first event creates
+        it with `message`; later ones bump group_count, move it to the top and
+        rewrite it from `grouped_message` (a template with a {count}
+        placeholder) in a single UPDATE. Once read, the next event starts a
+        new row. `count` folds several events in at once. Returns the
+        notification.
+        """
+        prefix, _, suffix = grouped_message.partition('{count}')
+        unread = self.filter(user_id=user_id, group_key=group_key, is_read=False)
+        while True:
+            updated = unread.update(
+                group_count=F('group_count') + count,
+                message=Concat(Value(prefix), Cast(F('group_count') + count, CharField()), Value(suffix)),
+                created_at=timezone.now(),
+            )
+            if updated:
+                from .events import publish_created
+
+                notification = unread.get()
+                publish_created([notification])
+                return notification
+            try:
+                with transaction.atomic():
+                    return self.create(
+                        user_id=user_id, notification_type=notification_type, group_key=group_key,
+                        message=message if count == 1 else f"{prefix}{count}{suffix}", group_count=count
+                    )
+            except IntegrityError:
+                # Another request created the group row first; update that one
+                continue
+
 
 class Notification(models.Model):
     NOTIFICATION_TYPES = (
@@ -14,10 +53,104 @@ class Notification(models.Model):
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES, default='system')
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Coalescing (see NotificationManager.notify_grouped): events sharing a
+    # group key update one unread row instead of adding a row each
+    group_key = models.CharField(max_length=100, null=True, blank=True)
+    group_count = models.PositiveIntegerField(default=1)
+
+    objects = NotificationManager()
 
     class Meta:
         ordering = ['-created_at']
         app_label = 'notifications'
+        indexes = [
+            # A user's unread (or read) notifications by age: counter reconciles, mark-all-read
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notification_user_read_idx'),
+            # The notification list's keyset pages (NotificationListView)
+            models.Index(fields=['user', 'created_at', 'id'], name='notification_user_time_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'group_key'],
+                condition=Q(is_read=False, group_key__isnull=False),
+                name='notification_unread_group_uniq',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.message}"
+
+
+class NotificationCounter(models.Model):
+    """
+    Unread notification count per user, kept by notifications.events in the
+    same transaction as the notification writes (a separate row so saving
+    a User can never write back a stale count)
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter'
+    )
+    unread = models.IntegerField(default=0)
+
+    class Meta:
+        app_label = 'notifications'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
+
+class NotificationOutbox(models.Model):
+    """
+    A notification waiting to be delivered. Views insert it in the same
+    transaction as the change it reports; notifications.outbox.dispatch()
+    (the dispatch_notifications worker) turns it into a Notification row and
+    live push, then deletes it.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES, default='system')
+    # Set for coalesced notifications (see NotificationManager.notify_grouped)
+    group_key = models.CharField(max_length=100, null=True, blank=True)
+    grouped_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Claimed by a worker pass; a claim older than outbox.CLAIM_TIMEOUT is retried
+    claimed_by = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['id']
+        app_label = 'notifications'
+
+    def __str__(self):
+        return f"{self.user_id} - {self.message}"
+
+
+class ArchivedNotification(models.Model):
+    """
+    Read notifications moved out of the Notification table by
+    `manage.py archive_notifications` (see notifications.retention); keeps
+    the original id
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES, default='system')
+    created_at = models.DateTimeField()
+    group_key = models.CharField(max_length=100, null=True, blank=True)
+    group_count = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        app_label = 'notifications'
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='archived_notif_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.message}"
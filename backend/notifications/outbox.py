@@ -0,0 +1,153 @@
+"""
+Transactional notification outbox.
+
+Views never write Notification rows themselves. They call enqueue() inside
+the transaction that makes the change being reported, so the notification
+exists exactly when the change commits, and the request only pays for one
+INSERT. dispatch() then delivers waiting entries in batches: plain ones with
+one bulk INSERT, coalesced ones folded per (user, group key) through
+notify_grouped(), plus the unread counters and live pushes (see
+notifications.events).
+
+`manage.py dispatch_notifications` runs dispatch() in a pool of worker
+threads. Workers claim batches with a conditional UPDATE, so any number of
+them (and of processes) can run side by side; a claim left behind by a
+crashed or failing pass is retried after CLAIM_TIMEOUT, up to MAX_ATTEMPTS
+times. The worker pushes live events from its own process, so it needs a
+channel layer shared with the ASGI server (channels_redis); it refuses to
+run with the in-memory one. For that single-process setup,
+settings.NOTIFICATION_OUTBOX_EAGER hands each committed request's entries
+to a background thread of the web process, which delivers just those, so
+the request never waits for the fan-out.
+"""
+import logging
+import queue
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import events
+from .models import Notification, NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+CLAIM_TIMEOUT = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+
+
+def enqueue(user_id, message, notification_type='system', group_key=None, grouped_message=''):
+    """Queue one notification for user_id; call inside the transaction making the change"""
+    return enqueue_many([NotificationOutbox(
+        user_id=user_id, message=message, notification_type=notification_type,
+        group_key=group_key, grouped_message=grouped_message,
+    )])[0]
+
+
+def enqueue_many(entries):
+    """Queue unsaved NotificationOutbox entries with one INSERT"""
+    entries = NotificationOutbox.objects.bulk_create(entries)
+    if entries and getattr(settings, 'NOTIFICATION_OUTBOX_EAGER', False):
+        ids = [entry.id for entry in entries]
+        transaction.on_commit(lambda: _hand_off(ids))
+    return entries
+
+
+_eager_ids = queue.SimpleQueue()
+_eager_lock = threading.Lock()
+_eager_thread = None
+
+
+def _hand_off(ids):
+    """Queue committed entry ids for this process's eager delivery thread"""
+    global _eager_thread
+    _eager_ids.put(ids)
+    with _eager_lock:
+        if _eager_thread is None or not _eager_thread.is_alive():
+            _eager_thread = threading.Thread(target=_deliver_eagerly, name='notification-outbox', daemon=True)
+            _eager_thread.start()
+
+
+def _deliver_eagerly():
+    while True:
+        ids = _eager_ids.get()
+        try:
+            dispatch(ids=ids)
+        except Exception:
+            logger.exception("Eager delivery of notification outbox entries %s failed", ids)
+        finally:
+            close_old_connections()
+
+
+def pending():
+    """Entries a worker may claim: unclaimed, or claimed too long ago, and not given up on"""
+    return NotificationOutbox.objects.filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=timezone.now() - CLAIM_TIMEOUT),
+        attempts__lt=MAX_ATTEMPTS,
+    )
+
+
+def claim(batch_size=BATCH_SIZE, ids=None):
+    """Claim up to batch_size of the oldest pending entries (among ids, if given) for this pass and return them"""
+    candidates = pending() if ids is None else pending().filter(id__in=ids)
+    ids = list(candidates.order_by('id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    # Re-checked in the UPDATE, so an entry another worker took in between is skipped
+    pending().filter(id__in=ids).update(claimed_by=token, claimed_at=timezone.now())
+    return list(NotificationOutbox.objects.filter(claimed_by=token))
+
+
+def deliver(entries):
+    """Write the notifications for claimed entries and remove them, in one transaction"""
+    with transaction.atomic():
+        created = Notification.objects.bulk_create([
+            Notification(user_id=entry.user_id, message=entry.message, notification_type=entry.notification_type)
+            for entry in entries if not entry.group_key
+        ])
+        events.notifications_created(created)
+
+        groups = {}
+        for entry in entries:
+            if entry.group_key:
+                groups.setdefault((entry.user_id, entry.group_key), []).append(entry)
+        for (user_id, group_key), group in groups.items():
+            first, latest = group[0], group[-1]
+            Notification.objects.notify_grouped(
+                user_id, first.notification_type, group_key,
+                message=latest.message, grouped_message=latest.grouped_message, count=len(group),
+            )
+        NotificationOutbox.objects.filter(id__in=[entry.id for entry in entries]).delete()
+
+
+def dispatch(batch_size=BATCH_SIZE, ids=None):
+    """
+    Deliver pending entries (only those in ids, if given) batch by batch
+    until none are left; returns how many were delivered
+    """
+    delivered = 0
+    while True:
+        entries = claim(batch_size, ids)
+        if not entries:
+            return delivered
+        try:
+            deliver(entries)
+            delivered += len(entries)
+        except Exception:
+            # Retry one by one so a bad entry does not hold back the rest
+            for entry in entries:
+                try:
+                    deliver([entry])
+                    delivered += 1
+                except Exception as error:
+                    logger.exception("Could not deliver notification outbox entry %s", entry.id)
+                    # Keep the claim so the entry waits CLAIM_TIMEOUT before its retry
+                    NotificationOutbox.objects.filter(pk=entry.pk).update(
+                        attempts=F('attempts') + 1, last_error=str(error)
+                    )
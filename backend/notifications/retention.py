@@ -0,0 +1,52 @@
+"""
+Notification retention.
+
+Users only ever look at their recent notifications, so read ones older than
+settings.NOTIFICATION_RETENTION_DAYS are moved to ArchivedNotification by
+`manage.py archive_notifications` (schedule it daily). Each batch is copied
+and deleted in its own short transaction, walking the primary key, so the
+job never holds long locks and can be stopped and rerun at any point.
+Unread notifications are never archived, so the unread counters are not
+affected, and nothing references a notification; each batch is therefore
+removed with one plain DELETE statement instead of a collector that loads
+the rows and sends post_delete for each of them.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification
+
+BATCH_SIZE = 1000
+ARCHIVED_FIELDS = ('id', 'user_id', 'message', 'notification_type', 'created_at', 'group_key', 'group_count')
+
+
+def expired(days=None):
+    """Read notifications older than the retention period"""
+    days = settings.NOTIFICATION_RETENTION_DAYS if days is None else days
+    return Notification.objects.filter(is_read=True, created_at__lt=timezone.now() - timedelta(days=days))
+
+
+def archive(days=None, batch_size=BATCH_SIZE):
+    """Move expired notifications to the archive table; returns how many were moved"""
+    candidates = expired(days).order_by('id')
+    moved = last_id = 0
+    while True:
+        with transaction.atomic():
+            rows = list(candidates.filter(id__gt=last_id).values(*ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                return moved
+            ids = [row['id'] for row in rows]
+            ArchivedNotification.objects.bulk_create([ArchivedNotification(**row) for row in rows])
+            delete_rows(ids)
+        moved += len(ids)
+        last_id = ids[-1]
+
+
+def delete_rows(ids):
+    """Delete the given notifications with one DELETE statement, without loading them or sending signals"""
+    table = connection.ops.quote_name(Notification._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
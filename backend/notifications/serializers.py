@@ -1,8 +1,15 @@
 from rest_framework import serializers
 from .models import Notification
+from . import cursors
 
 class NotificationSerializer(serializers.ModelSerializer):
+    # Pass back as ?before= / ?since= (see NotificationListView)
+    cursor = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
-        fields = ['id', 'user', 'message', 'notification_type', 'is_read', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at']
+        fields = ['id', 'user', 'message', 'notification_type', 'is_read', 'created_at', 'group_count', 'cursor']
+        read_only_fields = ['id', 'user', 'created_at', 'group_count']
+
+    def get_cursor(self, obj):
+        return cursors.encode(obj)
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from .models import Notification, NotificationCounter
+from . import events
+
+
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, **kwargs):
+    if created:
+        events.notifications_created([instance])
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        events.notifications_read(instance.user_id, 1)
+
+
+@receiver(post_save, sender=User)
+def create_notification_counter(sender, instance, created, **kwargs):
+    if created:
+        NotificationCounter.objects.create(user=instance)
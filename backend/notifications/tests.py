@@ -1,3 +1,307 @@
-from django.test import TestCase
+import importlib.util
+import io
+from datetime import timedelta
+import json
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from chat import tickets
+from chat.models import Conversation
+from .models import ArchivedNotification, Notification, NotificationCounter, NotificationOutbox
+from . import checks, cursors, events, outbox, retention
+
+
+class ConversationFixtureMixin:
+    """A store and a customer with a conversation, and a helper for the store to message"""
+
+    def setUp(self):
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Silk House', role='Store', is_store=True, is_verified=True
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        self.conversation = Conversation.objects.create(customer=self.customer, store=self.store)
+
+    def send(self, count):
+        self.client.force_authenticate(self.store)
+        for i in range(count):
+            response = self.client.post(f'/api/chat/{self.conversation.id}/send/', {'text': f'Hi {i}'}, format='json')
+            self.assertEqual(response.status_code, 201)
+        outbox.dispatch()
+
+
+class ChatNotificationCoalescingTests(ConversationFixtureMixin, APITestCase):
+    """A burst of chat messages leaves one unread notification per conversation"""
+
+    def test_messages_update_one_notification(self):
+        self.send(1)
+        self.assertEqual(Notification.objects.get().message, 'Silk House sent you a message')
+        self.send(49)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.customer)
+        self.assertEqual(notification.group_count, 50)
+        self.assertEqual(notification.message, '50 new messages from Silk House')
+
+    def test_read_notification_starts_a_new_group(self):
+        self.send(3)
+        self.client.force_authenticate(self.customer)
+        self.client.post(f'/api/chat/{self.conversation.id}/read/')
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+        self.send(2)
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(Notification.objects.get(is_read=False).group_count, 2)
+
+
+@skipIf(importlib.util.find_spec('channels') is None, 'channels is not installed')
+class NotificationStreamTests(TransactionTestCase):
+    """/api/notifications/stream/ pushes new notifications as Server-Sent Events"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+
+    @staticmethod
+    def parse(chunk):
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines() if ': ' in line)
+        return fields['event'], json.loads(fields['data'])
+
+    def test_stream_pushes_new_notifications(self):
+        async def scenario():
+            response = await AsyncClient().get(f'/api/notifications/stream/?ticket={tickets.issue(self.user)}')
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            stream = response.streaming_content.__aiter__()
+            try:
+                self.assertEqual(self.parse(await stream.__anext__()), ('notification.unread_count', {'unread_count': 0}))
+                await sync_to_async(Notification.objects.create)(user=self.user, message='Approved')
+                event, data = self.parse(await stream.__anext__())
+                self.assertEqual(event, 'notification.created')
+                self.assertEqual(data['notification']['message'], 'Approved')
+                self.assertEqual(data['unread_count'], 1)
+            finally:
+                await stream.aclose()
+
+        async_to_sync(scenario)()
+
+    def test_stream_requires_ticket(self):
+        async def scenario():
+            response = await AsyncClient().get('/api/notifications/stream/?ticket=bad')
+            self.assertEqual(response.status_code, 401)
+
+        async_to_sync(scenario)()
+
+    def test_stream_is_refused_under_wsgi(self):
+        # The test Client goes through the WSGI handler
+        response = self.client.get(f'/api/notifications/stream/?ticket={tickets.issue(self.user)}')
+        self.assertEqual(response.status_code, 503)
+
+
+class UnreadCounterTests(ConversationFixtureMixin, APITestCase):
+    """The unread counter follows every create/read path and is read with one query"""
+
+    def assert_counter(self, user, expected):
+        self.assertEqual(events.reconcile_unread(), {})
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/notifications/unread-count/')
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(response.data['unread_count'], expected)
+
+    def test_counter_tracks_changes(self):
+        Notification.objects.bulk_create([Notification(user=self.customer, message=str(i)) for i in range(3)])
+        events.notifications_created(list(Notification.objects.filter(user=self.customer)))
+        self.send(4)  # one coalesced chat notification
+        self.assert_counter(self.customer, 4)
+
+        self.client.force_authenticate(self.customer)
+        first = Notification.objects.filter(group_key__isnull=True).first()
+        self.client.patch(f'/api/notifications/{first.id}/read/')
+        self.client.patch(f'/api/notifications/{first.id}/read/')
+        self.assert_counter(self.customer, 3)
+        self.client.post(f'/api/chat/{self.conversation.id}/read/')
+        self.assert_counter(self.customer, 2)
+        Notification.objects.filter(is_read=False).first().delete()
+        self.assert_counter(self.customer, 1)
+        self.client.patch('/api/notifications/read-all/')
+        self.assert_counter(self.customer, 0)
+
+    def test_reconcile_repairs_drift(self):
+        Notification.objects.create(user=self.customer, message='Hello')
+        NotificationCounter.objects.filter(user=self.customer).update(unread=7)
+        self.assertEqual(events.reconcile_unread(), {self.customer.id: (7, 1)})
+        NotificationCounter.objects.filter(user=self.customer).delete()
+        self.assertEqual(events.unread_count(self.customer.id), 1)
+
+    def test_counter_is_not_clamped(self):
+        # A counter pushed below zero by a missed increment must stay visible to reconcile
+        NotificationCounter.objects.filter(user=self.customer).update(unread=0)
+        events.notifications_read(self.customer.id, 2)
+        self.assertEqual(events.reconcile_unread(), {self.customer.id: (-2, 0)})
+
+
+# The worker refuses the in-memory layer; without a layer pushes are simply skipped
+@override_settings(CHANNEL_LAYERS={})
+class NotificationOutboxTests(ConversationFixtureMixin, APITestCase):
+    """Requests only queue notifications; the dispatcher delivers them in batches"""
+
+    def test_requests_queue_and_dispatcher_delivers(self):
+        self.client.force_authenticate(self.store)
+        for i in range(3):
+            self.client.post(f'/api/chat/{self.conversation.id}/send/', {'text': f'Hi {i}'}, format='json')
+        outbox.enqueue(self.customer.id, 'Your rental request has been approved.', notification_type='rental')
+        self.assertEqual(NotificationOutbox.objects.count(), 4)
+        self.assertFalse(Notification.objects.exists())
+
+        call_command('dispatch_notifications', '--once', '--workers', '1', stdout=io.StringIO())
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertEqual(
+            sorted(Notification.objects.values_list('message', 'group_count')),
+            [('3 new messages from Silk House', 3), ('Your rental request has been approved.', 1)],
+        )
+        self.assertEqual(events.unread_count(self.customer.id), 2)
+
+    def test_failed_entry_is_kept_for_retry(self):
+        outbox.enqueue(self.customer.id, 'Plain')
+        outbox.enqueue(self.customer.id, 'Grouped', group_key='chat:1', grouped_message='{count} grouped')
+        with mock.patch.object(Notification.objects, 'notify_grouped', side_effect=RuntimeError('boom')), \
+                self.assertLogs('notifications.outbox', 'ERROR'):
+            self.assertEqual(outbox.dispatch(), 1)
+        self.assertEqual(list(Notification.objects.values_list('message', flat=True)), ['Plain'])
+
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual((entry.attempts, entry.last_error), (1, 'boom'))
+        self.assertEqual(outbox.dispatch(), 0)  # still claimed until the claim times out
+        NotificationOutbox.objects.update(claimed_at=entry.claimed_at - outbox.CLAIM_TIMEOUT)
+        self.assertEqual(outbox.dispatch(), 1)
+        self.assertEqual(Notification.objects.count(), 2)
+
+    @override_settings(NOTIFICATION_OUTBOX_EAGER=True)
+    def test_eager_mode_hands_only_this_requests_entries_off(self):
+        outbox.enqueue(self.customer.id, 'Queued earlier')
+        with mock.patch.object(outbox, '_hand_off') as hand_off, \
+                self.captureOnCommitCallbacks(execute=True):
+            entry = outbox.enqueue(self.customer.id, 'This request')
+        # Nothing is delivered on the request thread
+        hand_off.assert_called_once_with([entry.id])
+        self.assertFalse(Notification.objects.exists())
+
+        self.assertEqual(outbox.dispatch(ids=[entry.id]), 1)
+        self.assertEqual(list(Notification.objects.values_list('message', flat=True)), ['This request'])
+        self.assertEqual(list(NotificationOutbox.objects.values_list('message', flat=True)), ['Queued earlier'])
+
+    @skipIf(importlib.util.find_spec('channels') is None, 'channels is not installed')
+    def test_worker_needs_a_shared_channel_layer(self):
+        in_memory = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+        with self.settings(CHANNEL_LAYERS=in_memory):
+            with self.assertRaisesMessage(CommandError, 'InMemoryChannelLayer'):
+                call_command('dispatch_notifications', '--once', stdout=io.StringIO())
+            with self.settings(NOTIFICATION_OUTBOX_EAGER=True):
+                self.assertEqual(checks.outbox_delivery_check(None), [])
+            with self.settings(NOTIFICATION_OUTBOX_EAGER=False):
+                self.assertEqual([error.id for error in checks.outbox_delivery_check(None)], ['notifications.E001'])
+        with self.settings(NOTIFICATION_OUTBOX_EAGER=False):
+            self.assertEqual(checks.outbox_delivery_check(None), [])
+
+
+class NotificationRetentionTests(ConversationFixtureMixin, APITestCase):
+    """archive_notifications moves old read notifications to the archive table"""
+
+    def test_archives_old_read_notifications(self):
+        old = timezone.now() - timedelta(days=40)
+        for message, is_read in (('old read 1', True), ('old read 2', True), ('old unread', False)):
+            notification = Notification.objects.create(user=self.customer, message=message, is_read=is_read)
+            Notification.objects.filter(pk=notification.pk).update(created_at=old)
+        Notification.objects.create(user=self.customer, message='new read', is_read=True)
+
+        call_command('archive_notifications', '--days', '30', '--batch-size', '1', stdout=io.StringIO())
+        self.assertEqual(sorted(Notification.objects.values_list('message', flat=True)), ['new read', 'old unread'])
+        archived = ArchivedNotification.objects.order_by('id')
+        self.assertEqual(list(archived.values_list('message', flat=True)), ['old read 1', 'old read 2'])
+        self.assertEqual(archived[0].created_at, old)
+        self.assertEqual(events.reconcile_unread(), {})
+
+    def test_archive_deletes_in_bulk(self):
+        old = timezone.now() - timedelta(days=40)
+        Notification.objects.bulk_create(
+            [Notification(user=self.customer, message=str(i), is_read=True) for i in range(5)]
+        )
+        Notification.objects.update(created_at=old)
+        deleted = mock.Mock()
+        post_delete.connect(deleted, sender=Notification)
+        self.addCleanup(post_delete.disconnect, deleted, sender=Notification)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(retention.archive(days=30), 5)
+        deleted.assert_not_called()
+        deletes = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 1)
+        self.assertFalse(Notification.objects.exists())
+
+
+class NotificationHistoryTests(ConversationFixtureMixin, APITestCase):
+    """NotificationListView pages with before / since instead of a fixed newest 20"""
+
+    def page(self, query=''):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(f'/api/notifications/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def list(self, query=''):
+        return [notification['message'] for notification in self.page(query)]
+
+    def cursor(self, message):
+        return cursors.encode(Notification.objects.get(message=message))
+
+    def test_before_and_since(self):
+        for i in range(25):
+            Notification.objects.create(user=self.customer, message=str(i))
+        first = self.page()
+        self.assertEqual([notification['message'] for notification in first], [str(i) for i in range(24, 4, -1)])
+        self.assertEqual(self.list(f"?before={first[-1]['cursor']}"), ['4', '3', '2', '1', '0'])
+        self.assertEqual(self.list(f"?before={self.cursor('5')}&limit=2"), ['4', '3'])
+        self.assertEqual(self.list(f"?since={first[0]['cursor']}"), [])
+        self.assertEqual(self.list(f"?since={self.cursor('20')}&limit=2"), ['22', '21'])
+
+        Notification.objects.create(user=self.customer, message='new')
+        self.send(2)  # a coalesced chat notification comes back each time it is bumped
+        self.assertEqual(self.list(f"?since={first[0]['cursor']}"), ['2 new messages from Silk House', 'new'])
+
+    def test_cursor_row_is_bumped(self):
+        self.send(1)
+        for i in range(3):
+            Notification.objects.create(user=self.customer, message=str(i))
+        chat = self.page('?limit=1&before=' + self.cursor('0'))[0]
+        newest = self.page('?limit=1')[0]
+        self.assertEqual(chat['message'], 'Silk House sent you a message')
+
+        self.send(1)  # bumps the chat notification to the top
+        # Paging on from its old position neither stalls nor repeats rows
+        self.assertEqual(self.list(f"?before={chat['cursor']}"), [])
+        self.assertEqual(self.list(f"?before={newest['cursor']}"), ['1', '0'])
+        # and polling from it or from the former newest row returns the bumped row
+        self.assertEqual(self.list(f"?since={newest['cursor']}"), ['2 new messages from Silk House'])
+        self.assertEqual(self.list(f"?since={chat['cursor']}"), ['2 new messages from Silk House', '2', '1', '0'])
+
+    def test_archived_and_invalid_cursors(self):
+        Notification.objects.create(user=self.customer, message='kept')
+        gone = Notification.objects.create(user=self.customer, message='archived', is_read=True)
+        cursor = cursors.encode(gone)
+        gone.delete()
+        self.assertEqual(self.list(f'?before={cursor}'), ['kept'])
+        self.assertEqual(self.list(f'?since={cursor}'), [])
+
+        self.client.force_authenticate(self.customer)
+        for query in ('?since=abc', f'?before={gone.id}', '?before=bm9uZQ'):
+            self.assertEqual(self.client.get(f'/api/notifications/{query}').status_code, 400)
@@ -1,9 +1,12 @@
 from django.urls import path
-from .views import NotificationListView, MarkAsReadView, MarkAllAsReadView, UnreadCountView
+from chat.views import ConnectionTicketView
+from .views import NotificationListView, MarkAsReadView, MarkAllAsReadView, UnreadCountView, NotificationStreamView
 
 urlpatterns = [
     path('', NotificationListView.as_view(), name='notification-list'),
     path('<int:pk>/read/', MarkAsReadView.as_view(), name='mark-as-read'),
     path('read-all/', MarkAllAsReadView.as_view(), name='mark-all-read'),
     path('unread-count/', UnreadCountView.as_view(), name='unread-count'),
+    path('stream/', NotificationStreamView.as_view(), name='notification-stream'),
+    path('stream-ticket/', ConnectionTicketView.as_view(), name='notification-stream-ticket'),
 ]
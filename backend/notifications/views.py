@@ -1,17 +1,73 @@
-from rest_framework import generics, permissions, status
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import permissions, status
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from accounts.models import User
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db import transaction
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from .models import Notification
 from .serializers import NotificationSerializer
+from . import cursors, events
+from chat import realtime, tickets
+
+class NotificationListView(APIView):
+    """
+    The user's notifications, newest first.
 
-class NotificationListView(generics.ListAPIView):
-    serializer_class = NotificationSerializer
+    GET /api/notifications/                        latest `limit` notifications
+    GET /api/notifications/?before=C&limit=20      the `limit` notifications older than cursor C (history)
+    GET /api/notifications/?since=C                notifications newer than cursor C (polling; usually empty)
+    C is the `cursor` of a notification in an earlier response (see
+    notifications.cursors). Keyset pages over the (user, created_at, id)
+    index; limit defaults to 20 (max 100). A coalesced notification moves to
+    the top when it is bumped, so `since` returns it again with its new
+    message and count, while its old cursor still pages from where it was.
+    `since` returns the oldest `limit` new rows, so polling again from the
+    newest one skips nothing.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        try:
+            before = request.query_params.get('before')
+            since = request.query_params.get('since')
+            before = cursors.decode(before) if before else None
+            since = cursors.decode(since) if since else None
+        except ValueError:
+            return Response({"error": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit') or self.default_limit), 1), self.max_limit)
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
 
-    def get_queryset(self):
-        # Limit to 20 most recent notifications for performance
-        return Notification.objects.filter(user=self.request.user)[:20]
+        notifications = Notification.objects.filter(user=request.user)
+        if since is not None:
+            notifications = notifications.filter(self.keyset(since, 'gt'))
+            # Oldest new rows first for the limit, then back to newest first
+            notifications = list(notifications.order_by('created_at', 'id')[:limit])[::-1]
+        else:
+            if before is not None:
+                notifications = notifications.filter(self.keyset(before, 'lt'))
+            notifications = notifications.order_by('-created_at', '-id')[:limit]
+
+        return Response(NotificationSerializer(notifications, many=True).data)
+
+    @staticmethod
+    def keyset(position, op):
+        """Notifications strictly newer ('gt') or older ('lt') than a decoded (created_at, id) cursor"""
+        created_at, notification_id = position
+        return Q(**{f'created_at__{op}': created_at}) | Q(created_at=created_at, **{f'id__{op}': notification_id})
 
 class MarkAsReadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -19,20 +75,92 @@ class MarkAsReadView(APIView):
     def patch(self, request, pk):
         # Ensure user can only mark their own notifications as read
         notification = get_object_or_404(Notification, id=pk, user=request.user)
-        notification.is_read = True
-        notification.save()
+        with transaction.atomic():
+            # Only the request that actually flips the row decrements the counter
+            marked = Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True)
+            events.notifications_read(request.user.id, marked)
         return Response({"status": "notification marked as read"}, status=status.HTTP_200_OK)
 
 class MarkAllAsReadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def patch(self, request):
-        Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        with transaction.atomic():
+            marked = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+            events.notifications_read(request.user.id, marked)
         return Response({"status": "all notifications marked as read"}, status=status.HTTP_200_OK)
 
 class UnreadCountView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        count = Notification.objects.filter(user=request.user, is_read=False).count()
-        return Response({"unread_count": count}, status=status.HTTP_200_OK)
+        # Denormalized counter (see notifications.events); one primary-key read
+        return Response({"unread_count": events.unread_count(request.user.id)}, status=status.HTTP_200_OK)
+
+
+def _stream_user(request):
+    """
+    User for a stream request: ?ticket=<ticket from stream-ticket/> (EventSource
+    can't send headers, and an access token in the URL would be logged) or a Bearer header
+    """
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = tickets.user_id_for(ticket)
+        return User.objects.filter(pk=user_id, is_active=True).first() if user_id else None
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class NotificationStreamView(View):
+    """
+    GET /api/notifications/stream/?ticket=<ticket>  (POST stream-ticket/ first)
+    Server-Sent Events: the current unread count on connect, then a
+    "notification.created" event (the notification plus the new unread count)
+    for every new notification and "notification.unread_count" when
+    notifications are read. A comment line is sent every heartbeat_seconds
+    to keep proxies from closing the stream.
+    Only the ASGI app can hold the stream open: under WSGI the response would
+    be buffered forever and tie up a worker, so it answers 503 and the client
+    polls unread-count/ instead.
+    """
+    heartbeat_seconds = 20
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": "Live notifications need the ASGI server. Poll unread-count/ instead."}, status=503)
+        user = await sync_to_async(_stream_user)(request)
+        if user is None:
+            return JsonResponse({"error": "Authentication credentials were not provided or are invalid."}, status=401)
+        layer = realtime.channel_layer()
+        if layer is None:
+            return JsonResponse({"error": "Live notifications are unavailable. Poll unread-count/ instead."}, status=503)
+
+        response = StreamingHttpResponse(self.stream(layer, user.id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, layer, user_id):
+        channel = await layer.new_channel()
+        group = realtime.user_group(user_id)
+        await layer.group_add(group, channel)
+        try:
+            count = await sync_to_async(events.unread_count)(user_id)
+            yield "retry: 5000\n" + _sse("notification.unread_count", {"unread_count": count})
+            while True:
+                try:
+                    message = await asyncio.wait_for(layer.receive(channel), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message.get('event', '').startswith('notification.'):
+                    yield _sse(message['event'], message['data'])
+        finally:
+            await layer.group_discard(group, channel)
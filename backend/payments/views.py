@@ -1,6 +1,8 @@
+import logging
 import uuid
 import requests
 from django.conf import settings
+from django.db import transaction
 from django.shortcuts import redirect
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -8,6 +10,9 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Payment
 from .utils import generate_signature
 from rent.models import Rental
+from rent.transitions import TransitionError, transition
+
+logger = logging.getLogger(__name__)
 
 class InitiatePaymentView(APIView):
     permission_classes = [IsAuthenticated]
@@ -58,7 +63,6 @@ class EsewaVerifyView(APIView):
     def get(self, request):
         import base64
         import json
-        from notifications.models import Notification  # Import here to avoid circular imports if any
 
         data = request.GET.get("data")
         if not data:
@@ -84,20 +88,21 @@ class EsewaVerifyView(APIView):
                 payment.save()
                 return redirect("http://localhost:5173/payment-failure")
 
-            # Update status
-            payment.status = "completed"
-            payment.save()
-            
-            rental = payment.rental
-            rental.status = "rented"
-            rental.save()
+            already_completed = payment.status == "completed"
+            try:
+                # The payment only counts as completed if the rental moves too
+                with transaction.atomic():
+                    payment.status = "completed"
+                    payment.save()
 
-            # Create Notification for Store Owner
-            Notification.objects.create(
-                user=rental.store,
-                message=f"Payment received for rental of '{rental.clothing.item_name}'.",
-                notification_type='rental'
-            )
+                    rental = Rental.objects.select_related('clothing', 'store', 'customer').get(pk=payment.rental_id)
+                    # approved -> rented; also notifies the store owner
+                    transition(rental, Rental.Status.RENTED)
+            except TransitionError as e:
+                # e.g. eSewa calling back twice for the same payment
+                logger.warning("Rental %s not moved to rented after payment: %s", payment.rental_id, e)
+                if not already_completed:
+                    return redirect("http://localhost:5173/payment-failure")
             
             return redirect("http://localhost:5173/payment-success")
             
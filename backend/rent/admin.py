@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Rental
+from .models import Rental, RentalEvent
 
 @admin.register(Rental)
 class RentalAdmin(admin.ModelAdmin):
@@ -13,3 +13,10 @@ class RentalAdmin(admin.ModelAdmin):
     )
     list_filter = ('status', 'created_at')
     search_fields = ('customer__email', 'store__store_name', 'clothing__item_name')
+
+
+@admin.register(RentalEvent)
+class RentalEventAdmin(admin.ModelAdmin):
+    list_display = ('rental', 'from_status', 'to_status', 'actor', 'created_at')
+    list_filter = ('to_status', 'created_at')
+    readonly_fields = ('rental', 'from_status', 'to_status', 'actor', 'created_at')
@@ -0,0 +1,192 @@
+"""
+Date-range availability for rentable clothing.
+
+Every rental in a holding status (approved, rented, returned_pending)
+occupies one unit of its item, in its size when it has one, on each day
+from rent_start_date to rent_end_date. Those holds are kept per day in
+DailyOccupancy, so "how many units of X are free between d1 and d2" is one
+indexed range read over (clothing, day) instead of a scan of the item's
+rentals.
+
+Clothing.stock_quantity is the item's capacity: the units the store owns,
+split by size in ClothingSize. Approving a rental takes nothing off a
+counter; rent.transitions checks capacity minus the peak occupancy over the
+rental's own dates, so a booking weeks ahead never blocks this week.
+
+Availability calendars (per-day free units over a window) read the same
+rows: one range read over (clothing, day) for all requested items. The rows
+are updated in the transaction that moves a rental, so every process sees a
+calendar that is current as of the last commit, with nothing to invalidate.
+"""
+from datetime import timedelta
+
+from django.db.models import F, Sum
+
+from accounts.models import Clothing, ClothingSize
+from .models import DailyOccupancy, Rental
+
+HOLDING_STATUSES = frozenset({
+    Rental.Status.APPROVED,
+    Rental.Status.RENTED,
+    Rental.Status.RETURNED_PENDING,
+})
+
+MAX_WINDOW_DAYS = 366
+MAX_CALENDAR_ITEMS = 50
+
+
+def is_holding(status):
+    return status in HOLDING_STATUSES
+
+
+def rental_days(start, end):
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def adjust_occupancy(clothing_id, start, end, delta, size=''):
+    """Add delta held units (of size, '' for none) to every day of [start, end]"""
+    if delta > 0:
+        # Make sure every day has a row, then bump them all in one UPDATE
+        DailyOccupancy.objects.bulk_create(
+            [DailyOccupancy(clothing_id=clothing_id, size=size, day=day, units=0) for day in rental_days(start, end)],
+            ignore_conflicts=True,
+        )
+    days = DailyOccupancy.objects.filter(clothing_id=clothing_id, size=size, day__range=(start, end))
+    days.update(units=F('units') + delta)
+    if delta < 0:
+        days.filter(units__lte=0).delete()
+
+
+def apply_transition(rental, old_status, new_status):
+    """Hold or release the rental's days when it moves into or out of a holding status"""
+    held_before, held_after = is_holding(old_status), is_holding(new_status)
+    if held_before == held_after:
+        return
+    adjust_occupancy(
+        rental.clothing_id, rental.rent_start_date, rental.rent_end_date,
+        1 if held_after else -1, rental.size,
+    )
+
+
+def adjust_occupancy_many(intervals, delta):
+    """
+    Add delta held units to every day of many (clothing_id, size, start, end)
+    intervals, with one UPDATE per (clothing, size, units-added) group
+    """
+    changes = {}
+    for clothing_id, size, start, end in intervals:
+        per_day = changes.setdefault((clothing_id, size), {})
+        for day in rental_days(start, end):
+            per_day[day] = per_day.get(day, 0) + delta
+    if not changes:
+        return
+
+    if delta > 0:
+        DailyOccupancy.objects.bulk_create(
+            [DailyOccupancy(clothing_id=clothing_id, size=size, day=day, units=0)
+             for (clothing_id, size), per_day in changes.items() for day in per_day],
+            ignore_conflicts=True, batch_size=500,
+        )
+    for (clothing_id, size), per_day in changes.items():
+        days_by_change = {}
+        for day, change in per_day.items():
+            days_by_change.setdefault(change, []).append(day)
+        for change, days in days_by_change.items():
+            DailyOccupancy.objects.filter(
+                clothing_id=clothing_id, size=size, day__in=days
+            ).update(units=F('units') + change)
+    if delta < 0:
+        clothing_ids = {clothing_id for clothing_id, _ in changes}
+        DailyOccupancy.objects.filter(clothing_id__in=clothing_ids, units__lte=0).delete()
+
+
+def apply_transitions(rentals, old_status, new_status):
+    """Batch form of apply_transition for rentals all moving old_status -> new_status"""
+    held_before, held_after = is_holding(old_status), is_holding(new_status)
+    if held_before == held_after:
+        return
+    intervals = [(rental.clothing_id, rental.size, rental.rent_start_date, rental.rent_end_date) for rental in rentals]
+    adjust_occupancy_many(intervals, 1 if held_after else -1)
+
+
+def capacity(clothing, size=''):
+    """Units of the item the store owns, or of one of its sizes"""
+    if size:
+        return ClothingSize.objects.filter(clothing=clothing, size=size).values_list('stock_quantity', flat=True).first() or 0
+    return max(clothing.stock_quantity, 0)
+
+
+def occupancy_by_day(clothing_id, start, end, size=None):
+    """{day: units held} over [start, end] for the item (all sizes) or one size, in one range read"""
+    rows = DailyOccupancy.objects.filter(clothing_id=clothing_id, day__range=(start, end))
+    if size is not None:
+        rows = rows.filter(size=size)
+    return dict(rows.values('day').annotate(held=Sum('units')).order_by().values_list('day', 'held'))
+
+
+def peak_occupancy(clothing_id, start, end, size=None):
+    """Most units held on any single day of [start, end], of the item or of one size"""
+    return max(occupancy_by_day(clothing_id, start, end, size).values(), default=0)
+
+
+def free_units(clothing, start, end, size=''):
+    """Units of the item (in size, if given) that can still be booked for the whole of [start, end]"""
+    free = capacity(clothing) - peak_occupancy(clothing.pk, start, end)
+    if size:
+        free = min(free, capacity(clothing, size) - peak_occupancy(clothing.pk, start, end, size))
+    return max(free, 0)
+
+
+def month_end(month):
+    return (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def daily_occupancy(clothing_ids, start, end):
+    """{clothing_id: {day: units held}} over [start, end] (days without holds omitted), in one range read"""
+    held = {clothing_id: {} for clothing_id in clothing_ids}
+    rows = DailyOccupancy.objects.filter(
+        clothing_id__in=clothing_ids, day__range=(start, end)
+    ).values('clothing_id', 'day').annotate(held=Sum('units')).order_by().values_list('clothing_id', 'day', 'held')
+    for clothing_id, day, units in rows.iterator():
+        held[clothing_id][day] = units
+    return held
+
+
+def calendar(clothing_ids, start, end):
+    """{clothing_id: {"capacity": n, "days": {date: free units}}} for [start, end]"""
+    stock = dict(Clothing.objects.filter(id__in=clothing_ids).values_list('id', 'stock_quantity'))
+    occupancy = daily_occupancy(list(stock), start, end)
+
+    items = {}
+    for clothing_id, stock_quantity in sorted(stock.items()):
+        capacity = max(stock_quantity, 0)
+        days = {}
+        day = start
+        while day <= end:
+            days[day] = max(capacity - occupancy[clothing_id].get(day, 0), 0)
+            day += timedelta(days=1)
+        items[clothing_id] = {"capacity": capacity, "days": days}
+    return items
+
+
+def rebuild_occupancy(clothing_ids=None):
+    """Recompute DailyOccupancy from the holding rentals (all items, or just clothing_ids)"""
+    rentals = Rental.objects.filter(status__in=HOLDING_STATUSES)
+    existing = DailyOccupancy.objects.all()
+    if clothing_ids is not None:
+        rentals = rentals.filter(clothing_id__in=clothing_ids)
+        existing = existing.filter(clothing_id__in=clothing_ids)
+
+    counts = {}
+    rows = rentals.values_list('clothing_id', 'size', 'rent_start_date', 'rent_end_date')
+    for clothing_id, size, start, end in rows.iterator():
+        for day in rental_days(start, end):
+            counts[(clothing_id, size, day)] = counts.get((clothing_id, size, day), 0) + 1
+
+    existing.delete()
+    DailyOccupancy.objects.bulk_create(
+        [DailyOccupancy(clothing_id=clothing_id, size=size, day=day, units=units)
+         for (clothing_id, size, day), units in counts.items()],
+        batch_size=1000,
+    )
+    return len(counts)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rent.availability import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-day DailyOccupancy rows from approved/rented/returned_pending rentals."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clothing',
+            type=int,
+            nargs='+',
+            help='Only rebuild these clothing ids.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            days = rebuild_occupancy(options['clothing'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt occupancy: {days} item-days held."))
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:36
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+HOLDING_STATUSES = ['approved', 'rented', 'returned_pending']
+
+
+def backfill_occupancy(apps, schema_editor):
+    Rental = apps.get_model('rent', 'Rental')
+    DailyOccupancy = apps.get_model('rent', 'DailyOccupancy')
+    counts = {}
+    rentals = Rental.objects.filter(status__in=HOLDING_STATUSES)
+    for clothing_id, start, end in rentals.values_list('clothing_id', 'rent_start_date', 'rent_end_date').iterator():
+        for offset in range((end - start).days + 1):
+            key = (clothing_id, start + timedelta(days=offset))
+            counts[key] = counts.get(key, 0) + 1
+    DailyOccupancy.objects.bulk_create(
+        [DailyOccupancy(clothing_id=clothing_id, day=day, units=units) for (clothing_id, day), units in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_clothing_sizes'),
+        ('rent', '0003_alter_rental_status_delete_payment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily occupancy',
+                'ordering': ['clothing', 'day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['clothing', 'status'], name='rental_clothing_status_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailyoccupancy',
+            name='clothing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='accounts.clothing'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyoccupancy',
+            unique_together={('clothing', 'day')},
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
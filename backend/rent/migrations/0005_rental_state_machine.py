@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:48
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+STATUSES = ['pending', 'approved', 'rejected', 'rented', 'returned_pending', 'returned_confirmed']
+HOLDING_STATUSES = ['approved', 'rented', 'returned_pending']
+
+
+def normalize_statuses(apps, schema_editor):
+    """Fold legacy variants ('Rented', 'Returned Confirmed', ...) into the Rental.Status values"""
+    Rental = apps.get_model('rent', 'Rental')
+    DailyOccupancy = apps.get_model('rent', 'DailyOccupancy')
+    changed = False
+    legacy = Rental.objects.exclude(status__in=STATUSES).values_list('status', flat=True).distinct()
+    for value in list(legacy):
+        normalized = value.strip().lower().replace(' ', '_').replace('-', '_')
+        if normalized in STATUSES:
+            Rental.objects.filter(status=value).update(status=normalized)
+            changed = True
+
+    if changed:
+        # Newly recognised holding statuses have to show up in occupancy
+        counts = {}
+        rentals = Rental.objects.filter(status__in=HOLDING_STATUSES)
+        for clothing_id, start, end in rentals.values_list('clothing_id', 'rent_start_date', 'rent_end_date').iterator():
+            for offset in range((end - start).days + 1):
+                key = (clothing_id, start + timedelta(days=offset))
+                counts[key] = counts.get(key, 0) + 1
+        DailyOccupancy.objects.all().delete()
+        DailyOccupancy.objects.bulk_create(
+            [DailyOccupancy(clothing_id=clothing_id, day=day, units=units) for (clothing_id, day), units in counts.items()],
+            batch_size=1000,
+        )
+
+
+# The changes an existing rental must have gone through to reach its status,
+# so replaying the log (accounts.rollups) counts its request, approval and
+# payment; a status not listed gets a single event
+IMPLIED_PATHS = {
+    'pending': ['pending'],
+    'approved': ['pending', 'approved'],
+    'rejected': ['pending', 'rejected'],
+    'rented': ['pending', 'approved', 'rented'],
+    'returned_pending': ['pending', 'approved', 'returned_pending'],
+    'returned_confirmed': ['pending', 'approved', 'returned_pending', 'returned_confirmed'],
+}
+
+
+def backfill_events(apps, schema_editor):
+    """Events for the implied path of every existing rental to its current status, dated at creation"""
+    Rental = apps.get_model('rent', 'Rental')
+    RentalEvent = apps.get_model('rent', 'RentalEvent')
+    events = []
+    for rental_id, status in Rental.objects.values_list('id', 'status').iterator():
+        path = IMPLIED_PATHS.get(status, [status])
+        events.extend(
+            RentalEvent(rental_id=rental_id, from_status=source, to_status=target)
+            for source, target in zip([''] + path, path)
+        )
+    RentalEvent.objects.bulk_create(events, batch_size=1000)
+    RentalEvent.objects.update(
+        created_at=Subquery(Rental.objects.filter(pk=OuterRef('rental_id')).values('created_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rent', '0004_daily_occupancy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('rented', 'Rented'), ('returned_pending', 'Returned Pending'), ('returned_confirmed', 'Returned Confirmed')], max_length=20)),
+                ('to_status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('rented', 'Rented'), ('returned_pending', 'Returned Pending'), ('returned_confirmed', 'Returned Confirmed')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rental_events', to=settings.AUTH_USER_MODEL)),
+                ('rental', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='rent.rental')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['rental', 'created_at'], name='rentalevent_rental_idx'), models.Index(fields=['to_status', 'created_at'], name='rentalevent_status_idx')],
+            },
+        ),
+        migrations.RunPython(normalize_statuses, migrations.RunPython.noop),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
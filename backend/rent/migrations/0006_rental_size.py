@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rent', '0005_rental_state_machine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rental',
+            name='size',
+            field=models.CharField(blank=True, choices=[('XS', 'XS'), ('S', 'S'), ('M', 'M'), ('L', 'L'), ('XL', 'XL'), ('XXL', 'XXL')], max_length=5),
+        ),
+    ]
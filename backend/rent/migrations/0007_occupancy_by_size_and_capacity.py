@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:22
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+HOLDING_STATUSES = ['approved', 'rented', 'returned_pending']
+
+
+def occupancy_by_size(apps, schema_editor):
+    """Rebuild the occupancy rows per size rented"""
+    Rental = apps.get_model('rent', 'Rental')
+    DailyOccupancy = apps.get_model('rent', 'DailyOccupancy')
+    counts = {}
+    rentals = Rental.objects.filter(status__in=HOLDING_STATUSES)
+    for clothing_id, size, start, end in rentals.values_list('clothing_id', 'size', 'rent_start_date', 'rent_end_date').iterator():
+        for offset in range((end - start).days + 1):
+            key = (clothing_id, size, start + timedelta(days=offset))
+            counts[key] = counts.get(key, 0) + 1
+    DailyOccupancy.objects.all().delete()
+    DailyOccupancy.objects.bulk_create(
+        [DailyOccupancy(clothing_id=clothing_id, size=size, day=day, units=units)
+         for (clothing_id, size, day), units in counts.items()],
+        batch_size=1000,
+    )
+
+
+def stock_as_capacity(apps, schema_editor):
+    """
+    stock_quantity used to drop by one per held rental; it now counts every
+    unit owned, so give the held units back to the item and its size
+    """
+    Rental = apps.get_model('rent', 'Rental')
+    Clothing = apps.get_model('accounts', 'Clothing')
+    ClothingSize = apps.get_model('accounts', 'ClothingSize')
+    held = Rental.objects.filter(status__in=HOLDING_STATUSES).values('clothing_id', 'size').annotate(units=Count('id')).order_by()
+    per_item = {}
+    for row in held:
+        per_item[row['clothing_id']] = per_item.get(row['clothing_id'], 0) + row['units']
+        if row['size']:
+            ClothingSize.objects.filter(clothing_id=row['clothing_id'], size=row['size']).update(
+                stock_quantity=F('stock_quantity') + row['units']
+            )
+    for clothing_id, units in per_item.items():
+        Clothing.objects.filter(pk=clothing_id).update(stock_quantity=F('stock_quantity') + units)
+    Clothing.objects.filter(stock_quantity__gt=0, clothing_status='Unavailable').update(clothing_status='Available')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_suggestion_change'),
+        ('rent', '0006_rental_size'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='dailyoccupancy',
+            options={'ordering': ['clothing', 'day', 'size'], 'verbose_name_plural': 'Daily occupancy'},
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyoccupancy',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='dailyoccupancy',
+            name='size',
+            field=models.CharField(blank=True, default='', max_length=5),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyoccupancy',
+            unique_together={('clothing', 'size', 'day')},
+        ),
+        migrations.AddIndex(
+            model_name='dailyoccupancy',
+            index=models.Index(fields=['clothing', 'day'], name='occupancy_clothing_day_idx'),
+        ),
+        migrations.RunPython(occupancy_by_size, migrations.RunPython.noop),
+        migrations.RunPython(stock_as_capacity, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from django.conf import settings
-from accounts.models import Clothing
+from accounts.models import Clothing, ClothingSize
 
 class Rental(models.Model):
     class Status(models.TextChoices):
@@ -28,6 +28,8 @@ class Rental(models.Model):
         on_delete=models.CASCADE,
         related_name='rentals'
     )
+    # Size rented, when the item has per-size stock (blank for older rentals)
+    size = models.CharField(max_length=5, choices=ClothingSize.Size.choices, blank=True)
     rent_start_date = models.DateField()
     rent_end_date = models.DateField()
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -40,6 +42,71 @@ class Rental(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['clothing', 'status'], name='rental_clothing_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.clothing.item_name} - {self.customer.email} ({self.status})"
+
+
+class RentalEvent(models.Model):
+    """
+    Append-only log of rental status changes, written by
+    rent.transitions.transition(). Timelines and analytics read from here
+    instead of rescanning rentals.
+    """
+    rental = models.ForeignKey(
+        Rental,
+        on_delete=models.CASCADE,
+        related_name='events'
+    )
+    from_status = models.CharField(max_length=20, choices=Rental.Status.choices, blank=True)
+    to_status = models.CharField(max_length=20, choices=Rental.Status.choices)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='rental_events'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['rental', 'created_at'], name='rentalevent_rental_idx'),
+            models.Index(fields=['to_status', 'created_at'], name='rentalevent_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Rental {self.rental_id}: {self.from_status or '-'} -> {self.to_status}"
+
+
+class DailyOccupancy(models.Model):
+    """
+    Units of a clothing item held by rentals on a given day, per size rented
+    ('' for rentals made without one). One row per (clothing, size, day)
+    with at least one holding rental, maintained by rent.availability when a
+    rental enters or leaves a holding status.
+    """
+    clothing = models.ForeignKey(
+        Clothing,
+        on_delete=models.CASCADE,
+        related_name='occupancy'
+    )
+    size = models.CharField(max_length=5, blank=True, default='')
+    day = models.DateField()
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('clothing', 'size', 'day')
+        ordering = ['clothing', 'day', 'size']
+        verbose_name_plural = 'Daily occupancy'
+        indexes = [
+            # Item-wide range reads sum every size per day
+            models.Index(fields=['clothing', 'day'], name='occupancy_clothing_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.clothing_id} {self.size or '-'} @ {self.day}: {self.units}"
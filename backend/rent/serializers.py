@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from .models import Rental
+from .models import Rental, RentalEvent
 from accounts.models import Clothing
 from accounts.serializers import ClothingListSerializer
 from datetime import date
+from . import availability
 
 class RentalSerializer(serializers.ModelSerializer):
     customer_email = serializers.EmailField(source='customer.email', read_only=True)
@@ -16,7 +17,7 @@ class RentalSerializer(serializers.ModelSerializer):
         model = Rental
         fields = [
             'id', 'customer', 'customer_email', 'customer_name', 'store', 'store_name',
-            'clothing', 'clothing_name', 'rent_start_date', 'rent_end_date',
+            'clothing', 'clothing_name', 'size', 'rent_start_date', 'rent_end_date',
             'total_price', 'status', 'has_review', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
@@ -25,9 +26,11 @@ class RentalSerializer(serializers.ModelSerializer):
         return hasattr(obj, 'review')
 
 class RentalCreateSerializer(serializers.ModelSerializer):
+    selected_size = serializers.CharField(source='size', required=False, allow_blank=True)
+
     class Meta:
         model = Rental
-        fields = ['id', 'clothing', 'rent_start_date', 'rent_end_date']
+        fields = ['id', 'clothing', 'selected_size', 'rent_start_date', 'rent_end_date']
 
     def validate(self, data):
         clothing = data['clothing']
@@ -39,10 +42,25 @@ class RentalCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Start date cannot be in the past.")
         if end_date < start_date:
             raise serializers.ValidationError("End date cannot be before start date.")
+        if (end_date - start_date).days >= availability.MAX_WINDOW_DAYS:
+            raise serializers.ValidationError(f"Rental period cannot exceed {availability.MAX_WINDOW_DAYS} days.")
+
+        # Items with per-size stock are rented in one of their sizes
+        sizes = dict(clothing.sizes.values_list('size', 'stock_quantity'))
+        size = data.get('size', '').strip().upper() if sizes else ''
+        if sizes and not size:
+            raise serializers.ValidationError("Please select a size.")
+        if size and size not in sizes:
+            raise serializers.ValidationError(f"Size {size} is not offered for this item.")
+        if size and sizes[size] <= 0:
+            raise serializers.ValidationError(f"Size {size} is out of stock.")
+        data['size'] = size
 
-        # 2. Check available quantity
-        if clothing.stock_quantity <= 0:
-            raise serializers.ValidationError("This item is currently out of stock for rent.")
+        # 2. Check a unit (of the size) is free for every day of the requested range
+        if availability.free_units(clothing, start_date, end_date, size) <= 0:
+            if size and availability.free_units(clothing, start_date, end_date) > 0:
+                raise serializers.ValidationError(f"Size {size} is fully booked for the selected dates.")
+            raise serializers.ValidationError("This item is fully booked for the selected dates.")
 
         return data
 
@@ -62,9 +80,38 @@ class RentalCreateSerializer(serializers.ModelSerializer):
             customer=customer,
             store=store,
             clothing=clothing,
+            size=validated_data.get('size', ''),
             rent_start_date=start_date,
             rent_end_date=end_date,
             total_price=total_price,
             status=Rental.Status.PENDING
         )
         return rental
+
+class RentalBulkStatusSerializer(serializers.Serializer):
+    """Input for the store bulk approve/reject/confirm-return endpoint"""
+    BULK_STATUSES = [
+        Rental.Status.APPROVED,
+        Rental.Status.REJECTED,
+        Rental.Status.RETURNED_CONFIRMED,
+    ]
+
+    rental_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500
+    )
+    status = serializers.ChoiceField(choices=BULK_STATUSES)
+
+class RentalEventSerializer(serializers.ModelSerializer):
+    from_status_display = serializers.CharField(source='get_from_status_display', read_only=True)
+    to_status_display = serializers.CharField(source='get_to_status_display', read_only=True)
+    actor_name = serializers.CharField(source='actor.name', read_only=True, default=None)
+    actor_role = serializers.CharField(source='actor.role', read_only=True, default=None)
+
+    class Meta:
+        model = RentalEvent
+        fields = [
+            'id', 'from_status', 'from_status_display', 'to_status', 'to_status_display',
+            'actor_name', 'actor_role', 'created_at'
+        ]
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Rental
+from . import availability
+from .transitions import rental_transitioned
+
+
+@receiver(post_init, sender=Rental)
+def remember_loaded_status(sender, instance, **kwargs):
+    # __dict__ so a deferred status field isn't fetched just for this
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Rental)
+def update_occupancy_on_save(sender, instance, created, **kwargs):
+    """Hold/release the rental's days when save() moves it across a holding status"""
+    old_status = None if created else instance._loaded_status
+    availability.apply_transition(instance, old_status, instance.status)
+    instance._loaded_status = instance.status
+    if old_status != instance.status:
+        # Creation and direct saves (admin edits) reach the same receivers as transition()
+        rental_transitioned.send(
+            sender=Rental, rentals=[instance], from_status=old_status, to_status=instance.status, actor=None
+        )
+
+
+@receiver(rental_transitioned)
+def remember_transitioned_status(sender, rentals, to_status, **kwargs):
+    # transition() has applied the change, so a later save() of these instances must not apply it again
+    for rental in rentals:
+        rental._loaded_status = to_status
+
+
+@receiver(post_delete, sender=Rental)
+def release_occupancy_on_delete(sender, instance, **kwargs):
+    availability.apply_transition(instance, instance._loaded_status, None)
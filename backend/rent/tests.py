@@ -1,3 +1,542 @@
-from django.test import TestCase
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import importlib
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.apps import apps
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from accounts import rollups
+from accounts.models import User, Clothing, ClothingSize, StoreDailyStats
+from notifications import outbox
+from notifications.models import Notification, NotificationOutbox
+from . import availability, transitions
+from .models import DailyOccupancy, Rental, RentalEvent
+from .views import RentalApproveView
+
+
+# Delivery is checked explicitly below rather than racing eager hand-off threads
+@override_settings(NOTIFICATION_OUTBOX_EAGER=False)
+class ConcurrentApprovalTests(TransactionTestCase):
+    """
+    Hundreds of approvals racing for the same dates of one item must never
+    book more units than the item has.
+    """
+    STOCK = 25
+    RENTALS = 300
+    WORKERS = 16
+
+    def setUp(self):
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', is_store=True, is_verified=True
+        )
+        customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        self.clothing = Clothing.objects.create(
+            store=self.store, item_name='Lehenga', category='Traditional', gender='Female',
+            size='M', condition='New', rental_price=500, stock_quantity=self.STOCK
+        )
+        start = date.today() + timedelta(days=1)
+        Rental.objects.bulk_create([
+            Rental(customer=customer, store=self.store, clothing=self.clothing,
+                   rent_start_date=start, rent_end_date=start + timedelta(days=2), total_price=1500)
+            for _ in range(self.RENTALS)
+        ])
+
+    def approve(self, rental_id):
+        # Call the view directly: the test client's exception signal is not thread-safe
+        view = RentalApproveView.as_view()
+        for _ in range(500):
+            request = APIRequestFactory().patch(f'/api/rentals/{rental_id}/approve/')
+            force_authenticate(request, user=self.store)
+            try:
+                return view(request, pk=rental_id).status_code
+            except OperationalError:
+                # SQLite reports write contention as "database is locked"; the
+                # transaction was rolled back, so retrying is safe
+                time.sleep(0.002)
+        return None
+
+    def test_no_oversell_under_concurrent_approvals(self):
+        rental_ids = list(Rental.objects.values_list('id', flat=True))
+        barrier = threading.Barrier(self.WORKERS)
+
+        def worker(ids):
+            barrier.wait()
+            try:
+                return [self.approve(rental_id) for rental_id in ids]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.WORKERS) as pool:
+            chunks = [rental_ids[i::self.WORKERS] for i in range(self.WORKERS)]
+            results = [code for codes in pool.map(worker, chunks) for code in codes]
+
+        self.assertNotIn(None, results)
+        self.assertEqual(results.count(200), self.STOCK)
+        self.assertEqual(results.count(400), self.RENTALS - self.STOCK)
+
+        self.clothing.refresh_from_db()
+        self.assertEqual(self.clothing.stock_quantity, self.STOCK)  # capacity, not a shelf counter
+        self.assertEqual(Rental.objects.filter(status=Rental.Status.APPROVED).count(), self.STOCK)
+        outbox.dispatch()
+        self.assertEqual(Notification.objects.filter(user__role='Customer').count(), self.STOCK)
+        self.assertEqual(set(DailyOccupancy.objects.values_list('units', flat=True)), {self.STOCK})
+
+
+class BulkStatusTests(APITestCase):
+    """Bulk approvals run a handful of queries regardless of batch size"""
+
+    def setUp(self):
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', is_store=True, is_verified=True
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        start = date.today() + timedelta(days=1)
+        self.items = [
+            Clothing.objects.create(
+                store=self.store, item_name=f'Item {i}', category='Casual', gender='Male',
+                size='M', condition='New', rental_price=100, stock_quantity=80
+            )
+            for i in range(3)
+        ]
+        self.rentals = Rental.objects.bulk_create([
+            Rental(customer=self.customer, store=self.store, clothing=self.items[i % 3],
+                   rent_start_date=start, rent_end_date=start + timedelta(days=i % 4), total_price=100)
+            for i in range(270)
+        ])
+        self.client.force_authenticate(self.store)
+
+    def test_bulk_approve(self):
+        ids = [rental.id for rental in self.rentals[:200]] + [999999]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/rentals/bulk-status/', {'rental_ids': ids, 'status': 'approved'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        # The outbox INSERT takes 3 statements for 200 rows under SQLite's 999-parameter cap
+        self.assertLessEqual(len(ctx.captured_queries), 26)
+
+        outcomes = response.data['data']
+        self.assertEqual(sum(outcome['ok'] for outcome in outcomes), 200)
+        self.assertEqual(outcomes[-1], {'id': 999999, 'ok': False, 'error': 'Rental not found.'})
+        # Notifications are queued in the request and written by the dispatcher
+        self.assertEqual(NotificationOutbox.objects.filter(user=self.customer).count(), 200)
+        self.assertFalse(Notification.objects.exists())
+        outbox.dispatch()
+        self.assertEqual(Notification.objects.filter(user=self.customer).count(), 200)
+        start = date.today() + timedelta(days=1)
+        for clothing in self.items:
+            self.assertEqual(
+                availability.peak_occupancy(clothing.id, start, start),
+                Rental.objects.filter(clothing=clothing, status='approved').count()
+            )
+
+    def test_bulk_approve_stops_at_stock(self):
+        ids = [rental.id for rental in self.rentals if rental.clothing_id == self.items[0].id]
+        response = self.client.post('/api/rentals/bulk-status/', {'rental_ids': ids, 'status': 'approved'}, format='json')
+        outcomes = response.data['data']
+        self.assertEqual([outcome['ok'] for outcome in outcomes], [True] * 80 + [False] * 10)
+        self.assertEqual(outcomes[-1]['error'], "This item is fully booked for the rental's dates.")
+        self.items[0].refresh_from_db()
+        self.assertEqual(self.items[0].stock_quantity, 80)
+
+        response = self.client.post('/api/rentals/bulk-status/', {'rental_ids': ids[:5], 'status': 'rejected'}, format='json')
+        self.assertFalse(any(outcome['ok'] for outcome in response.data['data']))
+
+
+class SizeStockTests(APITestCase):
+    """Rentals made in a size need a free unit of that size as well as of the item"""
+
+    def setUp(self):
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', is_store=True, is_verified=True
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        self.clothing = Clothing.objects.create(
+            store=self.store, item_name='Lehenga', category='Traditional', gender='Female',
+            size='S, M', condition='New', rental_price=500, stock_quantity=3
+        )
+        self.clothing.sync_sizes({'S': 2, 'M': 1})
+        self.start = date.today() + timedelta(days=1)
+
+    def request_rental(self, **data):
+        self.client.force_authenticate(self.customer)
+        return self.client.post('/api/rentals/create/', {
+            'clothing': self.clothing.id, 'rent_start_date': self.start, 'rent_end_date': self.start, **data
+        }, format='json')
+
+    def rental(self, size, offset=0):
+        day = self.start + timedelta(days=offset)
+        return Rental.objects.create(
+            customer=self.customer, store=self.store, clothing=self.clothing, size=size,
+            rent_start_date=day, rent_end_date=day, total_price=500
+        )
+
+    def held(self, size=None):
+        return availability.peak_occupancy(self.clothing.id, self.start, self.start, size)
+
+    def test_create_records_an_offered_size(self):
+        response = self.request_rental(selected_size='m')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Rental.objects.get().size, 'M')
+
+        for data, message in (({}, 'Please select a size.'),
+                              ({'selected_size': 'XL'}, 'Size XL is not offered for this item.')):
+            response = self.request_rental(**data)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['non_field_errors'], [message])
+
+        self.client.force_authenticate(self.store)
+        self.client.patch(f'/api/rentals/{Rental.objects.get().id}/approve/')
+        self.assertEqual(
+            self.request_rental(selected_size='M').data['non_field_errors'],
+            ['Size M is fully booked for the selected dates.']
+        )
+        ClothingSize.objects.filter(clothing=self.clothing, size='M').update(stock_quantity=0)
+        self.assertEqual(self.request_rental(selected_size='M').data['non_field_errors'], ['Size M is out of stock.'])
+
+    def test_approve_and_return_hold_the_size(self):
+        rental = self.rental('M')
+        self.client.force_authenticate(self.store)
+        self.assertEqual(self.client.patch(f'/api/rentals/{rental.id}/approve/').status_code, 200)
+        self.assertEqual((self.held(), self.held('M')), (1, 1))
+
+        other = self.rental('M')
+        response = self.client.patch(f'/api/rentals/{other.id}/approve/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], "Size M is fully booked for the rental's dates.")
+        later = self.rental('M', offset=1)
+        self.assertEqual(self.client.patch(f'/api/rentals/{later.id}/approve/').status_code, 200)
+
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.patch(f'/api/rentals/{rental.id}/mark-return/').status_code, 200)
+        self.client.force_authenticate(self.store)
+        self.assertEqual(self.client.patch(f'/api/rentals/{rental.id}/confirm-return/').status_code, 200)
+        self.assertEqual((self.held(), self.held('M')), (0, 0))
+        self.assertEqual(self.client.patch(f'/api/rentals/{other.id}/approve/').status_code, 200)
+
+    def test_bulk_approve_stops_at_size_capacity(self):
+        rentals = [self.rental('S'), self.rental('M'), self.rental('M'), self.rental('S'), self.rental('')]
+        self.client.force_authenticate(self.store)
+        response = self.client.post('/api/rentals/bulk-status/', {
+            'rental_ids': [rental.id for rental in rentals], 'status': 'approved'
+        }, format='json')
+        # Size M runs out at the second M; the item runs out before the unsized rental
+        self.assertEqual([outcome['ok'] for outcome in response.data['data']], [True, True, False, True, False])
+        self.assertEqual((self.held(), self.held('S'), self.held('M')), (3, 2, 1))
+
+        # Rejecting the refused (still pending) rentals frees nothing
+        self.client.post('/api/rentals/bulk-status/', {
+            'rental_ids': [rental.id for rental in rentals], 'status': 'rejected'
+        }, format='json')
+        self.assertEqual((self.held(), self.held('S'), self.held('M')), (3, 2, 1))
+        self.clothing.refresh_from_db()
+        self.assertEqual(self.clothing.stock_quantity, 3)
+
+
+class AvailabilityTests(APITestCase):
+    """Per-day holds drive free units, bookings and the availability endpoints"""
+
+    def setUp(self):
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', is_store=True, is_verified=True
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        self.clothing = Clothing.objects.create(
+            store=self.store, item_name='Lehenga', category='Traditional', gender='Female',
+            size='M', condition='New', rental_price=500, stock_quantity=2
+        )
+        self.today = date.today() + timedelta(days=1)
+
+    def day(self, offset):
+        return self.today + timedelta(days=offset)
+
+    def approved(self, start, end):
+        rental = Rental.objects.create(
+            customer=self.customer, store=self.store, clothing=self.clothing,
+            rent_start_date=self.day(start), rent_end_date=self.day(end), total_price=500
+        )
+        self.client.force_authenticate(self.store)
+        self.assertEqual(self.client.patch(f'/api/rentals/{rental.id}/approve/').status_code, 200)
+        self.clothing.refresh_from_db()
+        return rental
+
+    def request_rental(self, start, end):
+        self.client.force_authenticate(self.customer)
+        return self.client.post('/api/rentals/create/', {
+            'clothing': self.clothing.id, 'rent_start_date': self.day(start), 'rent_end_date': self.day(end)
+        }, format='json')
+
+    def test_peak_and_free_units(self):
+        self.approved(0, 4)
+        rental = self.approved(3, 6)
+        self.assertEqual(availability.peak_occupancy(self.clothing.id, self.day(0), self.day(2)), 1)
+        self.assertEqual(availability.peak_occupancy(self.clothing.id, self.day(2), self.day(8)), 2)
+        self.assertEqual(availability.peak_occupancy(self.clothing.id, self.day(7), self.day(9)), 0)
+        self.assertEqual(availability.capacity(self.clothing), 2)
+        self.assertEqual(availability.free_units(self.clothing, self.day(3), self.day(4)), 0)
+        self.assertEqual(availability.free_units(self.clothing, self.day(5), self.day(9)), 1)
+
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.patch(f'/api/rentals/{rental.id}/mark-return/').status_code, 200)
+        self.client.force_authenticate(self.store)
+        self.assertEqual(self.client.patch(f'/api/rentals/{rental.id}/confirm-return/').status_code, 200)
+        self.clothing.refresh_from_db()
+        self.assertEqual(availability.free_units(self.clothing, self.day(3), self.day(4)), 1)
+        self.assertEqual(set(DailyOccupancy.objects.values_list('day', flat=True)), {self.day(i) for i in range(5)})
+
+    def test_later_bookings_do_not_block_earlier_dates(self):
+        Clothing.objects.filter(pk=self.clothing.pk).update(stock_quantity=1)
+        self.approved(30, 32)
+        self.assertEqual(availability.free_units(self.clothing, self.day(0), self.day(6)), 1)
+        response = self.request_rental(0, 6)
+        self.assertEqual(response.status_code, 201)
+        self.client.force_authenticate(self.store)
+        self.assertEqual(self.client.patch(f'/api/rentals/{Rental.objects.latest("id").id}/approve/').status_code, 200)
+
+        self.assertEqual(self.request_rental(31, 35).status_code, 400)
+        self.client.force_authenticate(self.store)
+        overlapping = Rental.objects.create(
+            customer=self.customer, store=self.store, clothing=self.clothing,
+            rent_start_date=self.day(5), rent_end_date=self.day(8), total_price=500
+        )
+        response = self.client.patch(f'/api/rentals/{overlapping.id}/approve/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], "This item is fully booked for the rental's dates.")
+
+    def test_booking_needs_a_free_unit_on_every_day(self):
+        self.approved(0, 4)
+        self.approved(4, 6)
+        response = self.request_rental(3, 5)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'], ['This item is fully booked for the selected dates.'])
+        self.assertEqual(self.request_rental(5, 8).status_code, 201)
+
+    def test_booking_window_is_capped(self):
+        response = self.request_rental(0, availability.MAX_WINDOW_DAYS)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'], [f'Rental period cannot exceed {availability.MAX_WINDOW_DAYS} days.'])
+        self.assertEqual(self.request_rental(0, availability.MAX_WINDOW_DAYS - 1).status_code, 201)
+
+    def test_availability_endpoint(self):
+        self.approved(0, 2)
+        self.client.force_authenticate(self.customer)
+        url = f'/api/rentals/availability/{self.clothing.id}/'
+        response = self.client.get(url, {'start': self.day(1), 'end': self.day(5)})
+        self.assertEqual((response.data['capacity'], response.data['booked'], response.data['available']), (2, 1, 1))
+        self.assertEqual(self.client.get(url, {'start': self.day(3), 'end': self.day(1)}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': self.day(0), 'end': self.day(366)}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': 'tomorrow'}).status_code, 400)
+
+    def test_calendar_follows_every_transition(self):
+        url = '/api/rentals/availability/calendar/'
+        params = {'clothing': f'{self.clothing.id},999999', 'start': self.day(0), 'end': self.day(3)}
+
+        def free_days():
+            self.client.force_authenticate(self.customer)
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.data['items']), [str(self.clothing.id)])
+            return list(response.data['items'][str(self.clothing.id)]['days'].values())
+
+        self.assertEqual(free_days(), [2, 2, 2, 2])
+        # Read from the rows the approvals wrote, with no cached copy to drop
+        self.approved(1, 2)
+        self.approved(2, 5)
+        self.assertEqual(free_days(), [2, 1, 0, 1])
+
+        month = self.day(0).strftime('%Y-%m')
+        response = self.client.get(url, {'clothing': self.clothing.id, 'month': month})
+        self.assertEqual(len(response.data['items'][str(self.clothing.id)]['days']), availability.month_end(self.day(0).replace(day=1)).day)
+        self.assertEqual(self.client.get(url, {'clothing': self.clothing.id, 'month': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'clothing': ','.join(map(str, range(1, 52))), 'month': month}).status_code, 400)
+
+    def test_rebuild_matches_the_maintained_rows(self):
+        self.approved(0, 4)
+        self.approved(3, 6)
+        maintained = set(DailyOccupancy.objects.values_list('clothing_id', 'day', 'units'))
+        DailyOccupancy.objects.all().delete()
+        self.assertEqual(availability.rebuild_occupancy(), 7)
+        self.assertEqual(set(DailyOccupancy.objects.values_list('clothing_id', 'day', 'units')), maintained)
+
+
+class TransitionTests(APITestCase):
+    """transition() enforces the table and the roles, and logs every change"""
+
+    def setUp(self):
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', is_store=True, is_verified=True
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        self.clothing = Clothing.objects.create(
+            store=self.store, item_name='Lehenga', category='Traditional', gender='Female',
+            size='M', condition='New', rental_price=500, stock_quantity=2
+        )
+        start = date.today() + timedelta(days=1)
+        self.rental = Rental.objects.create(
+            customer=self.customer, store=self.store, clothing=self.clothing,
+            rent_start_date=start, rent_end_date=start + timedelta(days=1), total_price=1000
+        )
+
+    def patch(self, user, action):
+        self.client.force_authenticate(user)
+        return self.client.patch(f'/api/rentals/{self.rental.id}/{action}/')
+
+    def test_invalid_transitions_change_nothing(self):
+        response = self.patch(self.customer, 'mark-return')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Cannot change a rental from pending to returned pending.')
+        self.assertEqual(self.patch(self.store, 'approve').status_code, 200)
+        self.assertEqual(self.patch(self.store, 'reject').status_code, 400)
+        self.assertEqual(self.patch(self.store, 'approve').status_code, 400)
+
+        self.rental.refresh_from_db()
+        self.assertEqual(self.rental.status, Rental.Status.APPROVED)
+        self.assertEqual(set(DailyOccupancy.objects.values_list('units', flat=True)), {1})
+        self.assertEqual(list(self.rental.events.values_list('to_status', flat=True)), ['approved'])
+
+    def test_roles(self):
+        self.assertEqual(self.patch(self.customer, 'approve').status_code, 403)
+        self.assertEqual(self.patch(self.store, 'mark-return').status_code, 403)
+        with self.assertRaises(transitions.TransitionError) as raised:
+            transitions.transition(self.rental, Rental.Status.APPROVED, actor=self.customer)
+        self.assertEqual((raised.exception.code, raised.exception.status_code), ('forbidden', 403))
+        # Payment callbacks act as the system
+        self.assertEqual(self.patch(self.store, 'approve').status_code, 200)
+        self.rental.refresh_from_db()
+        with self.assertRaises(transitions.TransitionError):
+            transitions.transition(self.rental, Rental.Status.RENTED, actor=self.store)
+        transitions.transition(self.rental, Rental.Status.RENTED)
+        self.assertEqual(Rental.objects.get().status, Rental.Status.RENTED)
+
+    def test_stale_rental_loses_the_race(self):
+        stale = Rental.objects.get()
+        self.assertEqual(self.patch(self.store, 'approve').status_code, 200)
+        with self.assertRaises(transitions.TransitionError) as raised:
+            transitions.transition(stale, Rental.Status.REJECTED, actor=self.store)
+        self.assertEqual(raised.exception.status_code, 409)
+
+    def test_saving_after_a_transition_does_not_apply_it_twice(self):
+        rental = Rental.objects.get()
+        transitions.transition(rental, Rental.Status.APPROVED, actor=self.store)
+        rental.save()
+        self.assertEqual(set(DailyOccupancy.objects.values_list('units', flat=True)), {1})
+        self.assertEqual(RentalEvent.objects.count(), 1)
+
+    def test_timeline(self):
+        self.patch(self.store, 'approve')
+        self.patch(self.customer, 'mark-return')
+        self.patch(self.store, 'confirm-return')
+        for user in (self.customer, self.store):
+            self.client.force_authenticate(user)
+            response = self.client.get(f'/api/rentals/{self.rental.id}/timeline/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [(event['from_status'], event['to_status'], event['actor_role']) for event in response.data],
+                [('pending', 'approved', 'Store'), ('approved', 'returned_pending', 'Customer'),
+                 ('returned_pending', 'returned_confirmed', 'Store')]
+            )
+        outsider = User.objects.create_user(
+            email='other@example.com', password='password123', name='Other', is_verified=True
+        )
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(f'/api/rentals/{self.rental.id}/timeline/').status_code, 404)
+
+
+class LegacyStatusMigrationTests(APITestCase):
+    """The state machine migration folds old status spellings and backfills the implied event log"""
+
+    migration = importlib.import_module('rent.migrations.0005_rental_state_machine')
+
+    def test_normalize_and_backfill(self):
+        store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', is_store=True, is_verified=True
+        )
+        customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        clothing = Clothing.objects.create(
+            store=store, item_name='Lehenga', category='Traditional', gender='Female',
+            size='M', condition='New', rental_price=500, stock_quantity=2
+        )
+        start = date.today()
+        rentals = Rental.objects.bulk_create([
+            Rental(customer=customer, store=store, clothing=clothing, status=status,
+                   rent_start_date=start, rent_end_date=start + timedelta(days=1), total_price=1000)
+            for status in ('Rented', 'Returned Confirmed', 'returned-pending', 'pending', 'Lost')
+        ])
+        self.assertFalse(DailyOccupancy.objects.exists())
+
+        self.migration.normalize_statuses(apps, None)
+        self.migration.backfill_events(apps, None)
+
+        statuses = [Rental.objects.get(pk=rental.pk).status for rental in rentals]
+        self.assertEqual(statuses, ['rented', 'returned_confirmed', 'returned_pending', 'pending', 'Lost'])
+        # The two rentals that turned out to be holding now occupy their days
+        self.assertEqual(set(DailyOccupancy.objects.values_list('units', flat=True)), {2})
+        self.assertEqual(
+            list(RentalEvent.objects.filter(rental=rentals[1]).values_list('from_status', 'to_status')),
+            [('', 'pending'), ('pending', 'approved'), ('approved', 'returned_pending'),
+             ('returned_pending', 'returned_confirmed')]
+        )
+        self.assertEqual(list(RentalEvent.objects.filter(rental=rentals[4]).values_list('from_status', 'to_status')), [('', 'Lost')])
+
+        # Replaying the backfilled log counts the history of rentals that predate it
+        rollups.rollup_events()
+        stats = StoreDailyStats.objects.get(store=store)
+        self.assertEqual(
+            (stats.rental_requests, stats.rentals_approved, stats.revenue, stats.paid_revenue, stats.returns_confirmed),
+            (4, 3, 3000, 1000, 1)
+        )
+        self.assertEqual(stats.item_rentals[str(clothing.id)]['rentals'], 3)
+
+
+class CapacityMigrationTests(APITestCase):
+    """Stock that approvals used to take off the shelf is counted as owned again"""
+
+    migration = importlib.import_module('rent.migrations.0007_occupancy_by_size_and_capacity')
+
+    def test_held_units_return_to_stock(self):
+        store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', is_store=True, is_verified=True
+        )
+        customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        clothing = Clothing.objects.create(
+            store=store, item_name='Lehenga', category='Traditional', gender='Female',
+            size='S, M', condition='New', rental_price=500, stock_quantity=1
+        )
+        clothing.sync_sizes({'S': 1, 'M': 0})
+        start = date.today()
+        Rental.objects.bulk_create([
+            Rental(customer=customer, store=store, clothing=clothing, size=size, status=status,
+                   rent_start_date=start, rent_end_date=start + timedelta(days=1), total_price=1000)
+            for size, status in (('M', 'rented'), ('S', 'returned_confirmed'), ('S', 'pending'))
+        ])
+
+        self.migration.occupancy_by_size(apps, None)
+        self.migration.stock_as_capacity(apps, None)
+        clothing.refresh_from_db()
+        self.assertEqual(clothing.stock_quantity, 2)
+        self.assertEqual(dict(clothing.sizes.values_list('size', 'stock_quantity')), {'S': 1, 'M': 1})
+        self.assertEqual(set(DailyOccupancy.objects.values_list('size', 'units')), {('M', 1)})
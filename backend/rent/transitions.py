@@ -0,0 +1,223 @@
+"""
+Rental state machine.
+
+TRANSITIONS declares every allowed status change and who may make it.
+transition() (and transition_many() for batches) is the only code that
+changes Rental.status: a guarded conditional UPDATE (... WHERE status =
+<expected>), the capacity check and occupancy (see rent.availability: a
+rental entering a holding status needs a free unit, of its size when it has
+one, on every day of its own dates), an append-only RentalEvent row and the
+queued notification, all in one transaction. Receivers of the
+rental_transitioned signal run inside that transaction too.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+
+from accounts.models import Clothing, ClothingSize
+from notifications import outbox
+from notifications.models import NotificationOutbox
+from . import availability
+from .models import DailyOccupancy, Rental, RentalEvent
+
+Status = Rental.Status
+
+STORE = 'Store'
+CUSTOMER = 'Customer'
+SYSTEM = 'System'  # payment callbacks and other changes without a user
+
+# (from, to) -> role allowed to make the change
+TRANSITIONS = {
+    (Status.PENDING, Status.APPROVED): STORE,
+    (Status.PENDING, Status.REJECTED): STORE,
+    (Status.APPROVED, Status.RENTED): SYSTEM,
+    (Status.APPROVED, Status.RETURNED_PENDING): CUSTOMER,
+    (Status.RENTED, Status.RETURNED_PENDING): CUSTOMER,
+    (Status.RETURNED_PENDING, Status.RETURNED_CONFIRMED): STORE,
+}
+
+# to -> (who is notified, message)
+NOTIFICATIONS = {
+    Status.APPROVED: ('customer', "Your rental request for {item} has been approved by {store}."),
+    Status.REJECTED: ('customer', "Your rental request for {item} has been rejected by {store}."),
+    Status.RENTED: ('store', "Payment received for rental of '{item}'."),
+    Status.RETURNED_PENDING: ('store', "Customer {customer} has marked {item} as returned. Please confirm."),
+    Status.RETURNED_CONFIRMED: ('customer', "Store {store} has confirmed the return of {item}."),
+}
+
+# Sent once per transition()/transition_many() call with the rentals that moved,
+# and by rent.signals when a rental is created (from_status None) or saved
+# with a new status
+rental_transitioned = Signal()
+
+
+class TransitionError(Exception):
+    """A status change that is not allowed, lost a race, or has no stock"""
+
+    def __init__(self, message, code='invalid_transition', status_code=400):
+        super().__init__(message)
+        self.code = code
+        self.status_code = status_code
+
+
+def can_transition(source, target):
+    return (source, target) in TRANSITIONS
+
+
+def sources_for(target):
+    return [source for source, to in TRANSITIONS if to == target]
+
+
+def check_transition(source, target, actor=None):
+    """Raise TransitionError unless actor may move a rental from source to target"""
+    role = TRANSITIONS.get((source, target))
+    if role is None:
+        raise TransitionError(
+            f"Cannot change a rental from {Status(source).label.lower()} to {Status(target).label.lower()}."
+        )
+    actor_role = actor.role if actor is not None else SYSTEM
+    if actor_role != role:
+        raise TransitionError(
+            f"Only {role.lower()}s can change a rental to {Status(target).label.lower()}.",
+            code='forbidden', status_code=403
+        )
+
+
+def transition(rental, target, actor=None):
+    """
+    Move one rental to target and return its RentalEvent. Needs
+    rental.clothing/store/customer for the notification, so load it with
+    select_related. Raises TransitionError (nothing is written) on failure.
+    """
+    source = rental.status
+    check_transition(source, target, actor)
+    holds = availability.is_holding(target) and not availability.is_holding(source)
+
+    with transaction.atomic():
+        if holds:
+            refused = _check_capacity([rental])
+            if refused:
+                raise refused[rental.id]
+        if not Rental.objects.filter(pk=rental.pk, status=source).update(status=target):
+            raise TransitionError("This rental has already been processed.", code='conflict', status_code=409)
+        availability.apply_transition(rental, source, target)
+
+        rental.status = target
+        event = RentalEvent.objects.create(rental=rental, from_status=source, to_status=target, actor=actor)
+        outbox.enqueue_many([_notification(rental, target)])
+        rental_transitioned.send(sender=Rental, rentals=[rental], from_status=source, to_status=target, actor=actor)
+    return event
+
+
+def transition_many(rentals, target, actor=None):
+    """
+    Move a batch of rentals to target with grouped statements: one
+    occupancy read per clothing item, one status UPDATE per source status,
+    bulk-inserted events and queued notifications.
+    Returns (moved rentals, {rental_id: TransitionError}) and raises
+    TransitionError only if rows changed underneath the batch.
+    """
+    errors = {}
+    by_source = {}
+    for rental in rentals:
+        try:
+            check_transition(rental.status, target, actor)
+        except TransitionError as error:
+            errors[rental.id] = error
+        else:
+            by_source.setdefault(rental.status, []).append(rental)
+
+    moved = []
+    with transaction.atomic():
+        for source, group in by_source.items():
+            if availability.is_holding(target) and not availability.is_holding(source):
+                refused = _check_capacity(group)
+                errors.update(refused)
+                group = [rental for rental in group if rental.id not in refused]
+            if not group:
+                continue
+
+            ids = [rental.id for rental in group]
+            if Rental.objects.filter(id__in=ids, status=source).update(status=target) != len(ids):
+                raise TransitionError(
+                    "Some rentals were changed while processing. Please retry.", code='conflict', status_code=409
+                )
+            availability.apply_transitions(group, source, target)
+            for rental in group:
+                rental.status = target
+            RentalEvent.objects.bulk_create([
+                RentalEvent(rental=rental, from_status=source, to_status=target, actor=actor) for rental in group
+            ])
+            outbox.enqueue_many([_notification(rental, target) for rental in group])
+            rental_transitioned.send(sender=Rental, rentals=group, from_status=source, to_status=target, actor=actor)
+            moved.extend(group)
+    return moved, errors
+
+
+def record_created(rental, actor=None):
+    """Log the creation of a rental (no status change to guard)"""
+    RentalEvent.objects.create(rental=rental, from_status='', to_status=rental.status, actor=actor)
+
+
+def _check_capacity(rentals):
+    """
+    Grant the rentals (in order) a free unit, of their size when they have
+    one, on every day of their dates, counting the ones granted before them;
+    returns {rental_id: TransitionError} for the rest. Three reads for any
+    batch; the item rows are locked first, so concurrent approvals of the
+    same item check in turn.
+    """
+    by_clothing = {}
+    for rental in rentals:
+        by_clothing.setdefault(rental.clothing_id, []).append(rental)
+    capacity = dict(
+        Clothing.objects.select_for_update().filter(pk__in=by_clothing).values_list('pk', 'stock_quantity')
+    )
+    size_capacity = {
+        (clothing_id, size): stock for clothing_id, size, stock in
+        ClothingSize.objects.filter(clothing_id__in=by_clothing).values_list('clothing_id', 'size', 'stock_quantity')
+    }
+
+    held = {}   # (clothing_id, size, day) -> units
+    total = {}  # (clothing_id, day) -> units of every size
+    rows = DailyOccupancy.objects.filter(
+        clothing_id__in=by_clothing,
+        day__range=(min(rental.rent_start_date for rental in rentals), max(rental.rent_end_date for rental in rentals)),
+    ).values_list('clothing_id', 'size', 'day', 'units')
+    for clothing_id, size, day, units in rows:
+        held[clothing_id, size, day] = units
+        total[clothing_id, day] = total.get((clothing_id, day), 0) + units
+
+    refused = {}
+    for clothing_id, group in by_clothing.items():
+        for rental in group:
+            days = availability.rental_days(rental.rent_start_date, rental.rent_end_date)
+            if any(total.get((clothing_id, day), 0) >= capacity.get(clothing_id, 0) for day in days):
+                refused[rental.id] = TransitionError(
+                    "This item is fully booked for the rental's dates.", code='out_of_stock'
+                )
+                continue
+            if rental.size and any(
+                held.get((clothing_id, rental.size, day), 0) >= size_capacity.get((clothing_id, rental.size), 0)
+                for day in days
+            ):
+                refused[rental.id] = TransitionError(
+                    f"Size {rental.size} is fully booked for the rental's dates.", code='out_of_stock'
+                )
+                continue
+            for day in days:
+                total[clothing_id, day] = total.get((clothing_id, day), 0) + 1
+                held[clothing_id, rental.size, day] = held.get((clothing_id, rental.size, day), 0) + 1
+    return refused
+
+
+def _notification(rental, target):
+    recipient, template = NOTIFICATIONS[target]
+    return NotificationOutbox(
+        user_id=rental.customer_id if recipient == 'customer' else rental.store_id,
+        message=template.format(
+            item=rental.clothing.item_name,
+            store=rental.store.store_name,
+            customer=rental.customer.email,
+        ),
+        notification_type='rental'
+    )
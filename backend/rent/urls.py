@@ -7,6 +7,10 @@ from .views import (
     RentalRejectView,
     RentalMarkReturnedView,
     RentalConfirmReturnView,
+    ClothingAvailabilityView,
+    AvailabilityCalendarView,
+    RentalBulkStatusView,
+    RentalTimelineView,
 )
 
 urlpatterns = [
@@ -17,4 +21,8 @@ urlpatterns = [
     path('<int:pk>/reject/', RentalRejectView.as_view(), name='rental-reject'),
     path('<int:pk>/mark-return/', RentalMarkReturnedView.as_view(), name='rental-mark-return'),
     path('<int:pk>/confirm-return/', RentalConfirmReturnView.as_view(), name='rental-confirm-return'),
+    path('<int:pk>/timeline/', RentalTimelineView.as_view(), name='rental-timeline'),
+    path('bulk-status/', RentalBulkStatusView.as_view(), name='rental-bulk-status'),
+    path('availability/calendar/', AvailabilityCalendarView.as_view(), name='rental-availability-calendar'),
+    path('availability/<int:clothing_id>/', ClothingAvailabilityView.as_view(), name='rental-availability'),
 ]
@@ -1,10 +1,26 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from .models import Rental
-from .serializers import RentalSerializer, RentalCreateSerializer
+from .serializers import RentalSerializer, RentalCreateSerializer, RentalBulkStatusSerializer, RentalEventSerializer
+from . import availability
+from .transitions import TransitionError, record_created, transition, transition_many
+from accounts.models import Clothing
+from datetime import date
+from django.db import transaction
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from notifications.models import Notification
+from notifications import outbox
+
+
+def rentals_for_listing(queryset):
+    """Join everything RentalSerializer touches so lists stay O(1) in queries"""
+    return queryset.select_related('customer', 'store', 'review', 'clothing', 'clothing__store')
+
+def rentals_for_transition():
+    """Rentals with the rows transition() needs for stock checks and notifications"""
+    return Rental.objects.select_related('clothing', 'store', 'customer')
 
 class RentalCreateView(generics.CreateAPIView):
     """
@@ -16,12 +32,14 @@ class RentalCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def perform_create(self, serializer):
-        rental = serializer.save(customer=self.request.user)
-        Notification.objects.create(
-            user=rental.store,
-            message=f"{self.request.user.email} requested to rent {rental.clothing.item_name}.",
-            notification_type='rental'
-        )
+        with transaction.atomic():
+            rental = serializer.save(customer=self.request.user)
+            record_created(rental, actor=self.request.user)
+            outbox.enqueue(
+                rental.store_id,
+                f"{self.request.user.email} requested to rent {rental.clothing.item_name}.",
+                notification_type='rental'
+            )
 
 class CustomerRentalListView(generics.ListAPIView):
     """
@@ -32,7 +50,7 @@ class CustomerRentalListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Rental.objects.filter(customer=self.request.user)
+        return rentals_for_listing(Rental.objects.filter(customer=self.request.user))
 
 class StoreRentalListView(generics.ListAPIView):
     """
@@ -43,15 +61,92 @@ class StoreRentalListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        qs = Rental.objects.filter(store=self.request.user)
-        print(f"DEBUG: Rental list for store {self.request.user}: {qs}")
-        return qs
+        return rentals_for_listing(Rental.objects.filter(store=self.request.user))
+
+class ClothingAvailabilityView(APIView):
+    """
+    GET /api/rentals/availability/{clothing_id}/?start=YYYY-MM-DD&end=YYYY-MM-DD
+    How many units of the item are free for the whole date range.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, clothing_id):
+        clothing = get_object_or_404(Clothing, pk=clothing_id)
+        try:
+            start = date.fromisoformat(request.query_params.get('start', ''))
+            end = date.fromisoformat(request.query_params.get('end', '') or str(start))
+        except ValueError:
+            return Response({"error": "start and end must be dates in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+        if end < start:
+            return Response({"error": "End date cannot be before start date."}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days >= availability.MAX_WINDOW_DAYS:
+            return Response({"error": f"Date range cannot exceed {availability.MAX_WINDOW_DAYS} days."}, status=status.HTTP_400_BAD_REQUEST)
+
+        capacity = availability.capacity(clothing)
+        booked = availability.peak_occupancy(clothing.pk, start, end)
+        return Response({
+            "clothing_id": clothing.pk,
+            "start": start,
+            "end": end,
+            "capacity": capacity,
+            "booked": booked,
+            "available": max(capacity - booked, 0),
+        }, status=status.HTTP_200_OK)
+
+class AvailabilityCalendarView(APIView):
+    """
+    GET /api/rentals/availability/calendar/?clothing=1,2,3&month=YYYY-MM
+    GET /api/rentals/availability/calendar/?clothing=1,2,3&start=YYYY-MM-DD&end=YYYY-MM-DD
+    Free units per day for each item, so booked days can be greyed out.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            clothing_ids = sorted({int(value) for value in request.query_params.get('clothing', '').split(',') if value.strip()})
+        except ValueError:
+            return Response({"error": "clothing must be a comma-separated list of ids."}, status=status.HTTP_400_BAD_REQUEST)
+        if not clothing_ids:
+            return Response({"error": "clothing is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(clothing_ids) > availability.MAX_CALENDAR_ITEMS:
+            return Response({"error": f"At most {availability.MAX_CALENDAR_ITEMS} items per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            month = request.query_params.get('month')
+            if month:
+                start = date.fromisoformat(f"{month}-01")
+                end = availability.month_end(start)
+            else:
+                start = date.fromisoformat(request.query_params.get('start', ''))
+                end = date.fromisoformat(request.query_params.get('end', ''))
+        except ValueError:
+            return Response({"error": "Pass month=YYYY-MM or start/end as YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        if end < start:
+            return Response({"error": "End date cannot be before start date."}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days >= availability.MAX_WINDOW_DAYS:
+            return Response({"error": f"Date range cannot exceed {availability.MAX_WINDOW_DAYS} days."}, status=status.HTTP_400_BAD_REQUEST)
+
+        items = availability.calendar(clothing_ids, start, end)
+        return Response({
+            "start": start,
+            "end": end,
+            "items": {
+                str(clothing_id): {
+                    "capacity": item["capacity"],
+                    "days": {day.isoformat(): free for day, free in item["days"].items()},
+                }
+                for clothing_id, item in items.items()
+            },
+        }, status=status.HTTP_200_OK)
 
 class RentalApproveView(generics.UpdateAPIView):
     """
     PATCH /api/rentals/{id}/approve/
     Store only: pending -> approved.
-    Decreases clothing.available_quantity by 1.
+    Needs a free unit (of the rented size) on every day of the rental's dates.
+    The capacity check, guarded status change, occupancy, event and
+    notification commit together (see rent.transitions), so concurrent
+    approvals can't overbook or approve the same rental twice.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = RentalSerializer
@@ -60,23 +155,12 @@ class RentalApproveView(generics.UpdateAPIView):
         if request.user.role != 'Store':
             return Response({"error": "Only stores can approve rentals."}, status=status.HTTP_403_FORBIDDEN)
         
-        rental = get_object_or_404(Rental, pk=pk, store=request.user, status='pending')
-        clothing = rental.clothing
-        
-        if clothing.stock_quantity > 0:
-            rental.status = 'approved'
-            rental.save()
-            clothing.stock_quantity -= 1
-            clothing.save()
-
-            Notification.objects.create(
-                user=rental.customer,
-                message=f"Your rental request for {clothing.item_name} has been approved by {request.user.store_name}.",
-                notification_type='rental'
-            )
-            return Response({"message": "Rental approved and stock updated."}, status=status.HTTP_200_OK)
-        else:
-            return Response({"error": "No stock available to approve this rental."}, status=status.HTTP_400_BAD_REQUEST)
+        rental = get_object_or_404(rentals_for_transition(), pk=pk, store=request.user)
+        try:
+            transition(rental, Rental.Status.APPROVED, actor=request.user)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+        return Response({"message": "Rental approved and stock updated."}, status=status.HTTP_200_OK)
 
 class RentalRejectView(generics.UpdateAPIView):
     """
@@ -90,22 +174,17 @@ class RentalRejectView(generics.UpdateAPIView):
         if request.user.role != 'Store':
             return Response({"error": "Only stores can reject rentals."}, status=status.HTTP_403_FORBIDDEN)
         
-        rental = get_object_or_404(Rental, pk=pk, store=request.user, status='pending')
-        rental.status = 'rejected'
-        rental.save()
-
-        Notification.objects.create(
-            user=rental.customer,
-            message=f"Your rental request for {rental.clothing.item_name} has been rejected by {request.user.store_name}.",
-            notification_type='rental'
-        )
+        rental = get_object_or_404(rentals_for_transition(), pk=pk, store=request.user)
+        try:
+            transition(rental, Rental.Status.REJECTED, actor=request.user)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
         return Response({"message": "Rental rejected."}, status=status.HTTP_200_OK)
 
 class RentalMarkReturnedView(generics.UpdateAPIView):
     """
     PATCH /api/rentals/{id}/mark-return/
-    Customer only: approved -> returned_pending.
-    Note: Also allowing 'rented' as source status for flexibility if needed by FE.
+    Customer only: approved/rented -> returned_pending.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = RentalSerializer
@@ -114,26 +193,18 @@ class RentalMarkReturnedView(generics.UpdateAPIView):
         if request.user.role != 'Customer':
             return Response({"error": "Only customers can mark items as returned."}, status=status.HTTP_403_FORBIDDEN)
         
-        # We allow marking as returned from either 'approved' or 'rented'
-        rental = get_object_or_404(Rental, pk=pk, customer=request.user)
-        if rental.status not in ['approved', 'rented']:
-            return Response({"error": "Only approved or rented items can be marked as returned."}, status=status.HTTP_400_BAD_REQUEST)
-            
-        rental.status = 'returned_pending'
-        rental.save()
-
-        Notification.objects.create(
-            user=rental.store,
-            message=f"Customer {request.user.email} has marked {rental.clothing.item_name} as returned. Please confirm.",
-            notification_type='rental'
-        )
+        rental = get_object_or_404(rentals_for_transition(), pk=pk, customer=request.user)
+        try:
+            transition(rental, Rental.Status.RETURNED_PENDING, actor=request.user)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
         return Response({"message": "Item marked as returned. Waiting for store confirmation."}, status=status.HTTP_200_OK)
 
 class RentalConfirmReturnView(generics.UpdateAPIView):
     """
     PATCH /api/rentals/{id}/confirm-return/
     Store only: returned_pending -> returned_confirmed.
-    Increases available_quantity by 1.
+    Frees the rental's days (atomically, with the status change).
     """
     permission_classes = [IsAuthenticated]
     serializer_class = RentalSerializer
@@ -142,18 +213,68 @@ class RentalConfirmReturnView(generics.UpdateAPIView):
         if request.user.role != 'Store':
             return Response({"error": "Only stores can confirm returns."}, status=status.HTTP_403_FORBIDDEN)
         
-        rental = get_object_or_404(Rental, pk=pk, store=request.user, status='returned_pending')
-        rental.status = 'returned_confirmed'
-        rental.save()
-        
-        clothing = rental.clothing
-        clothing.stock_quantity += 1
-        clothing.save()
-        
-        Notification.objects.create(
-            user=rental.customer,
-            message=f"Store {request.user.store_name} has confirmed the return of {rental.clothing.item_name}.",
-            notification_type='rental'
-        )
-        
+        rental = get_object_or_404(rentals_for_transition(), pk=pk, store=request.user)
+        try:
+            transition(rental, Rental.Status.RETURNED_CONFIRMED, actor=request.user)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
         return Response({"message": "Return confirmed and stock updated."}, status=status.HTTP_200_OK)
+
+class RentalBulkStatusView(APIView):
+    """
+    POST /api/rentals/bulk-status/
+    Store only. Body: {"rental_ids": [1, 2, ...], "status": "approved" | "rejected" | "returned_confirmed"}
+    Applies the approve / reject / confirm-return transition to many rentals
+    at once and returns an outcome per id. Capacity is checked with one
+    occupancy read per clothing item and events/notifications are bulk inserted.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.role != 'Store':
+            return Response({"error": "Only stores can update rental statuses."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = RentalBulkStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        rental_ids = list(dict.fromkeys(serializer.validated_data['rental_ids']))
+        target = serializer.validated_data['status']
+
+        rentals = rentals_for_transition().filter(id__in=rental_ids, store=request.user).in_bulk()
+        try:
+            moved, errors = transition_many(
+                [rentals[rental_id] for rental_id in rental_ids if rental_id in rentals],
+                target, actor=request.user
+            )
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+
+        outcomes = []
+        for rental_id in rental_ids:
+            if rental_id not in rentals:
+                outcomes.append({"id": rental_id, "ok": False, "error": "Rental not found."})
+            elif rental_id in errors:
+                outcomes.append({"id": rental_id, "ok": False, "error": str(errors[rental_id])})
+            else:
+                outcomes.append({"id": rental_id, "ok": True, "status": target})
+
+        return Response({
+            "message": f"{len(moved)} of {len(rental_ids)} rentals updated.",
+            "data": outcomes,
+        }, status=status.HTTP_200_OK)
+
+class RentalTimelineView(generics.ListAPIView):
+    """
+    GET /api/rentals/{id}/timeline/
+    Status history of a rental (oldest first), for its customer or store.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = RentalEventSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        rental = get_object_or_404(
+            Rental.objects.filter(Q(customer=self.request.user) | Q(store=self.request.user)),
+            pk=self.kwargs['pk']
+        )
+        return rental.events.select_related('actor')
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from accounts.models import Clothing
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Clothing.rating_sum / rating_count from reviews and report "
+        "items whose denormalized aggregates have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drift, do not write the corrected values.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        actual = {
+            row['clothing_id']: (row['total'], row['count'])
+            for row in Review.objects.values('clothing_id').annotate(
+                total=Sum('rating'), count=Count('id')
+            ).order_by()
+        }
+
+        drifted = []
+        checked = 0
+        for clothing in Clothing.objects.only('id', 'item_name', 'rating_sum', 'rating_count').iterator():
+            checked += 1
+            total, count = actual.get(clothing.id, (0, 0))
+            if (clothing.rating_sum, clothing.rating_count) != (total, count):
+                self.stdout.write(
+                    f"  #{clothing.id} {clothing.item_name}: "
+                    f"sum {clothing.rating_sum} -> {total}, count {clothing.rating_count} -> {count}"
+                )
+                clothing.rating_sum, clothing.rating_count = total, count
+                drifted.append(clothing)
+
+        if drifted and not options['dry_run']:
+            Clothing.objects.bulk_update(
+                drifted, ['rating_sum', 'rating_count'], batch_size=options['batch_size']
+            )
+
+        action = 'found' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} clothing items, {action} {len(drifted)} with drifted rating aggregates."
+        ))
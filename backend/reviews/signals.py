@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Clothing
+from .models import Review
+
+# Clothing.rating_sum / rating_count follow every Review write here (API,
+# admin, ORM deletes and cascades alike). `manage.py rebuild_rating_aggregates`
+# repairs drift from writes that skip signals (queryset update(), raw SQL).
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk is not None:
+        instance._previous_rating = Review.objects.filter(pk=instance.pk).values_list(
+            'clothing_id', 'rating'
+        ).first()
+
+
+@receiver(post_save, sender=Review)
+def count_review(sender, instance, created, **kwargs):
+    previous = None if created else instance._previous_rating
+    if previous is None:
+        Clothing.objects.filter(pk=instance.clothing_id).adjust_rating(instance.rating, 1)
+        return
+    old_clothing_id, old_rating = previous
+    if old_clothing_id != instance.clothing_id:
+        Clothing.objects.filter(pk=old_clothing_id).adjust_rating(-old_rating, -1)
+        Clothing.objects.filter(pk=instance.clothing_id).adjust_rating(instance.rating, 1)
+    elif old_rating != instance.rating:
+        Clothing.objects.filter(pk=instance.clothing_id).adjust_rating(instance.rating - old_rating, 0)
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review(sender, instance, **kwargs):
+    Clothing.objects.filter(pk=instance.clothing_id).adjust_rating(-instance.rating, -1)
@@ -1,3 +1,101 @@
-from django.test import TestCase
+import io
+from datetime import date
 
-# Create your tests here.
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from accounts.models import Clothing, User
+from rent.models import Rental
+from .models import Review
+
+
+class RatingAggregateTests(APITestCase):
+    """Clothing.rating_sum / rating_count follow every way a review changes"""
+
+    def setUp(self):
+        self.store = User.objects.create_user(
+            email='store@example.com', password='password123', name='Owner',
+            store_name='Store', role='Store', is_store=True, is_verified=True
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='password123', name='Customer', is_verified=True
+        )
+        self.clothing = self.add_clothing('Saree')
+
+    def add_clothing(self, name):
+        return Clothing.objects.create(
+            store=self.store, item_name=name, category='Casual', gender='Female',
+            size='M', condition='New', rental_price=100, stock_quantity=5
+        )
+
+    def returned_rental(self, clothing=None):
+        return Rental.objects.create(
+            customer=self.customer, store=self.store, clothing=clothing or self.clothing,
+            rent_start_date=date.today(), rent_end_date=date.today(),
+            total_price=100, status=Rental.Status.RETURNED_CONFIRMED
+        )
+
+    def review(self, rating, clothing=None):
+        clothing = clothing or self.clothing
+        return Review.objects.create(
+            user=self.customer, clothing=clothing, rental=self.returned_rental(clothing), rating=rating, comment='ok'
+        )
+
+    def assert_aggregates(self, rating_sum, rating_count, clothing=None):
+        clothing = clothing or self.clothing
+        clothing.refresh_from_db()
+        self.assertEqual((clothing.rating_sum, clothing.rating_count), (rating_sum, rating_count))
+
+    def test_api_create_update_delete(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(
+            '/api/reviews/create/', {'rental': self.returned_rental().id, 'rating': 4, 'comment': 'Lovely'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assert_aggregates(4, 1)
+
+        review = Review.objects.get()
+        self.client.patch(f'/api/reviews/{review.id}/', {'rating': 2}, format='json')
+        self.assert_aggregates(2, 1)
+        self.client.patch(f'/api/reviews/{review.id}/', {'comment': 'Still fine'}, format='json')
+        self.assert_aggregates(2, 1)
+        self.client.delete(f'/api/reviews/{review.id}/')
+        self.assert_aggregates(0, 0)
+
+    def test_orm_writes_and_cascades(self):
+        first, _ = self.review(5), self.review(3)
+        self.assert_aggregates(8, 2)
+
+        other = self.add_clothing('Lehenga')
+        first.clothing = other
+        first.save()
+        self.assert_aggregates(3, 1)
+        self.assert_aggregates(5, 1, other)
+
+        Review.objects.filter(clothing=self.clothing).delete()
+        self.assert_aggregates(0, 0)
+        self.customer.delete()  # cascades to the remaining review
+        self.assert_aggregates(0, 0, other)
+
+    def test_clothing_save_keeps_concurrent_reviews(self):
+        stale = Clothing.objects.get(pk=self.clothing.pk)
+        self.review(4)  # lands after the item was loaded
+        stale.rental_price = 150
+        stale.save()
+        self.assert_aggregates(4, 1)
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.rental_price, 150)
+        stale.save(update_fields=['rental_price'])  # explicit field lists are left alone
+        self.assert_aggregates(4, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.review(5)
+        Clothing.objects.filter(pk=self.clothing.pk).update(rating_sum=40, rating_count=9)
+
+        call_command('rebuild_rating_aggregates', '--dry-run', stdout=io.StringIO())
+        self.assert_aggregates(40, 9)
+        out = io.StringIO()
+        call_command('rebuild_rating_aggregates', stdout=out)
+        self.assert_aggregates(5, 1)
+        self.assertIn('fixed 1', out.getvalue())
@@ -1,10 +1,12 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
 from accounts.permissions import IsCustomer
 from .models import Review
 from .serializers import ReviewCreateSerializer, ReviewListSerializer, ReviewUpdateSerializer
 from accounts.models import Clothing
+from notifications import outbox
 
 class ReviewCreateView(generics.CreateAPIView):
     """
@@ -20,15 +22,14 @@ class ReviewCreateView(generics.CreateAPIView):
         return context
 
     def perform_create(self, serializer):
-        review = serializer.save()
-        
-        # Create notification for the store owner
-        from notifications.models import Notification
-        Notification.objects.create(
-            user=review.clothing.store,
-            message=f"New review received for {review.clothing.item_name} from {review.user.email}: {review.rating} stars.",
-            notification_type='rental'
-        )
+        with transaction.atomic():
+            review = serializer.save()
+            # Notify the store owner
+            outbox.enqueue(
+                review.clothing.store_id,
+                f"New review received for {review.clothing.item_name} from {review.user.email}: {review.rating} stars.",
+                notification_type='rental'
+            )
 
 class ClothingReviewListView(generics.ListAPIView):
     """
@@ -40,20 +41,18 @@ class ClothingReviewListView(generics.ListAPIView):
 
     def get_queryset(self):
         clothing_id = self.kwargs.get('clothing_id')
-        return Review.objects.filter(clothing_id=clothing_id)
+        return Review.objects.filter(clothing_id=clothing_id).select_related('user', 'clothing', 'clothing__store')
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         serializer = self.get_serializer(queryset, many=True)
         
-        # Calculate average rating
-        avg_rating = 0
-        if queryset.exists():
-            avg_rating = sum(r.rating for r in queryset) / queryset.count()
+        # Rating stats come from the denormalized aggregates on the clothing row
+        clothing = Clothing.objects.filter(pk=self.kwargs.get('clothing_id')).first()
 
         return Response({
-            'count': queryset.count(),
-            'average_rating': round(avg_rating, 1),
+            'count': clothing.review_count if clothing else 0,
+            'average_rating': clothing.average_rating if clothing else 0,
             'results': serializer.data
         })
 
@@ -81,3 +80,12 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         return Review.objects.filter(user=self.request.user)
+
+    # Atomic so the rating aggregates (reviews.signals) change with the review
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
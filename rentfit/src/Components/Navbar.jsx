@@ -43,10 +43,67 @@ const Navbar = () => {
       }
     };
 
-    fetchUnreadCount();
-    const interval = setInterval(fetchUnreadCount, 15000); // Poll every 15s
+    // Live count over Server-Sent Events; poll every 15s only if the stream is unavailable
+    let interval = null;
+    const startPolling = () => {
+      if (interval) return;
+      fetchUnreadCount();
+      interval = setInterval(fetchUnreadCount, 15000);
+    };
+
+    const token = localStorage.getItem("access_token");
+    if (!token || typeof EventSource === "undefined") {
+      startPolling();
+      return () => clearInterval(interval);
+    }
 
-    return () => clearInterval(interval);
+    let source = null;
+    let reopen = null;
+    let cancelled = false;
+    const updateCount = (e) => setUnreadCount(JSON.parse(e.data).unread_count);
+
+    // The stream URL carries a short-lived ticket rather than the access token,
+    // so every (re)connect asks for a fresh one
+    const openStream = async () => {
+      let ticket;
+      try {
+        ticket = (await notificationAxiosInstance.post("stream-ticket/")).data.data.ticket;
+      } catch (error) {
+        startPolling();
+        return;
+      }
+      if (cancelled) return;
+
+      let opened = false;
+      source = new EventSource(
+        `${notificationAxiosInstance.defaults.baseURL}stream/?ticket=${encodeURIComponent(ticket)}`
+      );
+      source.addEventListener("notification.unread_count", updateCount);
+      source.addEventListener("notification.created", (e) => {
+        updateCount(e);
+        window.dispatchEvent(new CustomEvent("notificationCreated", { detail: JSON.parse(e.data).notification }));
+      });
+      source.onopen = () => {
+        opened = true;
+        clearInterval(interval);
+        interval = null;
+      };
+      source.onerror = () => {
+        // The browser would retry with the same (by then expired) ticket, so reconnect ourselves.
+        // A stream that never opened (e.g. 503 when the server runs without ASGI) stays on polling.
+        source.close();
+        startPolling();
+        if (opened && !cancelled) reopen = setTimeout(openStream, 5000);
+      };
+    };
+    openStream();
+
+    return () => {
+      cancelled = true;
+      source?.close();
+      clearTimeout(reopen);
+      clearInterval(interval);
+    };
   }, [isLoggedIn]);
 
   const handleLogout = () => {
@@ -13,14 +13,19 @@ const formatTime = (dateString) => {
     return `${Math.floor(diffInSeconds / 86400)}d ago`;
 };
 
+const PAGE_SIZE = 20;
+
 const NotificationDropdown = ({ onClose }) => {
     const [notifications, setNotifications] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [hasMore, setHasMore] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     const fetchNotifications = async () => {
         try {
-            const response = await notificationAxiosInstance.get('');
+            const response = await notificationAxiosInstance.get('', { params: { limit: PAGE_SIZE } });
             setNotifications(response.data);
+            setHasMore(response.data.length === PAGE_SIZE);
         } catch (error) {
             console.error("Error fetching notifications:", error);
         } finally {
@@ -28,10 +33,37 @@ const NotificationDropdown = ({ onClose }) => {
         }
     };
 
+    // Older history, one page at a time, before the oldest one shown (its
+    // cursor keeps its place even if the row has since been bumped or archived)
+    const loadOlder = async () => {
+        const oldest = notifications[notifications.length - 1];
+        if (!oldest) return;
+        setLoadingMore(true);
+        try {
+            const response = await notificationAxiosInstance.get('', { params: { before: oldest.cursor, limit: PAGE_SIZE } });
+            setNotifications(prev => [...prev, ...response.data.filter(n => !prev.some(p => p.id === n.id))]);
+            setHasMore(response.data.length === PAGE_SIZE);
+        } catch (error) {
+            console.error("Error loading older notifications:", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         fetchNotifications();
     }, []);
 
+    // New (or regrouped) notifications arrive live from the Navbar's event stream
+    useEffect(() => {
+        const onCreated = (e) => {
+            const notification = e.detail;
+            setNotifications(prev => [notification, ...prev.filter(n => n.id !== notification.id)]);
+        };
+        window.addEventListener("notificationCreated", onCreated);
+        return () => window.removeEventListener("notificationCreated", onCreated);
+    }, []);
+
     const markAsRead = async (id) => {
         try {
             await notificationAxiosInstance.patch(`${id}/read/`);
@@ -147,9 +179,15 @@ const NotificationDropdown = ({ onClose }) => {
                     </div>
                 )}
             </div>
-            {notifications.length > 0 && (
+            {hasMore && (
                 <div className="p-3 border-top border-gray-50 text-center bg-gray-50/30">
-                    <p className="text-[10px] text-gray-400 font-medium">Showing latest 20 notifications</p>
+                    <button
+                        onClick={loadOlder}
+                        disabled={loadingMore}
+                        className="text-xs text-blue-600 hover:text-blue-800 font-medium transition-colors disabled:text-gray-400"
+                    >
+                        {loadingMore ? 'Loading...' : 'Load older notifications'}
+                    </button>
                 </div>
             )}
         </div>
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import rentalAxiosInstance from '../services/rentalAxiosInstance';
 import paymentAxiosInstance from '../services/paymentAxiosInstance';
 import EsewaPayment from './EsewaPayment';
@@ -10,9 +10,36 @@ const RentalModal = ({ isOpen, onClose, clothing, onRentalCreated }) => {
     const [isLoading, setIsLoading] = useState(false);
     const [error, setError] = useState('');
     const [paymentData, setPaymentData] = useState(null);
+    const [freeByDay, setFreeByDay] = useState({});
+
+    // Per-day free units for the next 90 days, used to flag fully booked dates
+    useEffect(() => {
+        if (!isOpen || !clothing?.id) return;
+        const start = new Date();
+        const end = new Date();
+        end.setDate(end.getDate() + 89);
+        rentalAxiosInstance.get('availability/calendar/', {
+            params: {
+                clothing: clothing.id,
+                start: start.toISOString().split('T')[0],
+                end: end.toISOString().split('T')[0],
+            },
+        })
+            .then(res => setFreeByDay(res.data.items?.[String(clothing.id)]?.days || {}))
+            .catch(() => setFreeByDay({}));
+    }, [isOpen, clothing?.id]);
 
     if (!isOpen) return null;
 
+    const bookedDays = Object.keys(freeByDay).filter(day => freeByDay[day] === 0);
+    // Per-size stock when the item has it, otherwise the sizes listed on the item
+    const sizeOptions = clothing.sizes?.length
+        ? clothing.sizes.map(({ size, stock_quantity }) => ({ size, soldOut: stock_quantity <= 0 }))
+        : (clothing.size?.split(',').map(s => s.trim()).filter(Boolean) || []).map(size => ({ size, soldOut: false }));
+    const bookedInRange = startDate
+        ? bookedDays.filter(day => day >= startDate && day <= (endDate || startDate))
+        : [];
+
     const handleSubmit = async (e) => {
         e.preventDefault();
         setIsLoading(true);
@@ -81,6 +108,12 @@ const RentalModal = ({ isOpen, onClose, clothing, onRentalCreated }) => {
                             />
                         </div>
 
+                        {bookedDays.length > 0 && (
+                            <p className="text-xs text-gray-500">
+                                Fully booked: {bookedDays.slice(0, 6).join(', ')}{bookedDays.length > 6 ? '…' : ''}
+                            </p>
+                        )}
+
                         <div className="space-y-1">
                             <label className="text-sm font-semibold text-gray-700">End Date</label>
                             <input
@@ -93,18 +126,28 @@ const RentalModal = ({ isOpen, onClose, clothing, onRentalCreated }) => {
                             />
                         </div>
 
+                        {bookedInRange.length > 0 && (
+                            <div className="p-3 bg-yellow-50 text-yellow-800 rounded-lg text-sm font-medium">
+                                No units free on {bookedInRange.join(', ')}. Please pick other dates.
+                            </div>
+                        )}
+
                         {/* Size Selection */}
                         <div className="space-y-2">
                             <label className="text-sm font-semibold text-gray-700 block">Select Your Size *</label>
                             <div className="flex flex-wrap gap-2">
-                                {clothing.size?.split(',').map(s => s.trim()).filter(Boolean).map(size => (
+                                {sizeOptions.map(({ size, soldOut }) => (
                                     <button
                                         key={size}
                                         type="button"
+                                        disabled={soldOut}
+                                        title={soldOut ? 'Out of stock' : undefined}
                                         onClick={() => setSelectedSize(size)}
                                         className={`px-4 py-2 rounded-xl text-xs font-bold uppercase tracking-widest transition-all ${selectedSize === size
                                             ? 'bg-purple-600 text-white shadow-lg shadow-purple-100 scale-105'
-                                            : 'bg-gray-50 text-gray-500 hover:bg-gray-100 border border-gray-100'
+                                            : soldOut
+                                                ? 'bg-gray-50 text-gray-300 line-through border border-gray-100 cursor-not-allowed'
+                                                : 'bg-gray-50 text-gray-500 hover:bg-gray-100 border border-gray-100'
                                             }`}
                                     >
                                         {size}
@@ -132,8 +175,8 @@ const RentalModal = ({ isOpen, onClose, clothing, onRentalCreated }) => {
                             </button>
                             <button
                                 type="submit"
-                                disabled={isLoading || !selectedSize}
-                                className={`flex-1 py-3 bg-purple-600 rounded-xl text-white font-bold shadow-lg transition-all ${isLoading || !selectedSize ? 'opacity-50 cursor-not-allowed' : 'hover:bg-purple-700 hover:-translate-y-0.5'
+                                disabled={isLoading || !selectedSize || bookedInRange.length > 0}
+                                className={`flex-1 py-3 bg-purple-600 rounded-xl text-white font-bold shadow-lg transition-all ${isLoading || !selectedSize || bookedInRange.length > 0 ? 'opacity-50 cursor-not-allowed' : 'hover:bg-purple-700 hover:-translate-y-0.5'
                                     }`}
                             >
                                 {isLoading ? 'Sending Request...' : 'Request Rental'}
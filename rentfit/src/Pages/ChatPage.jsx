@@ -7,6 +7,8 @@ import Footer from '../Components/Footer';
 import DashboardSidebar from '../Components/DashboardSidebar';
 import { FaPaperPlane, FaUserCircle, FaStore, FaClock } from 'react-icons/fa';
 
+const PAGE_SIZE = 50;
+
 const ChatPage = () => {
     const { id } = useParams();
     const navigate = useNavigate();
@@ -17,6 +19,16 @@ const ChatPage = () => {
     const [loading, setLoading] = useState(true);
     const containerRef = useRef(null);
     const [currentUser, setCurrentUser] = useState(null);
+    const [socketOpen, setSocketOpen] = useState(false);
+    const activeConversationRef = useRef(null);
+    const [hasOlder, setHasOlder] = useState(false);
+    const messagesRef = useRef([]);
+    const loadedConversationRef = useRef(null);
+    messagesRef.current = messages;
+
+    const addMessage = (message) => {
+        setMessages(prev => prev.some(m => m.id === message.id) ? prev : [...prev, message]);
+    };
 
     // 1. Fetch user info and conversations ONLY ONCE on mount
     useEffect(() => {
@@ -48,45 +60,153 @@ const ChatPage = () => {
         }
     }, [id, conversations]);
 
-    // Polling for messages
+    // Live updates: new messages are pushed over the chat WebSocket
     useEffect(() => {
+        const token = localStorage.getItem('access_token');
+        if (!token) return;
+
+        const wsBase = chatAxiosInstance.defaults.baseURL
+            .replace(/^http/, 'ws')
+            .replace(/\/api\/chat\/?$/, '');
+        let socket;
+        let retry;
+        let closed = false;
+
+        const connect = async () => {
+            // A short-lived ticket instead of the access token, which would end up in access logs
+            let ticket;
+            try {
+                ticket = (await chatAxiosInstance.post('ws-ticket/')).data.data.ticket;
+            } catch {
+                if (!closed) retry = setTimeout(connect, 5000);
+                return;
+            }
+            if (closed) return;
+            socket = new WebSocket(`${wsBase}/ws/chat/?ticket=${encodeURIComponent(ticket)}`);
+            socket.onopen = () => setSocketOpen(true);
+            socket.onmessage = (e) => {
+                const event = JSON.parse(e.data);
+                if (event.type !== 'chat.message') return;
+                // Move the conversation to the top of the inbox with its new last message
+                setConversations(prev => {
+                    const conv = prev.find(c => c.id === event.data.conversation);
+                    if (!conv) return prev;
+                    const isActive = conv.id === activeConversationRef.current?.id;
+                    const fromOther = event.data.sender === conv.counterpart?.id ? 1 : 0;
+                    const updated = {
+                        ...conv,
+                        last_message: event.data,
+                        last_message_at: event.data.timestamp,
+                        unread_count: isActive ? 0 : (conv.unread_count || 0) + fromOther
+                    };
+                    return [updated, ...prev.filter(c => c.id !== conv.id)];
+                });
+                if (event.data.conversation === activeConversationRef.current?.id) {
+                    addMessage(event.data);
+                }
+            };
+            socket.onclose = () => {
+                setSocketOpen(false);
+                if (!closed) retry = setTimeout(connect, 5000);
+            };
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(retry);
+            socket?.close();
+        };
+    }, []);
+
+    // Load the latest page when a conversation is opened
+    useEffect(() => {
+        activeConversationRef.current = activeConversation;
+        loadedConversationRef.current = null;
+        setMessages([]);
         if (!activeConversation) return;
 
-        const fetchMessages = async () => {
+        const fetchLatest = async () => {
             try {
-                const res = await chatAxiosInstance.get(`${activeConversation.id}/`);
+                const res = await chatAxiosInstance.get(`${activeConversation.id}/`, { params: { limit: PAGE_SIZE } });
                 setMessages(res.data);
+                setHasOlder(res.data.length >= PAGE_SIZE);
+                loadedConversationRef.current = activeConversation.id;
+            } catch (error) {
+                console.error("Error fetching messages", error);
+            }
+        };
+
+        fetchLatest();
+    }, [activeConversation]);
+
+    // Fetch only messages after the last one we have: once when the socket
+    // (re)connects, and every 5s while it is down
+    useEffect(() => {
+        if (!activeConversation) return;
+
+        const fetchNew = async () => {
+            const last = messagesRef.current[messagesRef.current.length - 1];
+            if (loadedConversationRef.current !== activeConversation.id || !last) return;
+            try {
+                const res = await chatAxiosInstance.get(`${activeConversation.id}/`, { params: { after_id: last.id } });
+                res.data.forEach(addMessage);
             } catch (error) {
                 console.error("Error fetching messages", error);
             }
         };
 
-        fetchMessages();
-        const interval = setInterval(fetchMessages, 5000); // 5s polling
+        fetchNew();
+        if (socketOpen) return;
+        const interval = setInterval(fetchNew, 5000); // 5s polling
 
         return () => clearInterval(interval);
-    }, [activeConversation]);
+    }, [activeConversation, socketOpen]);
+
+    const loadOlder = async () => {
+        if (!activeConversation || messages.length === 0) return;
+        try {
+            const res = await chatAxiosInstance.get(`${activeConversation.id}/`, {
+                params: { before_id: messages[0].id, limit: PAGE_SIZE }
+            });
+            setMessages(prev => [...res.data, ...prev]);
+            setHasOlder(res.data.length >= PAGE_SIZE);
+        } catch (error) {
+            console.error("Error fetching older messages", error);
+        }
+    };
+
+    const lastMessageId = messages.length ? messages[messages.length - 1].id : null;
+
+    // Mark the open conversation read up to the newest message we are showing
+    useEffect(() => {
+        if (!activeConversation || !lastMessageId || loadedConversationRef.current !== activeConversation.id) return;
+        chatAxiosInstance.post(`${activeConversation.id}/read/`, { message_id: lastMessageId })
+            .then(() => setConversations(prev => prev.map(c => (
+                c.id === activeConversation.id ? { ...c, unread_count: 0 } : c
+            ))))
+            .catch(error => console.error("Error marking conversation read", error));
+    }, [activeConversation, lastMessageId]);
 
     // 3. Container-only Scroll Fix (Prevents page jumping)
     useEffect(() => {
         const container = containerRef.current;
         if (!container) return;
 
-        // Auto-scroll to bottom of the panel only
+        // Auto-scroll to bottom of the panel only (not when older messages are prepended)
         container.scrollTop = container.scrollHeight;
-    }, [messages]);
+    }, [lastMessageId]);
 
     const handleSendMessage = async (e) => {
         e.preventDefault();
         if (!newMessage.trim() || !activeConversation) return;
 
         try {
-            await chatAxiosInstance.post(`${activeConversation.id}/send/`, {
+            const res = await chatAxiosInstance.post(`${activeConversation.id}/send/`, {
                 text: newMessage
             });
             setNewMessage("");
-            const res = await chatAxiosInstance.get(`${activeConversation.id}/`);
-            setMessages(res.data);
+            addMessage(res.data);
         } catch (error) {
             console.error("Error sending message", error);
         }
@@ -155,9 +275,16 @@ const ChatPage = () => {
                                                         )}
                                                     </div>
                                                     <div className="flex-1 min-w-0">
-                                                        <h3 className="font-bold text-gray-800 truncate text-sm">
-                                                            {other.name}
-                                                        </h3>
+                                                        <div className="flex items-center justify-between gap-2">
+                                                            <h3 className="font-bold text-gray-800 truncate text-sm">
+                                                                {other.name}
+                                                            </h3>
+                                                            {conv.unread_count > 0 && (
+                                                                <span className="bg-purple-600 text-white text-[10px] font-bold rounded-full px-2 py-0.5">
+                                                                    {conv.unread_count}
+                                                                </span>
+                                                            )}
+                                                        </div>
                                                         {conv.last_message && (
                                                             <p className="text-xs text-gray-500 truncate">
                                                                 {conv.last_message.text}
@@ -200,6 +327,17 @@ const ChatPage = () => {
 
                                     {/* Messages List - Container Only Scrolling */}
                                     <div ref={containerRef} className="messages flex-1 overflow-y-auto p-6 space-y-4 bg-gray-50">
+                                        {hasOlder && (
+                                            <div className="text-center">
+                                                <button
+                                                    type="button"
+                                                    onClick={loadOlder}
+                                                    className="text-xs text-purple-600 hover:underline"
+                                                >
+                                                    Load earlier messages
+                                                </button>
+                                            </div>
+                                        )}
                                         {messages.map((msg) => {
                                             const isMyMessage = currentUser ? msg.sender === currentUser.id : false;
 